@@ -0,0 +1,200 @@
+"""AI advisor plumbing: a shared Anthropic client, the cached system prompt and token usage"""
+import threading
+
+from conversation_context import estimate_tokens
+
+ADVISOR_MODEL = "claude-sonnet-4-20250514"
+ADVISOR_MAX_TOKENS = 500
+
+# Most rewards listed individually in the program reference; larger catalogs
+# are summarized per category past this
+PROMPT_CATALOG_LIMIT = 60
+
+# The API only caches a prefix that reaches the model's minimum cacheable
+# length (1024 tokens for Sonnet and Opus, 2048 for Haiku); below that it
+# silently bills the whole prompt as input. The guidelines alone are under
+# 400 tokens, so the cached block also carries the program reference from
+# build_program_reference(), which is the same for every member.
+STATIC_SYSTEM_PROMPT = """You are an AI rewards advisor for OmniShop loyalty program.
+
+RESPONSIBLE AI GUIDELINES:
+- Never provide personal financial, investment, medical, or legal advice
+- Treat all members fairly regardless of their tier status
+- Be transparent about limitations of your recommendations
+- If unsure, acknowledge uncertainty rather than guessing
+- Keep responses focused on the rewards program only
+- Be inclusive and respectful in all responses
+
+Tier thresholds: Gold ($0-499), Silver ($500-1999), Platinum ($2000+)
+Earning rates: Gold 1x, Silver 1.25x, Platinum 1.5x
+
+Use the purchase history to make personalized recommendations.
+Reference specific past purchases when suggesting rewards.
+Help them maximize their rewards experience. Be friendly and helpful.
+Always explain WHY you're making a recommendation based on their shopping behavior.
+
+ANSWERING:
+- Only recommend rewards from the catalog below, by their exact name and points cost
+- Never recommend a reward the member cannot afford without saying how many more points they need
+- Tier-exclusive rewards are only redeemable by members of that tier or above
+- Rewards marked limited or low in stock may sell out; say so when recommending them
+- Value per point is the reward's dollar value divided by its points cost; higher is better value
+- Keep answers under 200 words unless the member asks for detail, and use short bullet lists
+- If a question is outside the rewards program, say so briefly and steer back to rewards
+- Do not invent promotions, prices, rewards or tier benefits that are not listed here"""
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_anthropic_client(api_key):
+    """Return the process-wide Anthropic client for an API key, creating it on first use"""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            import anthropic
+            client = anthropic.Anthropic(api_key=api_key)
+            _clients[api_key] = client
+        return client
+
+
+def build_program_reference(tiers, catalog, challenges, badges, principles=()):
+    """Program facts shared by every member: tiers, rewards, challenges, badges and AI principles
+
+    Deterministic for the same inputs, so it can sit in the cached prefix.
+    """
+    lines = ["PROGRAM REFERENCE", "", "Tiers (by annual spend):"]
+    for name, tier in tiers.items():
+        spend = (f"${tier['min_spend']:,}+" if tier['max_spend'] == float('inf')
+                 else f"${tier['min_spend']:,}-${tier['max_spend']:,}")
+        lines.append(f"- {name}: {spend}, earns {tier['earning_rate']}x points per dollar. "
+                     f"Benefits: {', '.join(tier['benefits'])}")
+
+    rewards = sorted(catalog, key=lambda reward: (reward['points'], reward['id']))
+    lines += ["", f"Rewards catalog ({len(rewards)} rewards; name | category | points | value | value per point | notes):"]
+    for reward in rewards[:PROMPT_CATALOG_LIMIT]:
+        notes = []
+        if reward.get('tier_exclusive'):
+            notes.append(f"{reward['tier_exclusive']} tier exclusive")
+        if reward.get('limited'):
+            notes.append("limited edition")
+        if reward.get('stock', 0) < 30:
+            notes.append("low stock")
+        cents = reward['value'] * 100 / reward['points'] if reward['points'] else 0.0
+        lines.append(f"- {reward['name']} | {reward['category']} | {reward['points']:,} pts | "
+                     f"${reward['value']:.2f} | {cents:.2f} cents/pt | {', '.join(notes) or '-'}")
+    if len(rewards) > PROMPT_CATALOG_LIMIT:
+        by_category = {}
+        for reward in rewards[PROMPT_CATALOG_LIMIT:]:
+            by_category.setdefault(reward['category'], []).append(reward['points'])
+        lines.append(f"- ...and {len(rewards) - PROMPT_CATALOG_LIMIT} more: " + "; ".join(
+            f"{category} {len(points)} from {min(points):,} to {max(points):,} pts"
+            for category, points in sorted(by_category.items())))
+
+    lines += ["", "Challenges (bonus points on completion):"]
+    lines += [f"- {c['name']}: {c['description']} ({c['points']} pts)" for c in challenges]
+    lines += ["", "Badges:"]
+    lines += [f"- {name}: {badge['description']}" for name, badge in badges.items()]
+    if principles:
+        lines += ["", "OmniShop's responsible AI principles, which your answers must follow:"]
+        lines += [f"- {p['name']}: {p['description']}" for p in principles]
+    return "\n".join(lines)
+
+
+def build_member_context(member, patterns, transactions, recommendations):
+    """Per-member part of the system prompt"""
+    recent_purchases = ""
+    for tx in (transactions or [])[:5]:
+        recent_purchases += f"- {tx.get('productName', 'Item')} (${tx.get('purchaseAmount', 0):.2f}, {tx.get('category', 'Other')})\n"
+
+    rec_text = ""
+    for rec in recommendations[:3]:
+        rec_text += f"- {rec['reward']['name']} ({rec['reward']['points']:,} pts): {', '.join(rec['reasons'][:2])}\n"
+
+    top_categories = ', '.join([f"{cat} ({count})" for cat, count in patterns.get('top_categories', [])[:3]])
+    return f"""Current member info:
+- Name: {member['name']}
+- Tier: {member['tier']}
+- Points Balance: {member['points']:,}
+- Total Spent: ${member['annual_spend']:.2f}
+- Streak: {member['streak_days']} days
+
+PURCHASE HISTORY ANALYSIS:
+- Total Transactions: {patterns.get('total_transactions', 0)}
+- Total Points Earned: {patterns.get('total_points_earned', 0):,}
+- Favorite Category: {patterns.get('favorite_category', 'Unknown')}
+- Top Categories: {top_categories}
+
+Recent Purchases:
+{recent_purchases}
+PERSONALIZED REWARD RECOMMENDATIONS (based on purchase history):
+{rec_text}"""
+
+
+def build_bucketed_member_context(tier, points_range, favorite_category):
+    """Member block for a cacheable opening answer: only the state a whole cache bucket shares
+
+    No name, exact balance, purchases or recommendations, so the answer
+    fits every member in the bucket.
+    """
+    low, high = points_range
+    return f"""Current member info (shared by similar members; do not address the member by name or quote their exact balance):
+- Tier: {tier}
+- Points Balance: between {low:,} and {high:,}
+- Favorite Category: {favorite_category or 'Unknown'}"""
+
+
+def build_system_blocks(member_context, conversation_summary='', program_reference=''):
+    """System prompt as a cached static block followed by the member block
+
+    The static block is the guidelines plus the program reference. A summary
+    of earlier chat turns, when there is one, goes last so it never
+    invalidates the cached prefix.
+    """
+    static = STATIC_SYSTEM_PROMPT + "\n\n" + program_reference if program_reference else STATIC_SYSTEM_PROMPT
+    blocks = [
+        {"type": "text", "text": static, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": member_context}
+    ]
+    if conversation_summary:
+        blocks.append({"type": "text", "text": conversation_summary})
+    return blocks
+
+
+def turn_usage(usage, partial_text=None):
+    """Token counts for one advisor turn from an API usage object
+
+    A stream closed early (e.g. by the safety check) never gets its final
+    output count; pass the text received so far as partial_text and the
+    output is estimated from it instead.
+    """
+    output_tokens = getattr(usage, 'output_tokens', None) or 0
+    if partial_text is not None:
+        output_tokens = max(output_tokens, estimate_tokens(partial_text))
+    return {
+        'input_tokens': getattr(usage, 'input_tokens', None) or 0,
+        'cache_read_tokens': getattr(usage, 'cache_read_input_tokens', None) or 0,
+        'cache_write_tokens': getattr(usage, 'cache_creation_input_tokens', None) or 0,
+        'output_tokens': output_tokens
+    }
+
+
+_usage_totals = {'turns': 0, 'input_tokens': 0, 'cache_read_tokens': 0, 'cache_write_tokens': 0, 'output_tokens': 0}
+_usage_lock = threading.Lock()
+
+
+def record_usage(usage):
+    """Add one turn's token counts to the process-wide totals"""
+    with _usage_lock:
+        _usage_totals['turns'] += 1
+        for field, count in usage.items():
+            _usage_totals[field] += count
+
+
+def usage_stats():
+    """Process-wide token totals and the share of prompt tokens read from cache"""
+    with _usage_lock:
+        stats = dict(_usage_totals)
+    prompt_tokens = stats['input_tokens'] + stats['cache_read_tokens'] + stats['cache_write_tokens']
+    stats['cache_hit_rate'] = stats['cache_read_tokens'] / prompt_tokens if prompt_tokens else 0.0
+    return stats
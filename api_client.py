@@ -0,0 +1,311 @@
+"""Pooled, keep-alive HTTP client shared by every loyalty API call"""
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from metrics import observe
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Headers sent with every loyalty API request
+COMMON_HEADERS = {
+    "ngrok-skip-browser-warning": "true",
+    "Content-Type": "application/json",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+# (connect, read) timeouts in seconds, per logical endpoint
+DEFAULT_TIMEOUT = (3.05, 10)
+ENDPOINT_TIMEOUTS = {
+    'balance': (3.05, 10),
+    'transactions': (3.05, 15),
+    'redemptions': (3.05, 10),
+    'redeem': (3.05, 10),
+}
+
+POOL_SIZE = int(os.getenv("API_POOL_SIZE", "10"))
+MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "2"))
+RETRY_BACKOFF = float(os.getenv("API_RETRY_BACKOFF", "0.3"))
+
+# Only idempotent methods are retried; a retried POST could redeem twice
+RETRY_METHODS = frozenset(['GET', 'HEAD', 'PUT'])
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# Circuit breaker thresholds, shared by every endpoint
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("API_CB_FAILURE_THRESHOLD", "3"))
+BREAKER_RECOVERY_SECONDS = float(os.getenv("API_CB_RECOVERY_SECONDS", "30"))
+BREAKER_HALF_OPEN_CALLS = int(os.getenv("API_CB_HALF_OPEN_CALLS", "1"))
+
+# Most URLs whose ETag/Last-Modified validators and parsed bodies are kept
+MAX_VALIDATORS = 256
+
+
+def decode_json(content):
+    """Parse a JSON payload, using orjson for large arrays when it is installed"""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class ApiRetry(Retry):
+    """Retry policy that gives up at once on a read timeout
+
+    A hung endpoint would otherwise hold one call for (retries + 1) x the read
+    timeout. Connection errors, dropped keep-alive connections and retryable
+    statuses are still retried. ``on_retry(response, error)`` is called for
+    every failed attempt that is about to be retried.
+    """
+
+    def __init__(self, *args, on_retry=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_retry = on_retry
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.on_retry = self.on_retry
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if isinstance(error, ReadTimeoutError):
+            raise error
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        if self.on_retry is not None:
+            self.on_retry(response, error)
+        return retry
+
+
+class LoyaltyApiClient:
+    """Session-backed client that reuses TCP+TLS connections per host"""
+
+    def __init__(self, base_url, pool_size=POOL_SIZE, max_retries=MAX_RETRIES,
+                 backoff_factor=RETRY_BACKOFF, timeouts=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeouts = dict(ENDPOINT_TIMEOUTS, **(timeouts or {}))
+
+        # The breaker of the request in flight on this thread, so retried attempts count as failures
+        self._in_flight = threading.local()
+        retry = ApiRetry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=RETRY_METHODS,
+            raise_on_status=False,
+            on_retry=self._record_retried_failure
+        )
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.headers.update(COMMON_HEADERS)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+        self._lock = threading.Lock()
+        self._calls = Counter()
+        self._breakers = {}
+        self._validators = OrderedDict()
+        self._transfer = defaultdict(Counter)
+
+    def breaker(self, endpoint):
+        """Return the circuit breaker guarding a logical endpoint"""
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    endpoint,
+                    failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                    recovery_timeout=BREAKER_RECOVERY_SECONDS,
+                    half_open_max_calls=BREAKER_HALF_OPEN_CALLS
+                )
+                self._breakers[endpoint] = breaker
+            return breaker
+
+    def _record_retried_failure(self, response, error):
+        # A retried 429 is throttling, not a failure, same as a final one
+        breaker = getattr(self._in_flight, 'breaker', None)
+        if breaker is not None and (error is not None or (response is not None and response.status >= 500)):
+            breaker.record_failure()
+
+    def request(self, method, endpoint, path, **kwargs):
+        """Send a request for a logical endpoint through the shared pool
+
+        Raises CircuitOpenError without touching the network while the
+        endpoint's circuit is open. Connection errors and 5xx responses count
+        as failures, once per attempt, so retries trip the breaker too.
+        """
+        breaker = self.breaker(endpoint)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{endpoint} circuit is open; failing fast")
+
+        kwargs.setdefault('timeout', self.timeouts.get(endpoint, DEFAULT_TIMEOUT))
+        with self._lock:
+            self._calls[endpoint] += 1
+        started = time.perf_counter()
+        self._in_flight.breaker = breaker
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except requests.RequestException:
+            breaker.record_failure()
+            observe('api.request', (time.perf_counter() - started) * 1000, True, endpoint=endpoint, method=method)
+            raise
+        finally:
+            self._in_flight.breaker = None
+
+        failed = response.status_code >= 500
+        observe('api.request', (time.perf_counter() - started) * 1000, failed, endpoint=endpoint, method=method)
+        if failed:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    def get(self, endpoint, path, **kwargs):
+        return self.request('GET', endpoint, path, **kwargs)
+
+    def get_json(self, endpoint, path, params=None):
+        """GET and parse a JSON body, revalidating with ETag/Last-Modified
+
+        A 304 reuses the body parsed on the previous 200 for the same URL.
+        Returns None for any other non-200 status.
+        """
+        url_key = (path, tuple(sorted((params or {}).items())))
+        with self._lock:
+            cached = self._validators.get(url_key)
+            if cached is not None:
+                self._validators.move_to_end(url_key)
+
+        headers = {}
+        if cached is not None:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        response = self.get(endpoint, path, params=params, headers=headers)
+        wire_bytes = self._wire_bytes(response)
+
+        if response.status_code == 304 and cached is not None:
+            self._record_transfer(endpoint, wire_bytes, 0, 0.0, not_modified=True)
+            return cached[2]
+        if response.status_code != 200:
+            self._record_transfer(endpoint, wire_bytes, 0, 0.0)
+            return None
+
+        started = time.perf_counter()
+        body = decode_json(response.content)
+        parse_ms = (time.perf_counter() - started) * 1000
+        self._record_transfer(endpoint, wire_bytes, len(response.content), parse_ms)
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            with self._lock:
+                self._validators[url_key] = (etag, last_modified, body)
+                self._validators.move_to_end(url_key)
+                while len(self._validators) > MAX_VALIDATORS:
+                    self._validators.popitem(last=False)
+        return body
+
+    @staticmethod
+    def _wire_bytes(response):
+        # urllib3 counts compressed bytes read off the socket
+        tell = getattr(response.raw, 'tell', None)
+        if tell is not None:
+            try:
+                return tell()
+            except Exception:
+                pass
+        return int(response.headers.get('Content-Length') or len(response.content))
+
+    def _record_transfer(self, endpoint, wire_bytes, decoded_bytes, parse_ms, not_modified=False):
+        with self._lock:
+            stats = self._transfer[endpoint]
+            stats['responses'] += 1
+            stats['not_modified'] += int(not_modified)
+            stats['wire_bytes'] += wire_bytes
+            stats['decoded_bytes'] += decoded_bytes
+            stats['parse_ms'] += parse_ms
+
+    def post(self, endpoint, path, **kwargs):
+        return self.request('POST', endpoint, path, **kwargs)
+
+    def put(self, endpoint, path, **kwargs):
+        return self.request('PUT', endpoint, path, **kwargs)
+
+    def patch(self, endpoint, path, **kwargs):
+        return self.request('PATCH', endpoint, path, **kwargs)
+
+    def connection_stats(self):
+        """Return connection-reuse counters aggregated over every host pool"""
+        pools = self.adapter.poolmanager.pools
+        requests_sent = 0
+        new_connections = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_sent += pool.num_requests
+            new_connections += pool.num_connections
+
+        reused = max(0, requests_sent - new_connections)
+        with self._lock:
+            calls = dict(self._calls)
+
+        return {
+            'requests': requests_sent,
+            'new_connections': new_connections,
+            'reused_connections': reused,
+            'reuse_ratio': reused / requests_sent if requests_sent else 0.0,
+            'calls_by_endpoint': calls
+        }
+
+    def transfer_stats(self):
+        """Return bytes transferred, 304 hits and JSON parse time per endpoint"""
+        with self._lock:
+            transfer = {endpoint: dict(stats) for endpoint, stats in self._transfer.items()}
+        rows = []
+        for endpoint, stats in transfer.items():
+            parsed = stats['responses'] - stats['not_modified']
+            rows.append({
+                'endpoint': endpoint,
+                'responses': stats['responses'],
+                'not_modified': stats['not_modified'],
+                'wire_bytes': stats['wire_bytes'],
+                'decoded_bytes': stats['decoded_bytes'],
+                'avg_parse_ms': round(stats['parse_ms'] / parsed, 2) if parsed else 0.0
+            })
+        return rows
+
+    def breaker_stats(self):
+        """Return a snapshot of every endpoint's circuit breaker"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return [breaker.snapshot() for breaker in breakers]
+
+    def close(self):
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url):
+    """Return the process-wide client for a base URL, creating it on first use"""
+    with _clients_lock:
+        client = _clients.get(base_url)
+        if client is None:
+            client = LoyaltyApiClient(base_url)
+            _clients[base_url] = client
+        return client
@@ -3,45 +3,108 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
-from collections import Counter
 import random
 import os
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from api_client import get_client
+from request_coalescing import coalesced_cache
+from transaction_sync import get_transaction_store, sync_transactions
+from purchase_analytics import analyze_purchase_patterns, clear_pattern_cache, pattern_cache_stats
+from transaction_columns import HISTORY_SORTS, get_history_index
+from recommendations import get_personalized_recommendations
+from catalog import REWARDS_CATALOG, get_catalog_index
+from content_safety import StreamingSafetyChecker, check_content_safety
+from conversation_context import ConversationContext
+from response_cache import get_response_cache, member_fingerprint, points_range, prompt_fingerprint, response_cache_key
+from llm_scheduler import QueueTimeout, TokenBudgetExceeded, get_llm_scheduler
+from audit_store import get_audit_store
+from fairness_metrics import get_fairness_rollup
+from metrics import get_span_registry, observe, span, start_metrics_endpoint, timed
+from advisor import (ADVISOR_MAX_TOKENS, ADVISOR_MODEL, build_bucketed_member_context, build_member_context,
+                     build_program_reference, build_system_blocks, get_anthropic_client, record_usage, turn_usage,
+                     usage_stats)
+
+# Start of this script run, used to measure time-to-first-render
+RUN_STARTED = time.perf_counter()
 
 # API Configuration - reads from environment variable
 API_BASE_URL = os.getenv("API_BASE_URL", "https://f66597fa63dc.ngrok-free.app") + "/api"
 CUSTOMER_ID = "CUST001"
 
-@st.cache_data(ttl=60)
-def fetch_customer_data():
+# Rerun only the widget group a button belongs to instead of the whole script
+# (set OMNISHOP_FRAGMENTS=0 to fall back to full reruns, e.g. to benchmark)
+FRAGMENTS_ENABLED = os.getenv("OMNISHOP_FRAGMENTS", "1") != "0"
+# How often the sidebar balance refreshes itself (0 disables the timer)
+SIDEBAR_BALANCE_REFRESH_SECONDS = float(os.getenv("SIDEBAR_BALANCE_REFRESH_SECONDS", "30"))
+
+def fragment(func=None, *, run_every=None):
+    """st.fragment, or a no-op decorator when fragments are disabled"""
+    if not FRAGMENTS_ENABLED:
+        return func if func is not None else (lambda f: f)
+    return st.fragment(func, run_every=run_every)
+
+def rerun_fragment():
+    """Rerun the current fragment, or the whole app outside a fragment rerun"""
+    ctx = get_script_run_ctx()
+    # Streamlit only allows a fragment-scoped rerun while a fragment is rerunning
+    in_fragment_run = FRAGMENTS_ENABLED and ctx is not None and bool(ctx.fragment_ids_this_run)
+    st.rerun(scope="fragment" if in_fragment_run else "app")
+
+def rerun_after_redemption():
+    """Rerun the whole app after a redemption
+
+    The sidebar balance is its own fragment, so rerunning only the redeem
+    fragment would leave it showing the old balance until its timer fires.
+    post_redemption has already dropped the cached balance, so the rerun waits
+    for the reload instead of drawing the stale value.
+    """
+    st.rerun(scope="app")
+
+def show_fetch_error(what):
+    """on_error for a cached fetcher: show the error on the calling page and return None"""
+    def on_error(error):
+        st.error(f"Error fetching {what}: {error}")
+    return on_error
+
+# Also refreshed on a background worker, so errors are left to the cache
+# (counted in its stats) rather than shown from inside the fetcher
+@coalesced_cache(ttl=60, stale_while_revalidate=True, on_error=show_fetch_error("customer data"))
+@timed()
+def fetch_customer_data(customer_id=CUSTOMER_ID):
     """Fetch customer balance and info from API"""
-    try:
-        response = requests.get(
-            f"{API_BASE_URL}/customers/{CUSTOMER_ID}/balance/",
-            headers={"ngrok-skip-browser-warning": "true"},
-            timeout=10
+    return get_client(API_BASE_URL).get_json('balance', f"/customers/{customer_id}/balance/")
+
+@coalesced_cache(ttl=60)
+@timed()
+def fetch_transactions(customer_id=CUSTOMER_ID):
+    """Sync new transactions from API and return the merged local history"""
+    store = get_transaction_store(customer_id)
+
+    def fetch_since(cursor):
+        return get_client(API_BASE_URL).get_json(
+            'transactions',
+            f"/customers/{customer_id}/transactions/",
+            params={"since": cursor} if cursor else None
         )
-        if response.status_code == 200:
-            return response.json()
-    except Exception as e:
-        st.error(f"Error fetching customer data: {e}")
-    return None
 
-@st.cache_data(ttl=60)
-def fetch_transactions():
-    """Fetch customer transactions from API"""
     try:
-        response = requests.get(
-            f"{API_BASE_URL}/customers/{CUSTOMER_ID}/transactions/",
-            headers={"ngrok-skip-browser-warning": "true"},
-            timeout=10
-        )
-        if response.status_code == 200:
-            return response.json()
+        sync_transactions(store, fetch_since)
     except Exception as e:
         st.error(f"Error fetching transactions: {e}")
-    return None
+    return store.rows() if store.synced else None
+
+def resync_transactions(customer_id=CUSTOMER_ID):
+    """Discard the local transaction history and refetch it in full"""
+    get_transaction_store(customer_id).reset()
+    clear_pattern_cache()
+    fetch_transactions.invalidate(customer_id)
+    return fetch_transactions(customer_id)
 
+@timed()
 def post_redemption(customer_id, reward_name, points_cost, reward_category, reward_value):
     """Post a redemption to the API and update customer balance"""
     try:
@@ -52,32 +115,28 @@ def post_redemption(customer_id, reward_name, points_cost, reward_category, rewa
             "pointsCost": points_cost,
             "productToRedeem": reward_name
         }
-        response = requests.post(
-            f"{API_BASE_URL}/redemptions/",
-            headers={
-                "ngrok-skip-browser-warning": "true",
-                "Content-Type": "application/json"
-            },
-            json=payload,
-            timeout=10
-        )
+        response = get_client(API_BASE_URL).post('redemptions', "/redemptions/", json=payload)
 
         if response.status_code in [200, 201]:
-            # Clear cache so next fetch gets updated balance
-            fetch_customer_data.clear()
+            # Drop the cached balance and start reloading it in the background
+            fetch_customer_data.invalidate(customer_id, refresh=True)
             return True, response.json() if response.text else {"status": "success"}
         else:
             return False, f"API returned status {response.status_code}: {response.text}"
     except Exception as e:
         return False, str(e)
 
+@timed()
 def update_customer_balance(customer_id, points_to_deduct):
     """Update customer balance by deducting redeemed points"""
     try:
-        # Get current balance
-        current_data = fetch_customer_data()
+        # Get current balance (never a stale one when writing)
+        fetch_customer_data.invalidate(customer_id)
+        current_data = fetch_customer_data(customer_id)
         if current_data:
             new_balance = current_data.get('pointsBalance', 0) - points_to_deduct
+            client = get_client(API_BASE_URL)
+            balance_path = f"/customers/{customer_id}/balance/"
 
             # Update balance via PUT/PATCH
             payload = {
@@ -87,134 +146,43 @@ def update_customer_balance(customer_id, points_to_deduct):
             }
 
             # Try PUT first
-            response = requests.put(
-                f"{API_BASE_URL}/customers/{customer_id}/balance/",
-                headers={
-                    "ngrok-skip-browser-warning": "true",
-                    "Content-Type": "application/json"
-                },
-                json=payload,
-                timeout=10
-            )
+            response = client.put('balance', balance_path, json=payload)
 
             # If PUT fails, try PATCH
             if response.status_code not in [200, 201, 204]:
-                response = requests.patch(
-                    f"{API_BASE_URL}/customers/{customer_id}/balance/",
-                    headers={
-                        "ngrok-skip-browser-warning": "true",
-                        "Content-Type": "application/json"
-                    },
-                    json=payload,
-                    timeout=10
-                )
+                response = client.patch('balance', balance_path, json=payload)
 
             # If both fail, try POST to a redemption balance endpoint
             if response.status_code not in [200, 201, 204]:
-                requests.post(
-                    f"{API_BASE_URL}/customers/{customer_id}/redeem/",
-                    headers={
-                        "ngrok-skip-browser-warning": "true",
-                        "Content-Type": "application/json"
-                    },
-                    json={"pointsToDeduct": points_to_deduct},
-                    timeout=10
-                )
+                client.post('redeem', f"/customers/{customer_id}/redeem/", json={"pointsToDeduct": points_to_deduct})
 
-            # Clear cache so next fetch gets updated balance
-            fetch_customer_data.clear()
+            # Drop the cached balance and start reloading it in the background
+            fetch_customer_data.invalidate(customer_id, refresh=True)
 
             return True
     except Exception as e:
         print(f"Error updating balance: {e}")
     return False
 
-def analyze_purchase_patterns(transactions):
-    """Analyze purchase history to identify patterns and preferences"""
-    if not transactions:
-        return {}
-
-    categories = []
-    items = []
-    total_spent = 0
-    total_points = 0
-
-    for tx in transactions:
-        if tx.get('category'):
-            categories.append(tx['category'])
-        if tx.get('productName'):
-            items.append(tx['productName'])
-        if tx.get('purchaseAmount') is not None:
-            total_spent += tx.get('purchaseAmount', 0) or 0
-        if tx.get('points') is not None:
-            total_points += tx.get('points', 0) or 0
-
-    category_counts = Counter(categories)
-    top_categories = category_counts.most_common(5)
-
-    return {
-        'top_categories': top_categories,
-        'total_transactions': len(transactions),
-        'total_spent': total_spent,
-        'total_points_earned': total_points,
-        'recent_items': items[:10],
-        'favorite_category': top_categories[0][0] if top_categories else None
-    }
+def bootstrap_session():
+    """Fetch balance and transactions concurrently and analyze purchases once"""
+    ctx = get_script_run_ctx()
 
-def get_personalized_recommendations(transactions, rewards_catalog, member_points):
-    """Generate personalized recommendations based on purchase history"""
-    patterns = analyze_purchase_patterns(transactions)
-    recommendations = []
-
-    # Category-based recommendations
-    category_mapping = {
-        'Electronics': ['Merchandise', 'Digital'],
-        'Health': ['Experiences', 'Merchandise'],
-        'Groceries': ['Gift Cards', 'Discounts'],
-        'Food': ['Gift Cards', 'Discounts'],
-        'Home': ['Merchandise', 'Gift Cards'],
-        'Clothing': ['Gift Cards', 'Discounts']
-    }
+    def run_with_ctx(fetch):
+        # Attach the session's script context so cached st.* calls work in the worker
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fetch()
 
-    favorite_cat = patterns.get('favorite_category', 'Electronics')
-    preferred_reward_types = category_mapping.get(favorite_cat, ['Gift Cards'])
-
-    for reward in rewards_catalog:
-        score = 0
-        reasons = []
-
-        # Affordability score
-        if reward['points'] <= member_points:
-            score += 30
-            reasons.append("Within your points balance")
-
-        # Category match score
-        if reward['category'] in preferred_reward_types:
-            score += 25
-            reasons.append(f"Matches your {favorite_cat} shopping preference")
-
-        # Value score (points per dollar equivalent)
-        if reward['points'] < 1000:
-            score += 15
-            reasons.append("Great value redemption")
-        elif reward['points'] < 2000:
-            score += 10
-            reasons.append("Good value for points")
-
-        # Stock urgency
-        if reward['stock'] < 30:
-            score += 10
-            reasons.append("Limited availability")
-
-        recommendations.append({
-            'reward': reward,
-            'score': score,
-            'reasons': reasons
-        })
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="bootstrap") as pool:
+        customer_future = pool.submit(run_with_ctx, fetch_customer_data)
+        transactions_future = pool.submit(run_with_ctx, fetch_transactions)
+        customer_data = customer_future.result()
+        transactions_data = transactions_future.result()
 
-    # Sort by score
-    recommendations.sort(key=lambda x: x['score'], reverse=True)
-    return recommendations[:5], patterns
+    patterns = analyze_purchase_patterns(transactions_data) if transactions_data else {}
+    bootstrap_ms = (time.perf_counter() - started) * 1000
+    return customer_data, transactions_data, patterns, bootstrap_ms
 
 # Page configuration
 st.set_page_config(
@@ -280,13 +248,13 @@ st.markdown("""
 
 # Initialize session state with API data
 if 'member' not in st.session_state:
-    # Fetch real data from API
-    customer_data = fetch_customer_data()
-    transactions_data = fetch_transactions()
+    # Fetch real data from API (balance and transactions in parallel)
+    customer_data, transactions_data, patterns, bootstrap_ms = bootstrap_session()
+    st.session_state.transactions_data = transactions_data
+    st.session_state.perf = {'bootstrap_ms': bootstrap_ms}
 
     if customer_data:
         # Calculate tier based on total spent
-        patterns = analyze_purchase_patterns(transactions_data) if transactions_data else {}
         total_spent = patterns.get('total_spent', 0)
 
         if total_spent >= 2000:
@@ -325,10 +293,6 @@ if 'member' not in st.session_state:
             'redeemed_rewards': []
         }
 
-# Store transactions in session state
-if 'transactions_data' not in st.session_state:
-    st.session_state.transactions_data = fetch_transactions()
-
 if 'cart' not in st.session_state:
     st.session_state.cart = []
 
@@ -380,24 +344,18 @@ TIERS = {
     }
 }
 
-# Sample reward catalog with dollar values
-REWARDS_CATALOG = [
-    {'id': 1, 'name': '$10 Store Gift Card', 'category': 'Gift Cards', 'points': 500, 'value': 10.00, 'image': '🎁', 'tier_exclusive': None, 'stock': 100},
-    {'id': 2, 'name': '$25 Store Gift Card', 'category': 'Gift Cards', 'points': 1200, 'value': 25.00, 'image': '🎁', 'tier_exclusive': None, 'stock': 75},
-    {'id': 3, 'name': '$50 Store Gift Card', 'category': 'Gift Cards', 'points': 2300, 'value': 50.00, 'image': '🎁', 'tier_exclusive': None, 'stock': 50},
-    {'id': 4, 'name': 'Premium Headphones', 'category': 'Merchandise', 'points': 5000, 'value': 149.99, 'image': '🎧', 'tier_exclusive': None, 'stock': 25},
-    {'id': 5, 'name': 'Wireless Charger', 'category': 'Merchandise', 'points': 1500, 'value': 39.99, 'image': '🔌', 'tier_exclusive': None, 'stock': 60},
-    {'id': 6, 'name': 'Smart Watch Band', 'category': 'Merchandise', 'points': 800, 'value': 24.99, 'image': '⌚', 'tier_exclusive': None, 'stock': 80},
-    {'id': 7, 'name': 'VIP Shopping Experience', 'category': 'Experiences', 'points': 3500, 'value': 150.00, 'image': '👔', 'tier_exclusive': 'Platinum', 'stock': 10},
-    {'id': 8, 'name': 'Personal Styling Session', 'category': 'Experiences', 'points': 2000, 'value': 75.00, 'image': '✨', 'tier_exclusive': 'Silver', 'stock': 20},
-    {'id': 9, 'name': 'Streaming Subscription (1 month)', 'category': 'Digital', 'points': 600, 'value': 15.99, 'image': '📺', 'tier_exclusive': None, 'stock': 200},
-    {'id': 10, 'name': 'E-Book Bundle', 'category': 'Digital', 'points': 400, 'value': 12.99, 'image': '📚', 'tier_exclusive': None, 'stock': 150},
-    {'id': 11, 'name': '20% Off Coupon', 'category': 'Discounts', 'points': 300, 'value': 20.00, 'image': '🏷️', 'tier_exclusive': None, 'stock': 500},
-    {'id': 12, 'name': 'Free Express Shipping (3 uses)', 'category': 'Discounts', 'points': 450, 'value': 29.97, 'image': '🚚', 'tier_exclusive': None, 'stock': 300},
-    {'id': 13, 'name': 'Charity Donation - $10', 'category': 'Charitable', 'points': 500, 'value': 10.00, 'image': '💝', 'tier_exclusive': None, 'stock': 999},
-    {'id': 14, 'name': 'Limited Edition Tote Bag', 'category': 'Merchandise', 'points': 1800, 'value': 45.00, 'image': '👜', 'tier_exclusive': None, 'stock': 30, 'limited': True},
-    {'id': 15, 'name': 'Exclusive Member Event Access', 'category': 'Experiences', 'points': 4000, 'value': 200.00, 'image': '🎉', 'tier_exclusive': 'Platinum', 'stock': 15},
-]
+# Page sizes offered on Transaction History
+TRANSACTION_PAGE_SIZES = [10, 25, 50, 100]
+
+# Most chat messages kept on screen (the advisor's own context is bounded separately)
+CHAT_HISTORY_LIMIT = 100
+
+# Most audit entries and feedback kept in the session; the full trail is in the audit store
+SESSION_AUDIT_LIMIT = 200
+AUDIT_PAGE_SIZES = [25, 50, 100]
+
+# Windows offered for the fairness metrics, in seconds
+FAIRNESS_WINDOWS = {"Last hour": 3600, "Last 24 hours": 86400, "Last 30 days": 30 * 86400}
 
 # Sample challenges
 CHALLENGES = [
@@ -421,16 +379,6 @@ ALL_BADGES = {
     'Loyal Member': {'icon': '💎', 'description': '1 year membership anniversary'},
 }
 
-# Content guardrails - blocked topics and patterns
-BLOCKED_PATTERNS = [
-    'personal financial advice',
-    'investment advice',
-    'medical advice',
-    'legal advice',
-    'discriminat',
-    'hate speech',
-]
-
 RESPONSIBLE_AI_PRINCIPLES = [
     {"name": "Transparency", "icon": "🔍", "description": "We clearly disclose when AI is being used and how it influences recommendations."},
     {"name": "Fairness", "icon": "⚖️", "description": "Our AI treats all members equitably regardless of demographics or background."},
@@ -449,14 +397,6 @@ def render_ai_transparency_banner():
     You can disable AI personalization in your preferences.
     """)
 
-def check_content_safety(text):
-    """Check if content passes safety guardrails"""
-    text_lower = text.lower()
-    for pattern in BLOCKED_PATTERNS:
-        if pattern in text_lower:
-            return False, f"Content flagged for review: {pattern}"
-    return True, "Content passed safety check"
-
 def get_recommendation_explanation(reward, member):
     """Generate explainable reasoning for a recommendation"""
     reasons = []
@@ -491,41 +431,46 @@ def get_recommendation_explanation(reward, member):
 
     return reasons
 
-def log_ai_interaction(interaction_type, input_text, output_text, was_filtered=False):
+def log_ai_interaction(interaction_type, input_text, output_text, was_filtered=False,
+                       ttft_ms=None, latency_ms=None, usage=None):
     """Log AI interaction for audit trail"""
     from datetime import datetime
-    st.session_state.ai_interactions.append({
+    entry = {
         'timestamp': datetime.now().isoformat(),
         'type': interaction_type,
         'input': input_text[:100] + '...' if len(input_text) > 100 else input_text,
         'output_length': len(output_text),
         'was_filtered': was_filtered,
-        'member_tier': st.session_state.member['tier']
+        'member_tier': st.session_state.member['tier'],
+        'ttft_ms': round(ttft_ms, 1) if ttft_ms is not None else None,
+        'latency_ms': round(latency_ms, 1) if latency_ms is not None else None,
+        **(usage or {})
+    }
+    record_audit_event(interaction_type, entry, st.session_state.ai_interactions)
+
+def record_audit_event(event_type, entry, session_list=None):
+    """Write an entry to the audit store and fairness rollup, keeping the newest SESSION_AUDIT_LIMIT in the session"""
+    rollup = get_fairness_rollup()
+    ts = time.time()
+    rollup.record(event_type, entry, ts)
+    get_audit_store().append(event_type, entry, member_id=st.session_state.member['id'], ts=ts)
+    if session_list is not None:
+        session_list.append(entry)
+        del session_list[:-SESSION_AUDIT_LIMIT]
+
+def log_redemption(reward, success):
+    """Log a redemption attempt for the redemption success-rate metrics"""
+    record_audit_event('redemption', {
+        'timestamp': datetime.now().isoformat(),
+        'member_tier': st.session_state.member['tier'],
+        'reward': reward['name'],
+        'points': reward['points'],
+        'success': success
     })
 
-def calculate_fairness_metrics():
-    """Calculate fairness metrics for AI recommendations"""
-    # Simulated fairness data across tiers
-    return {
-        'recommendation_distribution': {
-            'Gold': {'count': 145, 'avg_points': 850},
-            'Silver': {'count': 132, 'avg_points': 1200},
-            'Platinum': {'count': 98, 'avg_points': 2100}
-        },
-        'redemption_success_rate': {
-            'Gold': 0.72,
-            'Silver': 0.78,
-            'Platinum': 0.85
-        },
-        'response_time_ms': {
-            'Gold': 245,
-            'Silver': 238,
-            'Platinum': 241
-        },
-        'fairness_score': 0.94,
-        'bias_flags': 0,
-        'total_interactions': 375
-    }
+def calculate_fairness_metrics(window_seconds=FAIRNESS_WINDOWS["Last 24 hours"]):
+    """Calculate fairness metrics for AI recommendations over a recent window"""
+    return get_fairness_rollup().metrics(list(TIERS), window_seconds)
 
 def get_tier_badge_html(tier):
     """Generate HTML for tier badge"""
@@ -545,6 +490,29 @@ def calculate_next_tier_progress(member):
     else:
         return 100, 0
 
+def format_freshness(age_seconds):
+    """Describe how old a cached API value is"""
+    if age_seconds < 1:
+        return "just now"
+    if age_seconds < 60:
+        return f"updated {age_seconds:.0f}s ago"
+    return f"updated {age_seconds / 60:.0f}m ago"
+
+def format_ms(value):
+    """Milliseconds for display, or a dash when there is no value yet"""
+    return f"{value:.0f}ms" if value is not None else "—"
+
+@fragment(run_every=SIDEBAR_BALANCE_REFRESH_SECONDS or None)
+def render_sidebar_balance():
+    """Render the live points balance (refreshes on its own timer)"""
+    member = st.session_state.member
+    api_data, balance_age = fetch_customer_data.with_age()
+    live_points = api_data.get('pointsBalance', member['points']) if api_data else member['points']
+    st.metric("Available Points", f"{live_points:,}")
+    st.caption(f"Live balance from API · {format_freshness(balance_age)}")
+    if any(b['state'] == 'open' for b in get_client(API_BASE_URL).breaker_stats()):
+        st.warning("Rewards service unavailable. Showing your last saved data.")
+
 def render_sidebar():
     """Render the sidebar with member info"""
     member = st.session_state.member
@@ -560,10 +528,8 @@ def render_sidebar():
     st.sidebar.markdown("---")
 
     # Points display - fetch live from API
-    api_data = fetch_customer_data()
-    live_points = api_data.get('pointsBalance', member['points']) if api_data else member['points']
-    st.sidebar.metric("Available Points", f"{live_points:,}")
-    st.sidebar.caption("Live balance from API")
+    with st.sidebar:
+        render_sidebar_balance()
 
     # Tier progress
     progress, remaining = calculate_next_tier_progress(member)
@@ -591,9 +557,13 @@ def render_sidebar():
 
 def render_dashboard():
     """Render the main dashboard"""
-    member = st.session_state.member
-
     st.title("Your Rewards Dashboard")
+    render_dashboard_body()
+
+@fragment
+def render_dashboard_body():
+    """Render dashboard metrics, activity and recommendations"""
+    member = st.session_state.member
 
     # Top metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -601,11 +571,11 @@ def render_dashboard():
     redemption_stats = st.session_state.redemption_stats
 
     # Fetch live balance from API
-    api_balance = fetch_customer_data()
+    api_balance, balance_age = fetch_customer_data.with_age()
     live_points = api_balance.get('pointsBalance', member['points']) if api_balance else member['points']
 
     with col1:
-        st.metric("Points Balance", f"{live_points:,}", "Live from API")
+        st.metric("Points Balance", f"{live_points:,}", f"Live from API · {format_freshness(balance_age)}")
     with col2:
         st.metric("Total Value Redeemed", f"${redemption_stats['total_value_redeemed']:,.2f}", f"{redemption_stats['total_redemptions']} items")
     with col3:
@@ -626,23 +596,27 @@ def render_dashboard():
 
     with col2:
         st.subheader("Points Activity (Last 30 Days)")
-        # Sample activity data
-        dates = pd.date_range(end=datetime.now(), periods=30, freq='D')
-        points_data = pd.DataFrame({
-            'Date': dates,
-            'Points': [random.randint(0, 200) for _ in range(30)]
-        })
-        fig = px.area(points_data, x='Date', y='Points',
-                      color_discrete_sequence=['#667eea'])
-        fig.update_layout(height=250, margin=dict(l=0, r=0, t=0, b=0))
-        st.plotly_chart(fig, use_container_width=True)
+        # Sample activity data, charted once per session so reruns don't rebuild it
+        if 'points_activity_chart' not in st.session_state:
+            points_data = pd.DataFrame({
+                'Date': pd.date_range(end=datetime.now(), periods=30, freq='D'),
+                'Points': [random.randint(0, 200) for _ in range(30)]
+            })
+            fig = px.area(points_data, x='Date', y='Points',
+                          color_discrete_sequence=['#667eea'])
+            fig.update_layout(height=250, margin=dict(l=0, r=0, t=0, b=0))
+            st.session_state.points_activity_chart = fig
+        st.plotly_chart(st.session_state.points_activity_chart, use_container_width=True)
 
     st.markdown("---")
 
     # Personalized recommendations
     st.subheader("Recommended For You")
     rec_cols = st.columns(4)
-    recommended = random.sample(REWARDS_CATALOG[:10], 4)
+    # Picked once per session so a Quick Redeem click finds its card on rerun
+    if 'dashboard_picks' not in st.session_state:
+        st.session_state.dashboard_picks = random.sample(REWARDS_CATALOG[:10], 4)
+    recommended = st.session_state.dashboard_picks
 
     for i, reward in enumerate(recommended):
         with rec_cols[i]:
@@ -664,6 +638,7 @@ def render_dashboard():
                         reward['category'],
                         reward_value
                     )
+                    log_redemption(reward, success)
                     if success:
                         st.session_state.member['points'] -= reward['points']
                         st.session_state.member['redeemed_rewards'].append(reward)
@@ -678,7 +653,7 @@ def render_dashboard():
                             'timestamp': datetime.now().isoformat()
                         })
                         st.success(f"Redeemed {reward['name']} (${reward_value:.2f})! Saved to your account.")
-                        st.rerun()
+                        rerun_after_redemption()
                     else:
                         st.error(f"Redemption failed: {result}")
                 else:
@@ -686,9 +661,14 @@ def render_dashboard():
 
 def render_rewards_catalog():
     """Render the rewards catalog"""
+    st.title("Rewards Catalog")
+    render_catalog_body()
+
+@fragment
+def render_catalog_body():
+    """Render the points header, filters and reward grid"""
     member = st.session_state.member
 
-    st.title("Rewards Catalog")
     st.markdown(f"You have **{member['points']:,} points** available to redeem")
 
     # Filters
@@ -703,22 +683,10 @@ def render_rewards_catalog():
     with col3:
         affordable_only = st.checkbox("Affordable", value=False)
 
-    # Filter rewards
-    filtered_rewards = REWARDS_CATALOG.copy()
-
-    if category_filter != "All Categories":
-        filtered_rewards = [r for r in filtered_rewards if r['category'] == category_filter]
-
-    if affordable_only:
-        filtered_rewards = [r for r in filtered_rewards if r['points'] <= member['points']]
-
-    # Sort
-    if sort_by == "Points: Low to High":
-        filtered_rewards.sort(key=lambda x: x['points'])
-    elif sort_by == "Points: High to Low":
-        filtered_rewards.sort(key=lambda x: x['points'], reverse=True)
-    else:
-        filtered_rewards.sort(key=lambda x: x['name'])
+    # Filter and sort rewards from the pre-sorted catalog index
+    filtered_rewards = get_catalog_index(REWARDS_CATALOG).view(
+        category_filter, sort_by, affordable_only, member['points']
+    )
 
     st.markdown("---")
 
@@ -782,6 +750,7 @@ def render_rewards_catalog():
                             reward['category'],
                             reward_value
                         )
+                        log_redemption(reward, success)
                         if success:
                             st.session_state.member['points'] -= reward['points']
                             st.session_state.member['redeemed_rewards'].append(reward)
@@ -797,7 +766,7 @@ def render_rewards_catalog():
                             })
                             st.success(f"Successfully redeemed {reward['name']} (${reward_value:.2f})! Saved to your account.")
                             st.balloons()
-                            st.rerun()
+                            rerun_after_redemption()
                         else:
                             st.error(f"Redemption failed: {result}")
 
@@ -848,16 +817,9 @@ def render_badges():
             </div>
             """, unsafe_allow_html=True)
 
-def render_challenges():
-    """Render challenges page"""
-    st.title("Challenges & Quests")
-    st.markdown("Complete challenges to earn bonus points!")
-
-    st.markdown("---")
-
-    # Active challenges
-    st.subheader("Active Challenges")
-
+@fragment
+def render_active_challenges():
+    """Render the active challenge cards and their claim buttons"""
     for challenge in CHALLENGES:
         progress_pct = (challenge['progress'] / challenge['target']) * 100
 
@@ -880,10 +842,21 @@ def render_challenges():
                 if st.button("Claim Reward!", key=f"challenge_{challenge['id']}"):
                     st.session_state.member['points'] += challenge['points']
                     st.success(f"+{challenge['points']} points!")
-                    st.rerun()
+                    rerun_fragment()
             else:
                 st.button("In Progress", disabled=True, key=f"challenge_{challenge['id']}")
 
+def render_challenges():
+    """Render challenges page"""
+    st.title("Challenges & Quests")
+    st.markdown("Complete challenges to earn bonus points!")
+
+    st.markdown("---")
+
+    # Active challenges
+    st.subheader("Active Challenges")
+    render_active_challenges()
+
     st.markdown("---")
 
     # Streak bonus
@@ -902,6 +875,43 @@ def render_challenges():
     st.progress(streak_progress / 100)
     st.caption(f"{14 - streak} days until streak bonus")
 
+def add_chat_message(role, content):
+    """Show a chat message (keeping the newest CHAT_HISTORY_LIMIT) and add it to the advisor context"""
+    message_id = st.session_state.get('message_seq', 0)
+    st.session_state.message_seq = message_id + 1
+    st.session_state.messages.append({"role": role, "content": content, "id": message_id})
+    del st.session_state.messages[:-CHAT_HISTORY_LIMIT]
+    st.session_state.advisor_context.add(role, content)
+
+@fragment
+def render_feedback_buttons(idx):
+    """Render the feedback buttons under one assistant message"""
+    feedback_col1, feedback_col2, feedback_col3 = st.columns([1, 1, 4])
+    with feedback_col1:
+        if st.button("👍", key=f"thumbs_up_{idx}", help="This was helpful"):
+            record_audit_event('feedback', {
+                'message_idx': idx,
+                'feedback': 'positive',
+                'timestamp': datetime.now().isoformat()
+            }, st.session_state.ai_feedback)
+            st.toast("Thanks for your feedback!")
+    with feedback_col2:
+        if st.button("👎", key=f"thumbs_down_{idx}", help="This wasn't helpful"):
+            record_audit_event('feedback', {
+                'message_idx': idx,
+                'feedback': 'negative',
+                'timestamp': datetime.now().isoformat()
+            }, st.session_state.ai_feedback)
+            st.toast("Thanks for your feedback! We'll improve.")
+    with feedback_col3:
+        if st.button("🚩 Report", key=f"report_{idx}", help="Report inappropriate content"):
+            record_audit_event('feedback', {
+                'message_idx': idx,
+                'feedback': 'reported',
+                'timestamp': datetime.now().isoformat()
+            }, st.session_state.ai_feedback)
+            st.warning("Content reported for review. Thank you!")
+
 def render_ai_advisor():
     """Render AI advisor page with Responsible AI features"""
     st.title("AI Rewards Advisor")
@@ -928,6 +938,7 @@ def render_ai_advisor():
 
             if st.button("Clear My AI History"):
                 st.session_state.messages = []
+                st.session_state.pop('advisor_context', None)
                 st.session_state.ai_interactions = []
                 st.success("AI history cleared!")
 
@@ -979,46 +990,24 @@ def render_ai_advisor():
 
         if 'messages' not in st.session_state:
             st.session_state.messages = []
+        if 'advisor_context' not in st.session_state:
+            st.session_state.advisor_context = ConversationContext()
 
         # Display chat history with feedback buttons
-        for idx, message in enumerate(st.session_state.messages):
+        for message in st.session_state.messages:
             with st.chat_message(message["role"]):
                 st.markdown(message["content"])
 
                 # Add feedback buttons for assistant messages
                 if message["role"] == "assistant":
-                    feedback_col1, feedback_col2, feedback_col3 = st.columns([1, 1, 4])
-                    with feedback_col1:
-                        if st.button("👍", key=f"thumbs_up_{idx}", help="This was helpful"):
-                            st.session_state.ai_feedback.append({
-                                'message_idx': idx,
-                                'feedback': 'positive',
-                                'timestamp': datetime.now().isoformat()
-                            })
-                            st.toast("Thanks for your feedback!")
-                    with feedback_col2:
-                        if st.button("👎", key=f"thumbs_down_{idx}", help="This wasn't helpful"):
-                            st.session_state.ai_feedback.append({
-                                'message_idx': idx,
-                                'feedback': 'negative',
-                                'timestamp': datetime.now().isoformat()
-                            })
-                            st.toast("Thanks for your feedback! We'll improve.")
-                    with feedback_col3:
-                        if st.button("🚩 Report", key=f"report_{idx}", help="Report inappropriate content"):
-                            st.session_state.ai_feedback.append({
-                                'message_idx': idx,
-                                'feedback': 'reported',
-                                'timestamp': datetime.now().isoformat()
-                            })
-                            st.warning("Content reported for review. Thank you!")
+                    render_feedback_buttons(message["id"])
 
         # Chat input
         if prompt := st.chat_input("Ask about your rewards..."):
             # Content safety check on input
             is_safe, safety_message = check_content_safety(prompt)
 
-            st.session_state.messages.append({"role": "user", "content": prompt})
+            add_chat_message("user", prompt)
 
             with st.chat_message("user"):
                 st.markdown(prompt)
@@ -1027,84 +1016,105 @@ def render_ai_advisor():
             transactions_data = st.session_state.get('transactions_data', [])
             patterns = analyze_purchase_patterns(transactions_data)
 
-            # Build recent purchases string
-            recent_purchases = ""
-            if transactions_data:
-                for tx in transactions_data[:5]:
-                    recent_purchases += f"- {tx.get('productName', 'Item')} (${tx.get('purchaseAmount', 0):.2f}, {tx.get('category', 'Other')})\n"
-
             # Get personalized recommendations
             recommendations, _ = get_personalized_recommendations(transactions_data, REWARDS_CATALOG, member['points'])
-            rec_text = ""
-            for rec in recommendations[:3]:
-                rec_text += f"- {rec['reward']['name']} ({rec['reward']['points']:,} pts): {', '.join(rec['reasons'][:2])}\n"
-
-            # Build context for AI with responsible AI guidelines and purchase history
-            context = f"""You are an AI rewards advisor for OmniShop loyalty program.
-
-            RESPONSIBLE AI GUIDELINES:
-            - Never provide personal financial, investment, medical, or legal advice
-            - Treat all members fairly regardless of their tier status
-            - Be transparent about limitations of your recommendations
-            - If unsure, acknowledge uncertainty rather than guessing
-            - Keep responses focused on the rewards program only
-            - Be inclusive and respectful in all responses
-
-            Current member info:
-            - Name: {member['name']}
-            - Tier: {member['tier']}
-            - Points Balance: {member['points']:,}
-            - Total Spent: ${member['annual_spend']:.2f}
-            - Streak: {member['streak_days']} days
-
-            PURCHASE HISTORY ANALYSIS:
-            - Total Transactions: {patterns.get('total_transactions', 0)}
-            - Total Points Earned: {patterns.get('total_points_earned', 0):,}
-            - Favorite Category: {patterns.get('favorite_category', 'Unknown')}
-            - Top Categories: {', '.join([f"{cat} ({count})" for cat, count in patterns.get('top_categories', [])[:3]])}
-
-            Recent Purchases:
-            {recent_purchases}
-
-            PERSONALIZED REWARD RECOMMENDATIONS (based on purchase history):
-            {rec_text}
-
-            Tier thresholds: Gold ($0-499), Silver ($500-1999), Platinum ($2000+)
-            Earning rates: Gold 1x, Silver 1.25x, Platinum 1.5x
-
-            Use the purchase history to make personalized recommendations.
-            Reference specific past purchases when suggesting rewards.
-            Help them maximize their rewards experience. Be friendly and helpful.
-            Always explain WHY you're making a recommendation based on their shopping behavior."""
+            record_audit_event('recommendation', {
+                'timestamp': datetime.now().isoformat(),
+                'member_tier': member['tier'],
+                'count': len(recommendations),
+                'points': sum(rec['reward']['points'] for rec in recommendations)
+            })
 
-            try:
-                import anthropic
-                client = anthropic.Anthropic(api_key=api_key)
+            # Guidelines and the program reference are prompt-cached; only the member block changes per turn
+            context = st.session_state.advisor_context
+            program_reference = build_program_reference(TIERS, REWARDS_CATALOG, CHALLENGES, ALL_BADGES,
+                                                        RESPONSIBLE_AI_PRINCIPLES)
+            system = build_system_blocks(
+                build_member_context(member, patterns, transactions_data, recommendations),
+                context.summary,
+                program_reference
+            )
 
-                with st.chat_message("assistant"):
-                    response = client.messages.create(
-                        model="claude-sonnet-4-20250514",
-                        max_tokens=500,
-                        system=context,
-                        messages=[{"role": m["role"], "content": m["content"]}
-                                  for m in st.session_state.messages]
-                    )
-                    assistant_message = response.content[0].text
+            # An opening question doesn't depend on chat history, so it is answered from the
+            # bucketed member state only (tier, points bucket, favorite category) and that
+            # answer is shared by every member in the bucket
+            response_cache = get_response_cache()
+            cache_key = None
+            cached_answer = None
+            if context.total_messages == 1:
+                tier, bucket, favorite_category = member_fingerprint(member, patterns)
+                system = build_system_blocks(
+                    build_bucketed_member_context(tier, points_range(bucket), favorite_category),
+                    program_reference=program_reference
+                )
+                cache_key = response_cache_key(prompt, prompt_fingerprint(ADVISOR_MODEL, system))
+                cached_answer = response_cache.get(cache_key)
 
-                    # Content safety check on output
-                    output_safe, output_message = check_content_safety(assistant_message)
+            try:
+                with st.chat_message("assistant"):
+                    placeholder = st.empty()
+                    started = time.perf_counter()
+                    ttft_ms = None
+                    if cached_answer is not None:
+                        # Cached answers get the same safety check and audit entry as fresh ones
+                        output_safe, _ = check_content_safety(cached_answer)
+                        reply_text = cached_answer
+                        usage = turn_usage(None)
+                        ttft_ms = (time.perf_counter() - started) * 1000
+                    else:
+                        client = get_anthropic_client(api_key)
+                        # Content safety check on output, applied as the reply streams in
+                        checker = StreamingSafetyChecker()
+                        # Wait for a free LLM slot (round-robin across members, within budget)
+                        with get_llm_scheduler().slot(member['id'], member['tier']) as ticket:
+                            observe('llm.queue_wait', ticket.wait_ms, tier=member['tier'])
+                            with span('anthropic.messages', model=ADVISOR_MODEL), client.messages.stream(
+                                model=ADVISOR_MODEL,
+                                max_tokens=ADVISOR_MAX_TOKENS,
+                                system=system,
+                                messages=context.messages()
+                            ) as stream:
+                                received = []
+                                for text in stream.text_stream:
+                                    received.append(text)
+                                    if ttft_ms is None:
+                                        ttft_ms = (time.perf_counter() - started) * 1000
+                                        observe('advisor.first_token', ttft_ms, model=ADVISOR_MODEL)
+                                    if not checker.feed(text):
+                                        # Leaving the stream closes the connection and stops generation
+                                        break
+                                    placeholder.markdown(checker.safe_text + "▌")
+                                # A reply cut off by the safety check has no final output count yet
+                                snapshot = stream.current_message_snapshot
+                                usage = turn_usage(snapshot.usage,
+                                                   partial_text=None if snapshot.stop_reason else ''.join(received))
+                            ticket.charge(sum(usage.values()))
+                        record_usage(usage)
+                        output_safe, reply_text = checker.is_safe, checker.text
+                    latency_ms = (time.perf_counter() - started) * 1000
+                    usage = dict(usage, context_tokens=context.stats()['context_tokens'],
+                                 cached_response=cached_answer is not None)
 
                     if output_safe:
-                        st.markdown(assistant_message)
-                        log_ai_interaction("chat", prompt, assistant_message, was_filtered=False)
+                        assistant_message = reply_text
+                        placeholder.markdown(assistant_message)
+                        log_ai_interaction("chat", prompt, assistant_message, was_filtered=False,
+                                           ttft_ms=ttft_ms, latency_ms=latency_ms, usage=usage)
+                        if cache_key is not None and cached_answer is None:
+                            response_cache.set(cache_key, assistant_message)
                     else:
                         filtered_response = "I apologize, but I can't provide that type of advice. Let me help you with your rewards questions instead. What would you like to know about earning or redeeming points?"
-                        st.markdown(filtered_response)
-                        log_ai_interaction("chat", prompt, filtered_response, was_filtered=True)
+                        placeholder.markdown(filtered_response)
+                        log_ai_interaction("chat", prompt, filtered_response, was_filtered=True,
+                                           ttft_ms=ttft_ms, latency_ms=latency_ms, usage=usage)
                         assistant_message = filtered_response
 
-                st.session_state.messages.append({"role": "assistant", "content": assistant_message})
+                add_chat_message("assistant", assistant_message)
 
+            except TokenBudgetExceeded as e:
+                st.warning(f"You've reached your AI advisor limit for now. Try again in {e.retry_in / 60:.0f} minutes.")
+            except QueueTimeout:
+                st.warning("The AI advisor is busy right now. Please try again in a moment.")
             except Exception as e:
                 st.error(f"Error connecting to AI: {str(e)}")
 
@@ -1114,42 +1124,28 @@ def render_transaction_history():
 
     member = st.session_state.member
 
-    # Fetch real transactions from API
+    # Fetch real transactions from API (only rows newer than the last sync)
+    if st.button("🔄 Full Resync", help="Re-download your complete transaction history"):
+        st.session_state.transactions_data = resync_transactions()
+    else:
+        st.session_state.transactions_data = fetch_transactions() or st.session_state.get('transactions_data')
     api_transactions = st.session_state.get('transactions_data', [])
 
     if api_transactions:
         st.success(f"Showing {len(api_transactions)} transactions from your account")
-
-        # Convert API data to display format
-        transactions = []
-        running_balance = member['points']
-
-        for tx in reversed(api_transactions):  # Most recent first
-            transactions.append({
-                'date': tx.get('timestamp', '')[:10] if tx.get('timestamp') else 'N/A',
-                'type': 'Earned',
-                'description': tx.get('productName', 'Purchase'),
-                'category': tx.get('category', 'Other'),
-                'amount': tx.get('purchaseAmount', 0),
-                'points': tx.get('points', 0),
-                'balance': running_balance
-            })
-            running_balance -= tx.get('points', 0)
-
-        transactions.reverse()  # Back to chronological order
     else:
         st.warning("Unable to fetch transactions from API. Showing sample data.")
-        transactions = [
-            {'date': '2026-01-13', 'type': 'Earned', 'description': 'Purchase', 'category': 'Electronics', 'amount': 100, 'points': 150, 'balance': 18574},
+        api_transactions = [
+            {'timestamp': '2026-01-13', 'productName': 'Purchase', 'category': 'Electronics', 'purchaseAmount': 100, 'points': 150},
         ]
 
-    # Summary metrics - handle None values
-    total_earned = sum(tx.get('points', 0) or 0 for tx in transactions)
-    total_spent = sum(tx.get('amount', 0) or 0 for tx in transactions)
+    # Pre-sorted paging index, built once per sync
+    history = get_history_index(api_transactions)
+    total_spent, total_earned = history.columns.totals()
 
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Total Transactions", len(transactions))
+        st.metric("Total Transactions", len(api_transactions))
     with col2:
         st.metric("Points Earned", f"{total_earned:,}")
     with col3:
@@ -1160,29 +1156,45 @@ def render_transaction_history():
     st.markdown("---")
 
     # Filter options
-    col1, col2 = st.columns(2)
+    col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
     with col1:
-        categories = ['All'] + list(set(tx.get('category', 'Other') for tx in transactions))
-        category_filter = st.selectbox("Category", categories)
+        category_filter = st.selectbox("Category", ['All'] + history.categories)
     with col2:
-        sort_order = st.selectbox("Sort By", ["Newest First", "Oldest First", "Highest Points", "Highest Amount"])
-
-    # Filter and sort
-    filtered_tx = transactions.copy()
-    if category_filter != "All":
-        filtered_tx = [tx for tx in filtered_tx if tx.get('category') == category_filter]
-
-    if sort_order == "Newest First":
-        filtered_tx.reverse()
-    elif sort_order == "Highest Points":
-        filtered_tx.sort(key=lambda x: x.get('points', 0) or 0, reverse=True)
-    elif sort_order == "Highest Amount":
-        filtered_tx.sort(key=lambda x: x.get('amount', 0) or 0, reverse=True)
+        sort_order = st.selectbox("Sort By", list(HISTORY_SORTS))
+    with col3:
+        page_size = st.selectbox("Per Page", TRANSACTION_PAGE_SIZES, index=1)
+    with col4:
+        compact = st.toggle("Compact", value=False, help="Show this page as a table")
+
+    # Only the requested page is sliced from the index and rendered
+    _, matching = history.page(category_filter, sort_order, 1, page_size)
+    page_count = max(1, -(-matching // page_size))
+    page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1)
+    indices, _ = history.page(category_filter, sort_order, page, page_size)
+    balances = history.balances(indices, member['points']).tolist()
+
+    page_tx = []
+    for i, balance in zip(indices.tolist(), balances):
+        tx = api_transactions[i]
+        page_tx.append({
+            'date': tx.get('timestamp', '')[:10] if tx.get('timestamp') else 'N/A',
+            'type': 'Earned',
+            'description': tx.get('productName', 'Purchase'),
+            'category': tx.get('category', 'Other'),
+            'amount': tx.get('purchaseAmount', 0),
+            'points': tx.get('points', 0),
+            'balance': balance
+        })
 
+    st.caption(f"Showing {len(page_tx)} of {matching:,} transactions")
     st.markdown("---")
 
+    if compact:
+        st.dataframe(pd.DataFrame(page_tx), use_container_width=True, hide_index=True)
+        return
+
     # Display transactions
-    for tx in filtered_tx:
+    for tx in page_tx:
         with st.container(border=True):
             col1, col2, col3, col4 = st.columns([2, 3, 1, 1])
             with col1:
@@ -1218,17 +1230,24 @@ def render_responsible_ai():
 
     # Fairness Metrics
     st.subheader("Fairness Metrics")
-    metrics = calculate_fairness_metrics()
+    window = st.selectbox("Window", list(FAIRNESS_WINDOWS), index=1, key="fairness_window")
+    # Summed from time-bucketed rollups, so this costs the same however many events were logged
+    metrics = calculate_fairness_metrics(FAIRNESS_WINDOWS[window])
+    last_hour = calculate_fairness_metrics(FAIRNESS_WINDOWS["Last hour"])
 
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("Fairness Score", f"{metrics['fairness_score']:.0%}", "+2%")
+        score = metrics['fairness_score']
+        st.metric("Fairness Score", f"{score:.0%}" if score is not None else "—",
+                  help="Lowest tier redemption success rate as a share of the highest")
     with col2:
-        st.metric("Total Interactions", metrics['total_interactions'], "+45 today")
+        st.metric("Total Interactions", metrics['total_interactions'],
+                  f"+{last_hour['total_interactions']} last hour")
     with col3:
-        st.metric("Bias Flags", metrics['bias_flags'], "0 this week")
+        st.metric("Bias Flags", metrics['bias_flags'],
+                  help="Tiers below 80% of the best success rate or 20% off the mean response time")
     with col4:
-        st.metric("Content Filtered", len([i for i in st.session_state.ai_interactions if i.get('was_filtered')]), "")
+        st.metric("Content Filtered", metrics['content_filtered'])
 
     st.markdown("---")
 
@@ -1257,7 +1276,7 @@ def render_responsible_ai():
         # Success rate by tier
         success_data = pd.DataFrame({
             'Tier': list(metrics['redemption_success_rate'].keys()),
-            'Success Rate': [v * 100 for v in metrics['redemption_success_rate'].values()]
+            'Success Rate': [v * 100 if v is not None else None for v in metrics['redemption_success_rate'].values()]
         })
         fig = px.bar(success_data, x='Tier', y='Success Rate',
                      color='Tier', color_discrete_map={'Gold': '#FFD700', 'Silver': '#C0C0C0', 'Platinum': '#E5E4E2'},
@@ -1272,17 +1291,21 @@ def render_responsible_ai():
     st.markdown("AI response times should be equal across all tiers")
 
     response_times = metrics['response_time_ms']
-    rt_data = pd.DataFrame({
-        'Tier': list(response_times.keys()),
-        'Response Time (ms)': list(response_times.values())
-    })
+    mean_time = metrics['mean_response_time_ms']
 
     col1, col2, col3 = st.columns(3)
-    for idx, (tier, time) in enumerate(response_times.items()):
+    for idx, (tier, tier_time) in enumerate(response_times.items()):
         with [col1, col2, col3][idx]:
-            variance = abs(time - 241) / 241 * 100  # variance from mean
+            if tier_time is None:
+                st.metric(f"{tier} Tier", "—", "no responses yet", delta_color="off")
+                continue
+            if not mean_time:
+                # Every timed chat in the window took 0ms (e.g. all cached answers)
+                st.metric(f"{tier} Tier", f"{tier_time}ms")
+                continue
+            variance = abs(tier_time - mean_time) / mean_time * 100  # variance from mean
             status = "✅" if variance < 5 else "⚠️"
-            st.metric(f"{tier} Tier", f"{time}ms", f"{status} {variance:.1f}% variance")
+            st.metric(f"{tier} Tier", f"{tier_time}ms", f"{status} {variance:.1f}% variance")
 
     st.markdown("---")
 
@@ -1315,13 +1338,8 @@ def render_responsible_ai():
     # AI Interaction Audit Log
     st.subheader("AI Interaction Audit Log")
     st.markdown("All AI interactions are logged for accountability")
-
-    interactions = st.session_state.ai_interactions
-    if interactions:
-        df = pd.DataFrame(interactions)
-        st.dataframe(df, use_container_width=True)
-    else:
-        st.info("No AI interactions logged in this session.")
+    member_id = st.session_state.member['id']
+    render_audit_log(member_id)
 
     st.markdown("---")
 
@@ -1331,17 +1349,18 @@ def render_responsible_ai():
     with st.expander("View Your AI Data", expanded=False):
         st.json({
             'ai_preferences': st.session_state.ai_preferences,
-            'feedback_count': len(st.session_state.ai_feedback),
-            'interaction_count': len(st.session_state.ai_interactions),
+            'feedback_count': get_audit_store().count(member_id=member_id, event_type='feedback'),
+            'interaction_count': get_audit_store().count(member_id=member_id, event_type='chat'),
             'messages_count': len(st.session_state.get('messages', []))
         })
 
         if st.button("Download My Data"):
             import json
+            store = get_audit_store()
             data = {
                 'preferences': st.session_state.ai_preferences,
-                'feedback': st.session_state.ai_feedback,
-                'interactions': st.session_state.ai_interactions
+                'feedback': store.query(member_id=member_id, event_type='feedback', limit=None),
+                'interactions': store.query(member_id=member_id, event_type='chat', limit=None)
             }
             st.download_button(
                 "Download JSON",
@@ -1351,30 +1370,161 @@ def render_responsible_ai():
             )
 
         if st.button("Delete All My AI Data", type="primary"):
+            get_audit_store().delete_member(member_id)
             st.session_state.ai_feedback = []
             st.session_state.ai_interactions = []
             st.session_state.messages = []
+            st.session_state.pop('advisor_context', None)
             st.success("All AI data deleted!")
             st.rerun()
 
+    st.markdown("---")
+
+    render_latency_panel()
+    render_performance_panel()
+
+def render_audit_log(member_id):
+    """Page through the member's audit entries in the audit store"""
+    store = get_audit_store()
+    # Entries logged moments ago may still be queued for the writer
+    store.flush(timeout=2)
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        event_type = st.selectbox("Event Type", ['All', 'chat', 'feedback', 'recommendation', 'redemption'],
+                                  key="audit_type")
+    with col2:
+        page_size = st.selectbox("Per Page", AUDIT_PAGE_SIZES, key="audit_page_size")
+    event_type = None if event_type == 'All' else event_type
+
+    # Only the requested page is read from the store
+    matching = store.count(member_id=member_id, event_type=event_type)
+    if not matching:
+        st.info("No AI interactions logged yet.")
+        return
+    page_count = max(1, -(-matching // page_size))
+    page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1,
+                           key="audit_page")
+    entries = store.query(member_id=member_id, event_type=event_type, limit=page_size,
+                          offset=(page - 1) * page_size)
+    st.dataframe(pd.DataFrame(entries), use_container_width=True, hide_index=True)
+    st.caption(f"Showing {len(entries)} of {matching:,} audit entries")
+
+def render_latency_panel():
+    """Summarize span latencies: loyalty API, Claude, page renders and whole script runs"""
+    with st.expander("⏱️ Latency Breakdown", expanded=False):
+        rows = get_span_registry().summary()
+        if rows:
+            df = pd.DataFrame(rows)
+            for column in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms'):
+                df[column] = df[column].round(1)
+            st.dataframe(df, use_container_width=True, hide_index=True)
+        else:
+            st.info("No timings recorded yet.")
+        st.caption(f"Prometheus metrics: {start_metrics_endpoint()}")
+
+def render_performance_panel():
+    """Render page-load and API connection metrics"""
+    with st.expander("⚙️ Performance & API Health", expanded=False):
+        perf = st.session_state.perf
+        conn = get_client(API_BASE_URL).connection_stats()
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Session Bootstrap", f"{perf['bootstrap_ms']:.0f}ms")
+        with col2:
+            ttfr = perf.get('time_to_first_render_ms')
+            st.metric("Time to First Render", f"{ttfr:.0f}ms" if ttfr is not None else "—")
+        with col3:
+            st.metric("Connection Reuse", f"{conn['reuse_ratio']:.0%}",
+                      f"{conn['reused_connections']}/{conn['requests']} requests")
+
+        st.markdown("**API Circuit Breakers**")
+        breakers = get_client(API_BASE_URL).breaker_stats()
+        if breakers:
+            st.dataframe(pd.DataFrame(breakers), use_container_width=True, hide_index=True)
+        else:
+            st.caption("No API calls made yet.")
+
+        st.markdown("**API Payloads**")
+        transfer = get_client(API_BASE_URL).transfer_stats()
+        if transfer:
+            st.dataframe(pd.DataFrame(transfer), use_container_width=True, hide_index=True)
+
+        st.markdown("**API Fetch Cache**")
+        st.dataframe(pd.DataFrame([
+            {'Fetcher': name, **fetcher.stats()}
+            for name, fetcher in [('customer_data', fetch_customer_data), ('transactions', fetch_transactions)]
+        ]), use_container_width=True, hide_index=True)
+
+        tokens = usage_stats()
+        st.caption(f"AI advisor tokens: {tokens['input_tokens']:,} input, {tokens['cache_read_tokens']:,} cache read "
+                   f"({tokens['cache_hit_rate']:.0%} of prompt), {tokens['cache_write_tokens']:,} cache write, "
+                   f"{tokens['output_tokens']:,} output over {tokens['turns']} turns")
+
+        llm = get_llm_scheduler().stats()
+        st.markdown("**AI Advisor Scheduler**")
+        st.caption(f"{llm['in_flight']}/{llm['max_in_flight']} calls in flight, {llm['queue_depth']} queued "
+                   f"(peak {llm['max_queue_depth']}); wait p50 {format_ms(llm['wait_ms']['p50'])}, "
+                   f"p95 {format_ms(llm['wait_ms']['p95'])}; {llm['budget_rejections']} over budget, "
+                   f"{llm['timeouts']} timed out")
+        tier_latency = get_llm_scheduler().tier_stats()
+        if tier_latency:
+            st.dataframe(pd.DataFrame(tier_latency), use_container_width=True, hide_index=True)
+
+        answers = get_response_cache().stats()
+        st.caption(f"AI response cache ({answers['backend']}): {answers['hits']} hits, {answers['misses']} misses "
+                   f"({answers['hit_rate']:.0%} hit rate), {answers['size']} answers stored, "
+                   f"{answers['expired']} expired, {answers['evictions']} evicted")
+
+        if 'advisor_context' in st.session_state:
+            ctx_stats = st.session_state.advisor_context.stats()
+            st.caption(f"AI advisor context: {ctx_stats['verbatim_messages']} recent messages verbatim, "
+                       f"{ctx_stats['summarized_messages']} summarized, ~{ctx_stats['context_tokens']:,} of "
+                       f"{ctx_stats['budget_tokens']:,} tokens")
+
+        audit = get_audit_store().stats()
+        st.caption(f"AI audit store: {audit['written']:,} entries written in {audit['batches']:,} batches, "
+                   f"{audit['queued']} queued, {audit['segments']} segments ({audit['bytes'] / 1e6:.1f} MB), "
+                   f"{audit['write_errors']} write errors")
+
+        rollup = get_fairness_rollup().stats()
+        st.caption(f"Fairness rollup: {rollup['events']:,} events ({rollup['backfilled']:,} back-filled), "
+                   f"{rollup['minute_buckets']} minute, {rollup['hour_buckets']} hour and "
+                   f"{rollup['day_buckets']} day buckets")
+
+        memo = pattern_cache_stats()
+        st.caption(f"Purchase-pattern memo: {memo['hits']} hits, {memo['misses']} misses, "
+                   f"{memo['size']} cached transaction sets")
+
 # Main app
+PAGE_RENDERERS = {
+    "Dashboard": render_dashboard,
+    "Rewards Catalog": render_rewards_catalog,
+    "My Badges": render_badges,
+    "Challenges": render_challenges,
+    "AI Advisor": render_ai_advisor,
+    "Transaction History": render_transaction_history,
+    "Responsible AI": render_responsible_ai,
+}
+
 def main():
-    page = render_sidebar()
-
-    if page == "Dashboard":
-        render_dashboard()
-    elif page == "Rewards Catalog":
-        render_rewards_catalog()
-    elif page == "My Badges":
-        render_badges()
-    elif page == "Challenges":
-        render_challenges()
-    elif page == "AI Advisor":
-        render_ai_advisor()
-    elif page == "Transaction History":
-        render_transaction_history()
-    elif page == "Responsible AI":
-        render_responsible_ai()
+    start_metrics_endpoint()
+
+    with span('sidebar.render'):
+        page = render_sidebar()
+
+    if page in PAGE_RENDERERS:
+        with span('page.render', page=page):
+            PAGE_RENDERERS[page]()
+
+    # The whole run, including session bootstrap and module-level setup before main()
+    observe('script.run', (time.perf_counter() - RUN_STARTED) * 1000, page=page)
+
+    # Record time-to-first-render once per session
+    perf = st.session_state.perf
+    if 'time_to_first_render_ms' not in perf:
+        perf['time_to_first_render_ms'] = (time.perf_counter() - RUN_STARTED) * 1000
 
 if __name__ == "__main__":
     main()
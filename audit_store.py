@@ -0,0 +1,255 @@
+"""Append-only on-disk audit log for AI interactions and feedback
+
+Events go to rotating SQLite segment files in AUDIT_LOG_DIR. Callers only
+enqueue; a background writer commits them in batches, so logging never
+waits on disk. A segment is closed once it reaches AUDIT_SEGMENT_BYTES and
+the oldest are removed beyond AUDIT_MAX_SEGMENTS (0 keeps them all). Each
+segment is indexed by time, member and event type.
+"""
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+AUDIT_LOG_DIR = os.getenv("AUDIT_LOG_DIR", "audit_log")
+AUDIT_SEGMENT_BYTES = int(os.getenv("AUDIT_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+AUDIT_MAX_SEGMENTS = int(os.getenv("AUDIT_MAX_SEGMENTS", "0"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+
+SEGMENT_PATTERN = re.compile(r"^audit-(\d{6})\.sqlite3$")
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS events ("
+    "id INTEGER PRIMARY KEY, ts REAL NOT NULL, type TEXT NOT NULL, member_id TEXT, payload TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS events_ts ON events (ts)",
+    "CREATE INDEX IF NOT EXISTS events_member_ts ON events (member_id, ts)",
+    "CREATE INDEX IF NOT EXISTS events_type_ts ON events (type, ts)",
+)
+
+
+def _where(member_id, event_type, since, until):
+    clauses, params = [], []
+    if member_id is not None:
+        clauses.append("member_id = ?")
+        params.append(member_id)
+    if event_type is not None:
+        clauses.append("type = ?")
+        params.append(event_type)
+    if since is not None:
+        clauses.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("ts < ?")
+        params.append(until)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+class AuditStore:
+    """Segmented SQLite audit log with a buffered background writer"""
+
+    def __init__(self, directory=AUDIT_LOG_DIR, segment_bytes=AUDIT_SEGMENT_BYTES, max_segments=AUDIT_MAX_SEGMENTS,
+                 flush_interval=AUDIT_FLUSH_INTERVAL, batch_size=AUDIT_BATCH_SIZE):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        os.makedirs(directory, exist_ok=True)
+        # Writer and readers share one lock; SQLite connections are per segment
+        self._lock = threading.Lock()
+        self._segments = self._scan_segments()
+        self._conns = {}
+        if not self._segments:
+            self._segments.append(1)
+        self._queue = queue.Queue()
+        self._stats = {'enqueued': 0, 'written': 0, 'batches': 0, 'rotations': 0, 'write_errors': 0}
+        self.last_error = None
+        self._writer = threading.Thread(target=self._run_writer, daemon=True, name='audit-writer')
+        self._writer.start()
+
+    # Segments
+
+    def _scan_segments(self):
+        numbers = []
+        for name in os.listdir(self.directory):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, f"audit-{number:06d}.sqlite3")
+
+    def _segment_size(self, number):
+        # Recent writes sit in the WAL file until a checkpoint
+        path = self._segment_path(number)
+        return sum(os.path.getsize(path + suffix) for suffix in ('', '-wal') if os.path.exists(path + suffix))
+
+    def _connect(self, number):
+        # Caller holds the lock
+        conn = self._conns.get(number)
+        if conn is None:
+            conn = sqlite3.connect(self._segment_path(number), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            self._conns[number] = conn
+        return conn
+
+    def _rotate_if_full(self):
+        # Caller holds the lock
+        active = self._segments[-1]
+        if self._segment_size(active) < self.segment_bytes:
+            return
+        self._connect(active).execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._segments.append(active + 1)
+        self._stats['rotations'] += 1
+        while self.max_segments and len(self._segments) > self.max_segments:
+            oldest = self._segments.pop(0)
+            conn = self._conns.pop(oldest, None)
+            if conn is not None:
+                conn.close()
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(self._segment_path(oldest) + suffix):
+                    os.remove(self._segment_path(oldest) + suffix)
+
+    # Writing
+
+    def append(self, event_type, payload, member_id=None, ts=None):
+        """Queue one event for writing; returns immediately"""
+        self._queue.put((time.time() if ts is None else ts, event_type, member_id,
+                         json.dumps(payload, default=str)))
+        with self._lock:
+            self._stats['enqueued'] += 1
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is on disk"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _run_writer(self):
+        while True:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+            for waiter in waiters:
+                waiter.set()
+
+    def _write(self, batch):
+        with self._lock:
+            try:
+                self._rotate_if_full()
+                conn = self._connect(self._segments[-1])
+                with conn:
+                    conn.executemany("INSERT INTO events (ts, type, member_id, payload) VALUES (?, ?, ?, ?)", batch)
+                self._stats['written'] += len(batch)
+                self._stats['batches'] += 1
+            except sqlite3.Error as exc:
+                self._stats['write_errors'] += 1
+                self.last_error = str(exc)
+
+    # Reading
+
+    def count(self, member_id=None, event_type=None, since=None, until=None):
+        """Number of stored events matching the filters"""
+        where, params = _where(member_id, event_type, since, until)
+        with self._lock:
+            return sum(self._connect(number).execute("SELECT COUNT(*) FROM events" + where, params).fetchone()[0]
+                       for number in self._segments)
+
+    def query(self, member_id=None, event_type=None, since=None, until=None, limit=50, offset=0):
+        """Matching events newest first, as payload dicts, paged by limit (None for all) and offset"""
+        where, params = _where(member_id, event_type, since, until)
+        rows = []
+        with self._lock:
+            for number in reversed(self._segments):
+                if limit is not None and limit <= 0:
+                    break
+                conn = self._connect(number)
+                if offset:
+                    matching = conn.execute("SELECT COUNT(*) FROM events" + where, params).fetchone()[0]
+                    if offset >= matching:
+                        offset -= matching
+                        continue
+                found = conn.execute(
+                    "SELECT payload FROM events" + where + " ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?",
+                    params + [-1 if limit is None else limit, offset]
+                ).fetchall()
+                rows += found
+                if limit is not None:
+                    limit -= len(found)
+                offset = 0
+        return [json.loads(payload) for (payload,) in rows]
+
+    def iter_events(self, event_type=None, since=None, until=None, batch_size=1000):
+        """Stream (ts, type, member_id, payload) oldest first, reading batch_size rows at a time"""
+        where, params = _where(None, event_type, since, until)
+        where += (" AND" if where else " WHERE") + " id > ?"
+        with self._lock:
+            segments = list(self._segments)
+        for number in segments:
+            last_id = 0
+            while True:
+                with self._lock:
+                    if number not in self._segments:
+                        break
+                    rows = self._connect(number).execute(
+                        "SELECT id, ts, type, member_id, payload FROM events" + where + " ORDER BY id LIMIT ?",
+                        params + [last_id, batch_size]
+                    ).fetchall()
+                for row_id, ts, row_type, member_id, payload in rows:
+                    yield ts, row_type, member_id, json.loads(payload)
+                if len(rows) < batch_size:
+                    break
+                last_id = rows[-1][0]
+
+    def delete_member(self, member_id):
+        """Erase a member's events from every segment; returns how many were removed"""
+        self.flush()
+        removed = 0
+        with self._lock:
+            for number in self._segments:
+                conn = self._connect(number)
+                with conn:
+                    removed += conn.execute("DELETE FROM events WHERE member_id = ?", (member_id,)).rowcount
+        return removed
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['segments'] = len(self._segments)
+            stats['bytes'] = sum(self._segment_size(number) for number in self._segments)
+        stats['queued'] = self._queue.qsize()
+        return stats
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_audit_store():
+    """Return the process-wide audit store configured from the environment"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AuditStore()
+        return _store
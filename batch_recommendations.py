@@ -0,0 +1,327 @@
+"""Offline batch recommendations over a full customer export
+
+Reads customers (and optionally a separate transactions file) as JSONL or
+CSV, scores every customer across a process pool and streams the top-k
+rewards to a JSONL file in input order. Does not import Streamlit.
+
+The coordinator never parses records. Inputs are split into byte ranges at
+line boundaries and each worker parses its own range. With a separate
+transactions file, workers first hash-partition both files by customerId
+into pickled spill files, then score one partition each; the coordinator
+only merges the partitions' already-encoded output lines back into input
+order. Records must be one per line (no newlines inside quoted CSV fields).
+
+Usage:
+    python batch_recommendations.py --customers customers.jsonl \\
+        [--transactions transactions.csv] --output recommendations.jsonl
+"""
+import argparse
+import csv
+import glob
+import heapq
+import json
+import os
+import pickle
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from catalog import load_catalog
+from recommendations import get_personalized_recommendations
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+NUMERIC_FIELDS = {'pointsBalance': int, 'points': int, 'purchaseAmount': float}
+
+# Target size of one input range; there are always at least 4 per worker
+SPLIT_BYTES = 16 * 1024 * 1024
+# Output lines from partitions carry a fixed-width (range, line) prefix for the merge
+SEQUENCE_WIDTH = 16
+
+# Per-worker state set by _init_worker
+_catalog = None
+_top_k = 5
+
+
+def _coerce(record):
+    # CSV gives strings; JSON numbers pass through unchanged
+    for field, cast in NUMERIC_FIELDS.items():
+        value = record.get(field)
+        if isinstance(value, str):
+            record[field] = cast(float(value)) if value.strip() else None
+    return record
+
+
+def csv_fieldnames(path):
+    """The header row of a CSV file, or None for JSONL"""
+    if not path.endswith('.csv'):
+        return None
+    with open(path, encoding='utf-8', newline='') as f:
+        return next(csv.reader(f), [])
+
+
+def byte_ranges(path, count):
+    """Split a file into up to count (start, end) byte ranges that start on a line, after any CSV header"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        if path.endswith('.csv'):
+            f.readline()
+        bounds = [f.tell()]
+        first = bounds[0]
+        for i in range(1, count):
+            target = first + (size - first) * i // count
+            if target <= bounds[-1]:
+                continue
+            # The range starts after the line containing target - 1
+            f.seek(target - 1)
+            f.readline()
+            if bounds[-1] < f.tell() < size:
+                bounds.append(f.tell())
+        bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def _range_lines(f, start, end):
+    f.seek(start)
+    position = start
+    for line in f:
+        yield line
+        position += len(line)
+        if position >= end:
+            break
+
+
+def read_range(path, start, end, fieldnames=None):
+    """Stream dicts from the lines in [start, end) of a .jsonl/.ndjson file, or a .csv given its fieldnames"""
+    with open(path, 'rb') as f:
+        lines = _range_lines(f, start, end)
+        if fieldnames is not None:
+            for row in csv.DictReader((line.decode('utf-8') for line in lines), fieldnames=fieldnames):
+                yield _coerce(row)
+        else:
+            for line in lines:
+                if line.strip():
+                    yield _coerce(orjson.loads(line) if orjson is not None else json.loads(line))
+
+
+def read_records(path):
+    """Stream dicts from a whole .jsonl/.ndjson or .csv file"""
+    for start, end in byte_ranges(path, 1):
+        yield from read_range(path, start, end, csv_fieldnames(path))
+
+
+def partition_of(customer_id, partitions):
+    """Stable across processes, unlike hash() of a str"""
+    return zlib.crc32(str(customer_id).encode('utf-8')) % partitions
+
+
+def _spill_path(spill_dir, kind, partition, task):
+    return os.path.join(spill_dir, f"{kind}-{partition:05d}-{task:06d}.pickle")
+
+
+def _load_spills(spill_dir, kind, partition):
+    for path in sorted(glob.glob(os.path.join(spill_dir, f"{kind}-{partition:05d}-*.pickle"))):
+        with open(path, 'rb') as f:
+            yield pickle.load(f)
+
+
+def _init_worker(catalog_path, top_k):
+    global _catalog, _top_k
+    _catalog = load_catalog(catalog_path)
+    _top_k = top_k
+
+
+def recommend_for_customer(customer, catalog, top_k):
+    """Top-k recommendations for one customer record"""
+    transactions = customer.get('transactions') or []
+    recommendations, patterns = get_personalized_recommendations(
+        transactions, catalog, customer.get('pointsBalance') or 0, top_k=top_k)
+    return {
+        'customerId': customer.get('customerId'),
+        'favoriteCategory': patterns.get('favorite_category'),
+        'totalTransactions': patterns.get('total_transactions', 0),
+        'recommendations': [
+            {
+                'rewardId': rec['reward']['id'],
+                'name': rec['reward']['name'],
+                'points': rec['reward']['points'],
+                'score': rec['score'],
+                'reasons': rec['reasons']
+            }
+            for rec in recommendations
+        ]
+    }
+
+
+def _score_range(customers_path, start, end, fieldnames, part_path):
+    # Customers with embedded transactions: score a range straight into its part file
+    count = 0
+    with open(part_path, 'w', encoding='utf-8') as out:
+        for customer in read_range(customers_path, start, end, fieldnames):
+            out.write(json.dumps(recommend_for_customer(customer, _catalog, _top_k)) + '\n')
+            count += 1
+    return count
+
+
+def _partition_range(kind, path, start, end, fieldnames, partitions, spill_dir, task):
+    # Customers keep their (range, line) position so the output can be put back in input order
+    buckets = [[] for _ in range(partitions)]
+    count = 0
+    for record in read_range(path, start, end, fieldnames):
+        bucket = buckets[partition_of(record.get('customerId'), partitions)]
+        bucket.append((task, count, record) if kind == 'customers' else record)
+        count += 1
+    for partition, records in enumerate(buckets):
+        if records:
+            with open(_spill_path(spill_dir, kind, partition, task), 'wb') as f:
+                pickle.dump(records, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return count
+
+
+def _score_partition(spill_dir, partition, part_path):
+    transactions_by_customer = defaultdict(list)
+    for records in _load_spills(spill_dir, 'transactions', partition):
+        for tx in records:
+            transactions_by_customer[tx.get('customerId')].append(tx)
+    for rows in transactions_by_customer.values():
+        rows.sort(key=lambda tx: tx.get('timestamp') or '')
+
+    customers = [item for records in _load_spills(spill_dir, 'customers', partition) for item in records]
+    customers.sort(key=lambda item: item[:2])
+    with open(part_path, 'w', encoding='utf-8') as out:
+        for task, index, customer in customers:
+            customer['transactions'] = transactions_by_customer.pop(customer.get('customerId'), [])
+            result = recommend_for_customer(customer, _catalog, _top_k)
+            out.write(f"{task:06d}{index:010d}{json.dumps(result)}\n")
+    return len(customers)
+
+
+def _merge_partitions(part_paths, out):
+    # Each part is already in input order; a k-way merge on the prefix restores the global order
+    files = [open(path, encoding='utf-8') for path in part_paths]
+    try:
+        for line in heapq.merge(*files, key=lambda line: line[:SEQUENCE_WIDTH]):
+            out.write(line[SEQUENCE_WIDTH:])
+    finally:
+        for f in files:
+            f.close()
+
+
+def peak_memory_mb():
+    """Peak RSS of this process and of the largest worker, in MB"""
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return own, children
+
+
+def _cpu_seconds(who):
+    usage = resource.getrusage(who)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _ranges(path, workers, split_bytes):
+    count = max(workers * 4, -(-os.path.getsize(path) // split_bytes))
+    return byte_ranges(path, count)
+
+
+def run(customers_path, output_path, transactions_path=None, catalog_path=None,
+        workers=None, top_k=5, split_bytes=SPLIT_BYTES, partitions=None, tmp_dir=None):
+    """Score every customer and write results to output_path in input order; return run stats"""
+    workers = workers or os.cpu_count() or 1
+    partitions = partitions or workers * 4
+    started = time.perf_counter()
+    cpu_started = _cpu_seconds(resource.RUSAGE_SELF), _cpu_seconds(resource.RUSAGE_CHILDREN)
+    phases = {}
+
+    with tempfile.TemporaryDirectory(prefix='batch_recs_', dir=tmp_dir) as work_dir, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                initargs=(catalog_path, top_k)) as pool, \
+            open(output_path, 'w', encoding='utf-8') as out:
+        customer_fields = csv_fieldnames(customers_path)
+        customer_ranges = _ranges(customers_path, workers, split_bytes)
+
+        if transactions_path is None:
+            futures = [pool.submit(_score_range, customers_path, start, end, customer_fields,
+                                   os.path.join(work_dir, f"part-{i:06d}.jsonl"))
+                       for i, (start, end) in enumerate(customer_ranges)]
+            processed = 0
+            # Ranges finish roughly in order; each is appended as soon as it and its predecessors are done
+            for i, future in enumerate(futures):
+                processed += future.result()
+                with open(os.path.join(work_dir, f"part-{i:06d}.jsonl"), encoding='utf-8') as part:
+                    shutil.copyfileobj(part, out)
+            phases['score'] = time.perf_counter() - started
+        else:
+            tasks = [('customers', customers_path, start, end, customer_fields)
+                     for start, end in customer_ranges]
+            tx_fields = csv_fieldnames(transactions_path)
+            tasks += [('transactions', transactions_path, start, end, tx_fields)
+                      for start, end in _ranges(transactions_path, workers, split_bytes)]
+            futures = [pool.submit(_partition_range, kind, path, start, end, fields, partitions, work_dir, task)
+                       for task, (kind, path, start, end, fields) in enumerate(tasks)]
+            for future in futures:
+                future.result()
+            phases['partition'] = time.perf_counter() - started
+
+            part_paths = [os.path.join(work_dir, f"scored-{p:05d}.txt") for p in range(partitions)]
+            futures = [pool.submit(_score_partition, work_dir, p, part_paths[p]) for p in range(partitions)]
+            processed = sum(future.result() for future in futures)
+            phases['score'] = time.perf_counter() - started - phases['partition']
+
+            merge_started = time.perf_counter()
+            _merge_partitions(part_paths, out)
+            phases['merge'] = time.perf_counter() - merge_started
+
+    elapsed = time.perf_counter() - started
+    own_mb, worker_mb = peak_memory_mb()
+    return {
+        'customers': processed,
+        'seconds': elapsed,
+        'customers_per_sec': processed / elapsed if elapsed else 0.0,
+        'workers': workers,
+        'phases': phases,
+        # CPU the coordinator itself burned: the serial part that bounds scaling
+        'coordinator_cpu_seconds': _cpu_seconds(resource.RUSAGE_SELF) - cpu_started[0],
+        # Workers are counted once the pool has shut down
+        'worker_cpu_seconds': _cpu_seconds(resource.RUSAGE_CHILDREN) - cpu_started[1],
+        'peak_rss_mb': own_mb,
+        'peak_worker_rss_mb': worker_mb
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch reward recommendations over a customer export")
+    parser.add_argument('--customers', required=True,
+                        help="JSONL or CSV with customerId, pointsBalance and optionally embedded transactions")
+    parser.add_argument('--transactions', help="JSONL or CSV of transactions with a customerId column")
+    parser.add_argument('--catalog', help="JSON rewards catalog (defaults to the built-in catalog)")
+    parser.add_argument('--output', required=True, help="JSONL file to write recommendations to")
+    parser.add_argument('--workers', type=int, default=None, help="process count (default: all cores)")
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--split-mb', type=float, default=SPLIT_BYTES / 1024 / 1024,
+                        help="target size of the input ranges workers parse")
+    parser.add_argument('--partitions', type=int, default=None,
+                        help="customerId partitions for a separate transactions file (default: 4 per worker)")
+    parser.add_argument('--tmp-dir', help="where to put spill files (default: the system temp dir)")
+    args = parser.parse_args(argv)
+
+    stats = run(args.customers, args.output, args.transactions, args.catalog, args.workers, args.top_k,
+                int(args.split_mb * 1024 * 1024), args.partitions, args.tmp_dir)
+    print(f"Scored {stats['customers']:,} customers in {stats['seconds']:.2f}s "
+          f"({stats['customers_per_sec']:,.0f} customers/sec, {stats['workers']} workers)")
+    print("Phases: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in stats['phases'].items()) +
+          f"; coordinator CPU {stats['coordinator_cpu_seconds']:.2f}s, workers {stats['worker_cpu_seconds']:.2f}s")
+    print(f"Peak memory: {stats['peak_rss_mb']:.0f} MB coordinator, {stats['peak_worker_rss_mb']:.0f} MB largest worker")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Check and time the advisor's streaming safety cut-off against the stub LLM
+
+Asks the AI Advisor page, under Streamlit's AppTest, a question that makes
+the stub stream a reply containing a blocked phrase, then a harmless one for
+comparison. Checks that the blocked reply is replaced by the filtered answer,
+that no part of the blocked phrase was drawn, that the stub stopped streaming
+before the end of the reply, and that the cut-off turn still records a
+non-zero output count, the same one in the usage totals, the member's token
+budget and the audit log. Reports reply times and chunks streamed.
+
+Usage: python benchmarks/bench_advisor_cutoff.py [--repeat 3] [--token-delay 0.02]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import stub_llm  # noqa: E402
+from advisor import usage_stats  # noqa: E402
+from content_safety import find_blocked_phrases  # noqa: E402
+from llm_scheduler import get_llm_scheduler  # noqa: E402
+from stub_api import StubData, serve_in_background  # noqa: E402
+
+BLOCKED_PROMPT = "Should I invest my points?"
+PLAIN_PROMPT = "Which tier am I close to?"
+BLOCKED_REPLY = dict(stub_llm.REPLIES)['invest']
+
+
+def ask(at, prompt, llm):
+    """Send one chat message; return (interaction, usage totals delta, budget delta, stub stream)"""
+    member_id = at.session_state['member']['id']
+    scheduler = get_llm_scheduler()
+    totals_before = usage_stats()['output_tokens']
+    budget_before = scheduler.budget_remaining(member_id)
+    streams_before = len(llm.streamed)
+
+    at.chat_input[0].set_value(prompt).run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+
+    interaction = at.session_state['ai_interactions'][-1]
+    # The stub notices a closed stream on its next write, after the page has finished
+    deadline = time.monotonic() + 5
+    while len(llm.streamed) == streams_before and time.monotonic() < deadline:
+        time.sleep(0.01)
+    streams = llm.streamed[streams_before:]
+    if len(streams) != 1:
+        raise RuntimeError(f"expected one stub stream for {prompt!r}, got {len(streams)}")
+    # No budget to compare when LLM_MEMBER_TOKEN_BUDGET=0
+    charged = None if budget_before is None else budget_before - scheduler.budget_remaining(member_id)
+    return interaction, usage_stats()['output_tokens'] - totals_before, charged, streams[0]
+
+
+def check_cutoff(at, interaction, recorded_output, charged, stream):
+    sent, total = stream
+    # The audit entry carries the turn's token counts
+    usage = interaction
+    shown = ' '.join(element.value for element in at.markdown)
+    if not interaction['was_filtered']:
+        raise RuntimeError("blocked reply was not filtered")
+    if find_blocked_phrases(shown) or BLOCKED_REPLY[:40] in shown:
+        raise RuntimeError("blocked reply was drawn")
+    if sent >= total:
+        raise RuntimeError(f"stub streamed the whole reply ({sent}/{total} chunks)")
+    if not usage['output_tokens']:
+        raise RuntimeError("cut-off reply recorded no output tokens")
+    if recorded_output != usage['output_tokens']:
+        raise RuntimeError(f"usage totals grew by {recorded_output}, the turn recorded {usage['output_tokens']}")
+    prompt_tokens = usage['input_tokens'] + usage['cache_read_tokens'] + usage['cache_write_tokens']
+    if charged is not None and charged != prompt_tokens + usage['output_tokens']:
+        raise RuntimeError(f"budget charged {charged}, the turn used {prompt_tokens + usage['output_tokens']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--token-delay', type=float, default=0.02, help="stub seconds between streamed chunks")
+    args = parser.parse_args()
+
+    server, base_url = serve_in_background(port=0, data=StubData(1, 100))
+    llm, llm_url = stub_llm.serve_in_background(port=0, first_token_delay=0.1, token_delay=args.token_delay)
+    os.environ.update(API_BASE_URL=base_url, ANTHROPIC_BASE_URL=llm_url, ANTHROPIC_API_KEY='stub')
+    os.chdir(ROOT)
+    rows = []
+    try:
+        for _ in range(args.repeat):
+            at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=120)
+            at.run()
+            at.sidebar.radio[0].set_value("AI Advisor").run()
+            for prompt in (BLOCKED_PROMPT, PLAIN_PROMPT):
+                interaction, recorded_output, charged, stream = ask(at, prompt, llm)
+                if prompt == BLOCKED_PROMPT:
+                    check_cutoff(at, interaction, recorded_output, charged, stream)
+                rows.append((prompt, interaction['latency_ms'], stream, interaction['output_tokens']))
+    finally:
+        server.shutdown()
+        llm.shutdown()
+
+    print(f"advisor replies from the stub LLM ({args.token_delay * 1000:.0f}ms per chunk), all checks passed")
+    print(f"{'prompt':>28} {'reply ms':>9} {'chunks sent':>12} {'output tokens':>14}")
+    for prompt, latency_ms, (sent, total), output_tokens in rows:
+        print(f"{prompt:>28} {latency_ms:>9.0f} {f'{sent}/{total}':>12} {output_tokens:>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark batch_recommendations.run() across worker counts
+
+Writes a synthetic export (customers plus a separate transactions file, in
+shuffled order so grouping is real work), runs the job with each worker
+count and reports throughput, the speedup over one worker, and how much CPU
+the coordinator burns itself, which bounds the achievable speedup. Checks
+that every run writes identical output.
+
+Usage: python benchmarks/bench_batch_recommendations.py [--customers 20000] [--workers 1,2,4] [--format jsonl]
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_recommendations import run  # noqa: E402
+from stub_api import generate_transactions  # noqa: E402
+
+TX_FIELDS = ['transactionId', 'customerId', 'timestamp', 'productName', 'category', 'purchaseAmount', 'points']
+
+
+def write_export(directory, customers, transactions_per_customer, fmt, seed=11):
+    rng = random.Random(seed)
+    customers_path = os.path.join(directory, 'customers.jsonl')
+    rows = []
+    with open(customers_path, 'w', encoding='utf-8') as f:
+        for n in range(1, customers + 1):
+            customer_id = f"CUST{n:07d}"
+            f.write(json.dumps({'customerId': customer_id, 'pointsBalance': rng.randint(0, 20000)}) + '\n')
+            rows += generate_transactions(customer_id, rng.randint(1, 2 * transactions_per_customer), rng=rng)
+    rng.shuffle(rows)
+    transactions_path = os.path.join(directory, f"transactions.{fmt}")
+    with open(transactions_path, 'w', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            writer = csv.DictWriter(f, fieldnames=TX_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            for tx in rows:
+                f.write(json.dumps(tx) + '\n')
+    return customers_path, transactions_path, len(rows)
+
+
+def digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--customers', type=int, default=20000)
+    parser.add_argument('--transactions-per-customer', type=int, default=25, help="mean per customer")
+    parser.add_argument('--workers', default="1,2,4")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='bench_batch_')
+    try:
+        customers_path, transactions_path, tx_count = write_export(
+            directory, args.customers, args.transactions_per_customer, args.format)
+        print(f"{args.customers:,} customers, {tx_count:,} transactions ({args.format}), "
+              f"{os.cpu_count()} CPU(s) available")
+        print(f"{'workers':>7} {'seconds':>8} {'cust/s':>8} {'speedup':>8} {'coord CPU s':>12} "
+              f"{'serial share':>13} {'partition s':>12} {'score s':>8} {'merge s':>8} {'output':>13}")
+        baseline = None
+        for workers in (int(w) for w in args.workers.split(',')):
+            output_path = os.path.join(directory, f"out_{workers}.jsonl")
+            stats = run(customers_path, output_path, transactions_path, workers=workers)
+            baseline = baseline or stats['seconds']
+            total_cpu = stats['coordinator_cpu_seconds'] + stats['worker_cpu_seconds']
+            phases = stats['phases']
+            print(f"{workers:>7} {stats['seconds']:>8.2f} {stats['customers_per_sec']:>8,.0f} "
+                  f"{baseline / stats['seconds']:>7.2f}x {stats['coordinator_cpu_seconds']:>12.2f} "
+                  f"{stats['coordinator_cpu_seconds'] / total_cpu:>13.1%} {phases.get('partition', 0):>12.2f} "
+                  f"{phases['score']:>8.2f} {phases.get('merge', 0):>8.2f} {digest(output_path):>13}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
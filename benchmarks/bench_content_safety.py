@@ -0,0 +1,83 @@
+"""Benchmark the per-pattern substring scan vs the compiled Aho-Corasick matcher
+
+Scans synthetic advisor replies against growing sets of policy phrases. The
+compiled matcher's cost should grow with text length but stay roughly flat
+as phrases are added; the original loop grows with both.
+
+Usage: python benchmarks/bench_content_safety.py [--patterns 6,100,1000,5000] [--lengths 1000,10000,100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from content_safety import BLOCKED_PATTERNS, PatternMatcher  # noqa: E402
+
+DEFAULT_PATTERNS = [6, 100, 1_000, 5_000]
+DEFAULT_LENGTHS = [1_000, 10_000, 100_000]
+WORDS = ("points reward tier gift card redeem balance member shopping value bonus streak "
+         "catalog category purchase earn spend platinum silver gold experience digital").split()
+
+
+def make_patterns(count, rng):
+    """BLOCKED_PATTERNS plus synthetic multi-word policy phrases"""
+    patterns = list(BLOCKED_PATTERNS)
+    while len(patterns) < count:
+        patterns.append(' '.join(rng.choice(WORDS) + rng.choice('xyz') for _ in range(rng.randint(2, 4))))
+    return patterns[:count]
+
+
+def make_text(length, rng):
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word.capitalize() if rng.random() < 0.1 else word)
+        size += len(word) + 1
+    return ' '.join(words)[:length]
+
+
+def loop_scan(text, patterns):
+    """The original check: lowercase once, then one substring scan per pattern"""
+    text_lower = text.lower()
+    return [pattern for pattern in patterns if pattern in text_lower]
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--patterns', default=','.join(str(n) for n in DEFAULT_PATTERNS))
+    parser.add_argument('--lengths', default=','.join(str(n) for n in DEFAULT_LENGTHS))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    texts = {length: make_text(length, rng) + " This is not investment advice." for length in
+             (int(n) for n in args.lengths.split(','))}
+
+    print(f"{'patterns':>9} {'build ms':>9} {'text chars':>11} {'loop ms':>9} {'compiled ms':>12} {'ns/char':>8}")
+    for count in (int(n) for n in args.patterns.split(',')):
+        patterns = make_patterns(count, rng)
+        build_ms, matcher = best_of(lambda: PatternMatcher(patterns), 1)
+        for length, text in texts.items():
+            loop_ms, expected = best_of(lambda: loop_scan(text, patterns), args.repeat)
+            compiled_ms, matches = best_of(lambda: matcher.find_all(text), args.repeat)
+            assert sorted({m[2] for m in matches}) == sorted(set(expected))
+            print(f"{count:>9,} {build_ms:>9.1f} {len(text):>11,} {loop_ms:>9.2f} {compiled_ms:>12.2f} "
+                  f"{compiled_ms * 1e6 / len(text):>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
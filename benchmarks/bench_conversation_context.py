@@ -0,0 +1,88 @@
+"""Per-turn advisor input size: full chat history vs a bounded ConversationContext
+
+Replays a synthetic member/advisor conversation and, before each reply,
+measures the conversation part of the prompt (messages plus any summary) the
+way the app would send it. Fails if the bounded size keeps growing.
+
+Usage: python benchmarks/bench_conversation_context.py [--turns 200] [--budget 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation_context import ConversationContext, estimate_tokens  # noqa: E402
+
+QUESTIONS = [
+    "Which reward gives me the best value for my points right now?",
+    "How close am I to the next tier, and what would it take to get there?",
+    "I mostly buy electronics. What should I save my points for?",
+    "Is it better to redeem a gift card now or wait for an experience reward?",
+    "How does my streak bonus work and when do I get it?",
+]
+ANSWERS = [
+    "Based on your recent purchases, the $25 Store Gift Card gives the most value per point. "
+    "It fits your balance and matches how often you shop groceries and home goods.",
+    "You're about $180 away from the next tier. A couple of regular shopping trips would get you there, "
+    "and the higher earning rate applies to every purchase after that.",
+    "Since electronics is your favorite category, the Wireless Charger and digital rewards suit you. "
+    "Both are within reach and limited stock means they may not last long.",
+    "If you plan to keep shopping at the same pace, waiting lets you reach an experience reward. "
+    "Redeeming now is the safer choice if you want something immediately.",
+    "Your streak grows each day you shop. At 14 days you earn 500 bonus points, "
+    "so keeping it going for another week pays off.",
+]
+
+
+def messages_tokens(messages):
+    return sum(estimate_tokens(m['content']) for m in messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=200)
+    parser.add_argument('--budget', type=int, default=2000, help="context token budget")
+    parser.add_argument('--keep-turns', type=int, default=6)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    history = []
+    context = ConversationContext(budget_tokens=args.budget, keep_turns=args.keep_turns)
+    full_sizes, bounded_sizes = [], []
+    started = time.perf_counter()
+    for _ in range(args.turns):
+        question = rng.choice(QUESTIONS)
+        history.append({'role': 'user', 'content': question})
+        context.add('user', question)
+
+        full_sizes.append(messages_tokens(history))
+        bounded_sizes.append(messages_tokens(context.messages()) + estimate_tokens(context.summary))
+
+        answer = rng.choice(ANSWERS)
+        history.append({'role': 'assistant', 'content': answer})
+        context.add('assistant', answer)
+    per_turn_us = (time.perf_counter() - started) / args.turns * 1e6
+
+    print(f"conversation input tokens per turn (budget {args.budget:,}, {args.keep_turns} turns verbatim)")
+    print(f"{'turn':>6} {'full history':>13} {'bounded':>9}")
+    for turn in sorted({1, 10, 25, 50, 100, args.turns // 2, args.turns}):
+        if turn <= args.turns:
+            print(f"{turn:>6} {full_sizes[turn - 1]:>13,} {bounded_sizes[turn - 1]:>9,}")
+
+    stats = context.stats()
+    print(f"final context: {stats['verbatim_messages']} verbatim messages, "
+          f"{stats['summarized_messages']} summarized, summary ~{stats['summary_tokens']} tokens; "
+          f"bookkeeping {per_turn_us:.0f}us per turn")
+
+    # Flat: the second half of the chat is no bigger than the first
+    half = args.turns // 2
+    assert max(bounded_sizes[half:]) <= max(bounded_sizes[:half]), "bounded context kept growing"
+    assert max(bounded_sizes) <= args.budget + context.summary_tokens + 50, "bounded context exceeded its budget"
+    print("bounded per-turn input size is flat")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark fairness metrics from time-bucketed rollups vs recomputing from the audit log
+
+Fills a temporary audit store with synthetic chat, recommendation and
+redemption events spread over 30 days, back-fills a rollup from it in one
+streaming pass, then compares a dashboard refresh (summing a window's
+buckets) against loading every event into a DataFrame.
+
+Usage: python benchmarks/bench_fairness_metrics.py [--events 10000,100000]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from audit_store import AuditStore  # noqa: E402
+from fairness_metrics import FairnessRollup  # noqa: E402
+
+TIERS = ['Gold', 'Silver', 'Platinum']
+WINDOWS = {'1h': 3600, '24h': 86400, '30d': 30 * 86400}
+
+
+def fill_store(store, count, now, rng):
+    for _ in range(count):
+        ts = now - rng.random() * 30 * 86400
+        tier = rng.choice(TIERS)
+        kind = rng.random()
+        if kind < 0.5:
+            store.append('chat', {'member_tier': tier, 'latency_ms': rng.gauss(1500, 300),
+                                  'was_filtered': rng.random() < 0.02}, member_id=f"M{rng.randrange(500)}", ts=ts)
+        elif kind < 0.8:
+            store.append('recommendation', {'member_tier': tier, 'count': 5, 'points': rng.randint(2000, 20000)},
+                         member_id=f"M{rng.randrange(500)}", ts=ts)
+        else:
+            store.append('redemption', {'member_tier': tier, 'success': rng.random() < 0.8},
+                         member_id=f"M{rng.randrange(500)}", ts=ts)
+    store.flush()
+
+
+def scan_metrics(store, window_seconds, now):
+    """The O(events) way: load the window's events and aggregate them"""
+    df = pd.DataFrame(store.query(since=now - window_seconds, limit=None))
+    chats = df[df['latency_ms'].notna()]
+    return chats.groupby('member_tier')['latency_ms'].mean().round().to_dict()
+
+
+def best_of(func, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', default="10000,100000")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    print(f"{'events':>8} {'backfill s':>11} {'window':>7} {'buckets':>8} {'rollup ms':>10} {'scan ms':>9}")
+    for count in (int(n) for n in args.events.split(',')):
+        directory = tempfile.mkdtemp(prefix='bench_fairness_')
+        try:
+            store = AuditStore(directory, segment_bytes=4 * 1024 * 1024)
+            now = time.time()
+            fill_store(store, count, now, rng)
+
+            rollup = FairnessRollup()
+            started = time.perf_counter()
+            rollup.backfill(store.iter_events())
+            backfill_s = time.perf_counter() - started
+
+            for label, seconds in WINDOWS.items():
+                rollup_ms, metrics = best_of(lambda: rollup.metrics(TIERS, seconds, now))
+                scan_ms, expected = best_of(lambda: scan_metrics(store, seconds, now), 1)
+                if label == '30d':
+                    assert metrics['response_time_ms'] == expected
+                print(f"{count:>8,} {backfill_s:>11.2f} {label:>7} {metrics['buckets']:>8} {rollup_ms:>10.3f} "
+                      f"{scan_ms:>9.1f}")
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
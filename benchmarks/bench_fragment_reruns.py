@@ -0,0 +1,124 @@
+"""Benchmark full-script vs fragment-scoped reruns for redeem buttons
+
+Runs app.py under Streamlit's AppTest against the stub API, once with
+OMNISHOP_FRAGMENTS=0 (a click reruns the whole script, twice with the
+st.rerun() after a redemption) and once with fragments on (the click reruns
+the fragment, then a redemption reruns the whole app so the sidebar balance
+catches up, so the saving is on the click run only). AppTest has no
+public way to click a widget inside a fragment, so the fragment case sends the
+click with the fragment's id the way the browser does; the fragment id is
+looked up from AppTest's fragment storage. Times are the script runs
+themselves (ScriptRunner._run_script), without AppTest's per-run harness setup.
+
+Usage: python benchmarks/bench_fragment_reruns.py [--transactions 300] [--repeat 5]
+"""
+import argparse
+import functools
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from streamlit.runtime.scriptrunner import RerunData, ScriptRunner  # noqa: E402
+from streamlit.testing.v1 import AppTest, local_script_runner  # noqa: E402
+
+from stub_api import StubData, serve_in_background  # noqa: E402
+
+# (page, button key prefix, fragment function holding the buttons)
+SCENARIOS = [
+    ("Rewards Catalog", 'cat_', 'render_catalog_body'),
+    ("Dashboard", 'rec_', 'render_dashboard_body'),
+]
+
+# Milliseconds spent in each script run (full or fragment) since the last reset
+script_runs = []
+_run_script = ScriptRunner._run_script
+
+
+def _timed_run_script(self, rerun_data):
+    started = time.perf_counter()
+    try:
+        return _run_script(self, rerun_data)
+    finally:
+        script_runs.append((time.perf_counter() - started) * 1000)
+
+
+ScriptRunner._run_script = _timed_run_script
+
+
+def find_fragment_id(at, function_name):
+    """Id of the registered fragment wrapping function_name"""
+    for fragment_id, wrapped in at._fragment_storage._fragments.items():
+        for cell in wrapped.__closure__ or ():
+            if getattr(cell.cell_contents, '__name__', None) == function_name:
+                return fragment_id
+    raise RuntimeError(f"fragment {function_name} not registered")
+
+
+def open_page(page):
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=120)
+    at.run()
+    # Enough points for every redemption in the run
+    at.session_state['member']['points'] = 10_000_000
+    return at.sidebar.radio[0].set_value(page).run()
+
+
+def time_click(page, prefix, function_name, fragments):
+    """Script milliseconds from a redeem click until its reruns finish"""
+    at = open_page(page)
+    button = next(b for b in at.button if (b.key or '').startswith(prefix) and not b.disabled)
+    button.click()
+
+    if fragments:
+        local_script_runner.RerunData = functools.partial(
+            RerunData, fragment_id=find_fragment_id(at, function_name))
+    try:
+        script_runs.clear()
+        at.run()
+        elapsed = sum(script_runs)
+    finally:
+        local_script_runner.RerunData = RerunData
+
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    if at.session_state['member']['points'] >= 10_000_000:
+        raise RuntimeError(f"redemption on {page} did not go through")
+    return elapsed
+
+
+def median(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transactions', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    server, base_url = serve_in_background(port=0, data=StubData(1, args.transactions))
+    os.environ['API_BASE_URL'] = base_url
+    os.chdir(ROOT)
+    results = []
+    try:
+        for page, prefix, function_name in SCENARIOS:
+            row = [page]
+            for fragments in (False, True):
+                os.environ['OMNISHOP_FRAGMENTS'] = '1' if fragments else '0'
+                row.append(median([time_click(page, prefix, function_name, fragments)
+                                   for _ in range(args.repeat)]))
+            results.append(row)
+    finally:
+        server.shutdown()
+
+    print(f"script time from redeem click to settled page, median of {args.repeat}, {args.transactions:,} transactions")
+    print(f"{'page':>16} {'full ms':>10} {'fragment ms':>12} {'speedup':>8}")
+    for page, full_ms, fragment_ms in results:
+        print(f"{page:>16} {full_ms:>10.1f} {fragment_ms:>12.1f} {full_ms / fragment_ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Burst of concurrent advisor calls against a rate-limited stub LLM, with and without the scheduler
+
+The stub answers 429 beyond --provider-limit concurrent requests and jitters
+its latency. Without the scheduler every session calls the API directly;
+with it, calls are capped at --max-in-flight and admitted round-robin across
+members. Reports rate-limit errors and latency per tier.
+
+Usage: python benchmarks/bench_llm_scheduler.py [--members Gold:24,Silver:6,Platinum:2]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import anthropic  # noqa: E402
+
+import stub_llm  # noqa: E402
+from llm_scheduler import LlmScheduler, TokenBudgetExceeded  # noqa: E402
+from metrics import Histogram  # noqa: E402
+
+
+def call_llm(client):
+    """One streamed advisor call; returns the tokens it used"""
+    with client.messages.stream(model="stub", max_tokens=500, system="You are a rewards advisor.",
+                                messages=[{"role": "user", "content": "What should I redeem?"}]) as stream:
+        for _ in stream.text_stream:
+            pass
+        usage = stream.get_final_message().usage
+    return usage.input_tokens + usage.output_tokens
+
+
+def run_burst(client, members, requests_each, scheduler=None):
+    """Every member fires requests_each calls back to back, all members at once"""
+    latency = {}
+    errors = {'rate_limited': 0, 'over_budget': 0}
+    lock = threading.Lock()
+    start = threading.Barrier(len(members))
+
+    def session(member_id, tier):
+        start.wait()
+        for _ in range(requests_each):
+            started = time.perf_counter()
+            try:
+                if scheduler is None:
+                    call_llm(client)
+                else:
+                    with scheduler.slot(member_id, tier) as ticket:
+                        ticket.charge(call_llm(client))
+            except anthropic.RateLimitError:
+                with lock:
+                    errors['rate_limited'] += 1
+                continue
+            except TokenBudgetExceeded:
+                with lock:
+                    errors['over_budget'] += 1
+                continue
+            with lock:
+                latency.setdefault(tier, Histogram()).observe((time.perf_counter() - started) * 1000)
+
+    threads = [threading.Thread(target=session, args=member) for member in members]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latency, errors, time.perf_counter() - started
+
+
+def report(title, latency, errors, seconds):
+    print(f"\n{title}: {seconds:.1f}s, {errors['rate_limited']} rate-limited, {errors['over_budget']} over budget")
+    print(f"{'tier':>10} {'ok':>5} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for tier, histogram in sorted(latency.items()):
+        snap = histogram.snapshot()
+        print(f"{tier:>10} {snap['count']:>5} {snap['p50']:>8.0f} {snap['p95']:>8.0f} {snap['max']:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--members', default="Gold:24,Silver:6,Platinum:2", help="tier:count pairs")
+    parser.add_argument('--requests', type=int, default=2, help="calls per member")
+    parser.add_argument('--provider-limit', type=int, default=4, help="stub's concurrent request limit")
+    parser.add_argument('--max-in-flight', type=int, default=4)
+    parser.add_argument('--first-token-delay', type=float, default=0.2)
+    parser.add_argument('--token-delay', type=float, default=0.005)
+    parser.add_argument('--budget', type=int, default=50_000, help="tokens per member per window (0: no budget)")
+    args = parser.parse_args()
+
+    members = []
+    for pair in args.members.split(','):
+        tier, count = pair.split(':')
+        members += [(f"{tier[:1]}{n:03d}", tier) for n in range(int(count))]
+
+    server, base_url = stub_llm.serve_in_background(
+        port=0, first_token_delay=args.first_token_delay, token_delay=args.token_delay,
+        latency_jitter=0.5, max_concurrent=args.provider_limit)
+    # No client retries, so rate-limit errors are visible
+    client = anthropic.Anthropic(api_key="stub", base_url=base_url, max_retries=0)
+    try:
+        report("direct calls", *run_burst(client, members, args.requests))
+        scheduler = LlmScheduler(max_in_flight=args.max_in_flight, queue_timeout=120,
+                                 member_token_budget=args.budget)
+        report("scheduled calls", *run_burst(client, members, args.requests, scheduler))
+        stats = scheduler.stats()
+        print(f"scheduler: peak queue depth {stats['max_queue_depth']}, wait p50 {stats['wait_ms']['p50']:.0f}ms, "
+              f"p95 {stats['wait_ms']['p95']:.0f}ms; stub peak concurrency {server.peak_active}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
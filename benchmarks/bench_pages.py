@@ -0,0 +1,276 @@
+"""Headless page-render benchmarks for app.py, with a saved baseline and a regression check
+
+Drives app.py with Streamlit's AppTest against the stub loyalty API and the
+stub LLM. For every page main() dispatches to it measures:
+
+  cold         the page's first render in a new session (for Dashboard, the
+               session's first run, which also bootstraps the session)
+  warm         a plain rerun of the page
+  interaction  the script runs one typical action triggers: Quick Redeem,
+               Redeem Now, an advisor question, a history re-sort or a
+               fairness-window change (My Badges and Challenges have no
+               enabled widgets, so none)
+
+plus the app's cold start: the first script run in a fresh process. Times are
+the script runs themselves (ScriptRunner._run_script), medians over --repeat
+sessions. AppTest reruns the whole script for clicks inside fragments.
+
+Each transactions x catalog size runs in its own process, so module-level
+caches and imports start cold. The catalog is a synthetic JSON file passed
+via REWARDS_CATALOG_FILE.
+
+Usage:
+  python benchmarks/bench_pages.py --transactions 300,3000 --catalog 15,500 --save baseline.json
+  python benchmarks/bench_pages.py --compare baseline.json [--threshold 0.3]
+
+--compare exits with status 1 if any time is more than --threshold slower
+than the baseline (and at least --min-delta-ms slower, to ignore noise).
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PAGES = ["Dashboard", "Rewards Catalog", "My Badges", "Challenges", "AI Advisor",
+         "Transaction History", "Responsible AI"]
+METRICS = ('cold_ms', 'warm_ms', 'interaction_ms')
+RESULT_MARKER = 'BENCH_PAGES_RESULT '
+# Enough points for every redemption in a session
+POINTS = 10_000_000
+
+
+def write_catalog(size, path):
+    """A synthetic catalog of size rewards cycling through the built-in ones"""
+    from catalog import REWARDS_CATALOG
+
+    rewards = []
+    for i in range(size):
+        template = REWARDS_CATALOG[i % len(REWARDS_CATALOG)]
+        copy = i // len(REWARDS_CATALOG)
+        rewards.append(dict(template, id=i + 1, name=template['name'] + (f" #{copy + 1}" if copy else ''),
+                            points=template['points'] + copy * 10))
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(rewards, f)
+
+
+# Child process: one configuration
+
+def click_first(at, prefix):
+    next(b for b in at.button if (b.key or '').startswith(prefix) and not b.disabled).click()
+
+
+def select(at, label, index):
+    box = next(s for s in at.selectbox if s.label == label)
+    box.set_value(box.options[index])
+
+
+def redeemed(at):
+    return at.session_state['member']['points'] < POINTS
+
+
+def answered(at):
+    return len(at.session_state['messages']) >= 2
+
+
+# page -> (label, action, check that the action took effect)
+INTERACTIONS = {
+    "Dashboard": ('quick redeem', lambda at, n: click_first(at, 'rec_'), redeemed),
+    "Rewards Catalog": ('redeem now', lambda at, n: click_first(at, 'cat_'), redeemed),
+    "AI Advisor": ('advisor question', lambda at, n: at.chat_input[0].set_value(f"How should I redeem? ({n})"),
+                   answered),
+    "Transaction History": ('re-sort', lambda at, n: select(at, "Sort By", 1), lambda at: True),
+    "Responsible AI": ('fairness window', lambda at, n: select(at, "Window", 2), lambda at: True),
+}
+
+
+def run_child(transactions, repeat):
+    from streamlit.runtime.scriptrunner import ScriptRunner
+    from streamlit.testing.v1 import AppTest
+
+    import stub_api
+    import stub_llm
+
+    script_runs = []
+    run_script = ScriptRunner._run_script
+
+    def timed_run_script(self, rerun_data):
+        started = time.perf_counter()
+        try:
+            return run_script(self, rerun_data)
+        finally:
+            script_runs.append((time.perf_counter() - started) * 1000)
+
+    ScriptRunner._run_script = timed_run_script
+
+    def timed(action):
+        script_runs.clear()
+        at = action()
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        return sum(script_runs)
+
+    api, api_url = stub_api.serve_in_background(port=0, data=stub_api.StubData(1, transactions))
+    llm, llm_url = stub_llm.serve_in_background(port=0, first_token_delay=0.05, token_delay=0.002)
+    os.environ.update(API_BASE_URL=api_url, ANTHROPIC_BASE_URL=llm_url, ANTHROPIC_API_KEY='stub')
+    os.chdir(ROOT)
+
+    def new_session():
+        return AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=120)
+
+    at = new_session()
+    app_cold_start_ms = timed(at.run)
+
+    pages = {}
+    for page in PAGES:
+        samples = {metric: [] for metric in METRICS}
+        label, interact, check = INTERACTIONS.get(page, (None, None, None))
+        for n in range(repeat):
+            at = new_session()
+            landing_ms = timed(at.run)
+            at.session_state['member']['points'] = POINTS
+            if page == "Dashboard":
+                samples['cold_ms'].append(landing_ms)
+            else:
+                samples['cold_ms'].append(timed(lambda: at.sidebar.radio[0].set_value(page).run()))
+            samples['warm_ms'].append(timed(at.run))
+            if interact is not None:
+                interact(at, n)
+                samples['interaction_ms'].append(timed(at.run))
+                if not check(at):
+                    raise RuntimeError(f"{label} on {page} had no effect")
+        pages[page] = {metric: statistics.median(values) if values else None for metric, values in samples.items()}
+        pages[page]['interaction'] = label
+
+    api.shutdown()
+    llm.shutdown()
+    return {'app_cold_start_ms': app_cold_start_ms, 'pages': pages}
+
+
+# Parent process: configurations, baseline and comparison
+
+def run_config(transactions, catalog_size, repeat, workdir):
+    catalog_path = os.path.join(workdir, f"catalog_{catalog_size}.json")
+    write_catalog(catalog_size, catalog_path)
+    env = dict(os.environ,
+               REWARDS_CATALOG_FILE=catalog_path,
+               AUDIT_LOG_DIR=os.path.join(workdir, f"audit_{transactions}_{catalog_size}"),
+               # Every advisor question goes to the stub LLM rather than the answer cache
+               ADVISOR_CACHE_TTL='0',
+               METRICS_PORT='0')
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', '--transactions', str(transactions),
+                           '--repeat', str(repeat)], env=env, capture_output=True, text=True)
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return dict(json.loads(line[len(RESULT_MARKER):]), transactions=transactions, catalog=catalog_size)
+    raise RuntimeError(f"benchmark run failed for {transactions} transactions x {catalog_size} rewards:\n"
+                       f"{proc.stderr[-3000:]}")
+
+
+def config_key(config):
+    return f"{config['transactions']}x{config['catalog']}"
+
+
+def fmt(value):
+    return f"{value:.1f}" if value is not None else "—"
+
+
+def print_results(results):
+    for config in results['configs']:
+        print(f"\n{config['transactions']:,} transactions x {config['catalog']:,} rewards "
+              f"(app cold start {config['app_cold_start_ms']:.0f} ms, median of {results['repeat']})")
+        print(f"{'page':>20} {'cold ms':>9} {'warm ms':>9} {'interaction ms':>15}  interaction")
+        for page, row in config['pages'].items():
+            print(f"{page:>20} {fmt(row['cold_ms']):>9} {fmt(row['warm_ms']):>9} "
+                  f"{fmt(row['interaction_ms']):>15}  {row['interaction'] or ''}")
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Print every time against the baseline; return the regressions"""
+    base_configs = {config_key(config): config for config in baseline['configs']}
+    regressions = []
+    print(f"\nvs baseline from {baseline['created']} (regression: >{threshold:.0%} and >{min_delta_ms:.0f} ms slower)")
+    print(f"{'config':>12} {'page':>20} {'metric':>15} {'baseline':>9} {'now':>9} {'change':>8}")
+    for config in results['configs']:
+        base = base_configs.get(config_key(config))
+        if base is None:
+            print(f"{config_key(config):>12} not in baseline")
+            continue
+        rows = [('(app)', 'cold_start_ms', base['app_cold_start_ms'], config['app_cold_start_ms'])]
+        rows += [(page, metric, base['pages'].get(page, {}).get(metric), row[metric])
+                 for page, row in config['pages'].items() for metric in METRICS]
+        for page, metric, before, now in rows:
+            if before is None or now is None:
+                continue
+            change = (now - before) / before if before else 0.0
+            regressed = change > threshold and now - before > min_delta_ms
+            if regressed:
+                regressions.append((config_key(config), page, metric, before, now))
+            print(f"{config_key(config):>12} {page:>20} {metric:>15} {before:>9.1f} {now:>9.1f} "
+                  f"{change:>+7.0%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--transactions', default="300", help="comma-separated transaction counts")
+    parser.add_argument('--catalog', default="15", help="comma-separated catalog sizes")
+    parser.add_argument('--repeat', type=int, default=5, help="sessions per page")
+    parser.add_argument('--save', metavar='PATH', help="write the results as a baseline JSON file")
+    parser.add_argument('--compare', metavar='PATH', help="compare against a baseline; exit 1 on regression")
+    parser.add_argument('--threshold', type=float, default=0.3, help="allowed slowdown as a fraction")
+    parser.add_argument('--min-delta-ms', type=float, default=10.0, help="ignore slowdowns smaller than this")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(RESULT_MARKER + json.dumps(run_child(int(args.transactions), args.repeat)))
+        return
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        # Re-run exactly the baseline's configurations
+        sizes = [(config['transactions'], config['catalog']) for config in baseline['configs']]
+        repeat = baseline['repeat']
+    else:
+        sizes = [(int(t), int(c)) for t in args.transactions.split(',') for c in args.catalog.split(',')]
+        repeat = args.repeat
+
+    import streamlit
+
+    with tempfile.TemporaryDirectory(prefix='bench_pages_') as workdir:
+        configs = [run_config(transactions, catalog_size, repeat, workdir) for transactions, catalog_size in sizes]
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'streamlit': streamlit.__version__,
+        'repeat': repeat,
+        'configs': configs
+    }
+    print_results(results)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark the original recommendation loop vs vectorized top-k scoring
+
+Usage: python benchmarks/bench_recommendations.py [--sizes 15,10000,1000000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recommendations import CATEGORY_MAPPING, get_catalog_columns, get_personalized_recommendations  # noqa: E402
+from stub_api import generate_transactions  # noqa: E402
+
+DEFAULT_SIZES = [15, 10_000, 1_000_000]
+REWARD_CATEGORIES = ['Gift Cards', 'Merchandise', 'Experiences', 'Digital', 'Discounts', 'Charitable']
+
+
+def make_catalog(size, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            'id': i + 1,
+            'name': f"Reward {i + 1}",
+            'category': rng.choice(REWARD_CATEGORIES),
+            'points': rng.randrange(100, 6000, 50),
+            'value': 0.0,
+            'image': '🎁',
+            'tier_exclusive': None,
+            'stock': rng.randint(0, 500)
+        }
+        for i in range(size)
+    ]
+
+
+def loop_recommendations(patterns, rewards_catalog, member_points):
+    """The original per-item scoring loop with a full sort, kept as the baseline"""
+    favorite_cat = patterns.get('favorite_category', 'Electronics')
+    preferred_reward_types = CATEGORY_MAPPING.get(favorite_cat, ['Gift Cards'])
+    recommendations = []
+    for reward in rewards_catalog:
+        score = 0
+        reasons = []
+        if reward['points'] <= member_points:
+            score += 30
+            reasons.append("Within your points balance")
+        if reward['category'] in preferred_reward_types:
+            score += 25
+            reasons.append(f"Matches your {favorite_cat} shopping preference")
+        if reward['points'] < 1000:
+            score += 15
+            reasons.append("Great value redemption")
+        elif reward['points'] < 2000:
+            score += 10
+            reasons.append("Good value for points")
+        if reward['stock'] < 30:
+            score += 10
+            reasons.append("Limited availability")
+        recommendations.append({'reward': reward, 'score': score, 'reasons': reasons})
+    recommendations.sort(key=lambda x: x['score'], reverse=True)
+    return recommendations[:5]
+
+
+def best_of(func, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(str(n) for n in DEFAULT_SIZES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--member-points', type=int, default=2500)
+    args = parser.parse_args()
+
+    transactions = generate_transactions('BENCH', 200)
+
+    print(f"{'catalog':>10} {'loop ms':>10} {'vector ms':>10} {'speedup':>8} {'build ms':>10}")
+    for size in (int(n) for n in args.sizes.split(',')):
+        catalog = make_catalog(size)
+        _, patterns = get_personalized_recommendations(transactions, catalog[:1], args.member_points)
+
+        loop_ms, expected = best_of(lambda: loop_recommendations(patterns, catalog, args.member_points), args.repeat)
+        build_ms, _ = best_of(lambda: get_catalog_columns(list(catalog)), 1)
+        vector_ms, (actual, _) = best_of(
+            lambda: get_personalized_recommendations(transactions, catalog, args.member_points), args.repeat)
+
+        assert [(r['reward']['id'], r['score'], r['reasons']) for r in actual] == \
+            [(r['reward']['id'], r['score'], r['reasons']) for r in expected]
+
+        print(f"{size:>10,} {loop_ms:>10.2f} {vector_ms:>10.2f} {loop_ms / vector_ms:>7.1f}x {build_ms:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
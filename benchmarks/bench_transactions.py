@@ -0,0 +1,100 @@
+"""Benchmark row-wise vs columnar transaction analytics
+
+Usage: python benchmarks/bench_transactions.py [--sizes 100,1000,...]
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_api import generate_transactions  # noqa: E402
+from transaction_columns import TransactionColumns  # noqa: E402
+
+DEFAULT_SIZES = [100, 1_000, 10_000, 100_000, 1_000_000]
+
+
+def rowwise_patterns(transactions):
+    """The original analyze_purchase_patterns loop, kept as the baseline"""
+    categories = []
+    items = []
+    total_spent = 0
+    total_points = 0
+    for tx in transactions:
+        if tx.get('category'):
+            categories.append(tx['category'])
+        if tx.get('productName'):
+            items.append(tx['productName'])
+        if tx.get('purchaseAmount') is not None:
+            total_spent += tx.get('purchaseAmount', 0) or 0
+        if tx.get('points') is not None:
+            total_points += tx.get('points', 0) or 0
+    top_categories = Counter(categories).most_common(5)
+    return {
+        'top_categories': top_categories,
+        'total_transactions': len(transactions),
+        'total_spent': total_spent,
+        'total_points_earned': total_points,
+        'recent_items': items[:10],
+        'favorite_category': top_categories[0][0] if top_categories else None
+    }
+
+
+def rowwise_running_balance(transactions, current_balance):
+    """The original render_transaction_history balance loop"""
+    balances = []
+    running_balance = current_balance
+    for tx in reversed(transactions):
+        balances.append(running_balance)
+        running_balance -= tx.get('points', 0)
+    balances.reverse()
+    return balances
+
+
+def timed(func, *args, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(str(n) for n in DEFAULT_SIZES))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print("analysis + running balance; the columnar build runs once per sync and the")
+    print("daily rollup (no row-wise equivalent) is reported on its own")
+    print(f"{'rows':>10} {'row-wise ms':>12} {'columnar ms':>12} {'speedup':>8} {'build ms':>10} {'rollup ms':>10}")
+    for size in (int(n) for n in args.sizes.split(',')):
+        transactions = generate_transactions('BENCH', size)
+
+        def rowwise():
+            patterns = rowwise_patterns(transactions)
+            return patterns, rowwise_running_balance(transactions, 100_000)
+
+        def columnar(columns):
+            return columns.patterns(), columns.running_balance(100_000)
+
+        rowwise_ms, (expected, expected_balance) = timed(rowwise, repeat=args.repeat)
+        build_ms, columns = timed(TransactionColumns, transactions, repeat=args.repeat)
+        columnar_ms, (actual, actual_balance) = timed(columnar, columns, repeat=args.repeat)
+        rollup_ms, _ = timed(columns.daily_rollup, repeat=args.repeat)
+
+        assert actual['top_categories'] == expected['top_categories']
+        assert actual['total_points_earned'] == expected['total_points_earned']
+        assert abs(actual['total_spent'] - expected['total_spent']) < 1e-6 * max(1.0, expected['total_spent'])
+        assert actual_balance.tolist() == expected_balance
+
+        print(f"{size:>10,} {rowwise_ms:>12.2f} {columnar_ms:>12.2f} {rowwise_ms / columnar_ms:>7.1f}x "
+              f"{build_ms:>10.2f} {rollup_ms:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
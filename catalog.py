@@ -0,0 +1,122 @@
+"""Rewards catalog data, kept free of Streamlit so offline jobs can import it"""
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+# Sample reward catalog with dollar values
+REWARDS_CATALOG = [
+    {'id': 1, 'name': '$10 Store Gift Card', 'category': 'Gift Cards', 'points': 500, 'value': 10.00, 'image': '🎁', 'tier_exclusive': None, 'stock': 100},
+    {'id': 2, 'name': '$25 Store Gift Card', 'category': 'Gift Cards', 'points': 1200, 'value': 25.00, 'image': '🎁', 'tier_exclusive': None, 'stock': 75},
+    {'id': 3, 'name': '$50 Store Gift Card', 'category': 'Gift Cards', 'points': 2300, 'value': 50.00, 'image': '🎁', 'tier_exclusive': None, 'stock': 50},
+    {'id': 4, 'name': 'Premium Headphones', 'category': 'Merchandise', 'points': 5000, 'value': 149.99, 'image': '🎧', 'tier_exclusive': None, 'stock': 25},
+    {'id': 5, 'name': 'Wireless Charger', 'category': 'Merchandise', 'points': 1500, 'value': 39.99, 'image': '🔌', 'tier_exclusive': None, 'stock': 60},
+    {'id': 6, 'name': 'Smart Watch Band', 'category': 'Merchandise', 'points': 800, 'value': 24.99, 'image': '⌚', 'tier_exclusive': None, 'stock': 80},
+    {'id': 7, 'name': 'VIP Shopping Experience', 'category': 'Experiences', 'points': 3500, 'value': 150.00, 'image': '👔', 'tier_exclusive': 'Platinum', 'stock': 10},
+    {'id': 8, 'name': 'Personal Styling Session', 'category': 'Experiences', 'points': 2000, 'value': 75.00, 'image': '✨', 'tier_exclusive': 'Silver', 'stock': 20},
+    {'id': 9, 'name': 'Streaming Subscription (1 month)', 'category': 'Digital', 'points': 600, 'value': 15.99, 'image': '📺', 'tier_exclusive': None, 'stock': 200},
+    {'id': 10, 'name': 'E-Book Bundle', 'category': 'Digital', 'points': 400, 'value': 12.99, 'image': '📚', 'tier_exclusive': None, 'stock': 150},
+    {'id': 11, 'name': '20% Off Coupon', 'category': 'Discounts', 'points': 300, 'value': 20.00, 'image': '🏷️', 'tier_exclusive': None, 'stock': 500},
+    {'id': 12, 'name': 'Free Express Shipping (3 uses)', 'category': 'Discounts', 'points': 450, 'value': 29.97, 'image': '🚚', 'tier_exclusive': None, 'stock': 300},
+    {'id': 13, 'name': 'Charity Donation - $10', 'category': 'Charitable', 'points': 500, 'value': 10.00, 'image': '💝', 'tier_exclusive': None, 'stock': 999},
+    {'id': 14, 'name': 'Limited Edition Tote Bag', 'category': 'Merchandise', 'points': 1800, 'value': 45.00, 'image': '👜', 'tier_exclusive': None, 'stock': 30, 'limited': True},
+    {'id': 15, 'name': 'Exclusive Member Event Access', 'category': 'Experiences', 'points': 4000, 'value': 200.00, 'image': '🎉', 'tier_exclusive': 'Platinum', 'stock': 15},
+]
+
+
+def load_catalog(path=None):
+    """Return the catalog from a JSON file (a list of rewards), or the built-in one"""
+    if not path:
+        return REWARDS_CATALOG
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+# A JSON catalog that replaces the built-in one, e.g. a larger one for benchmarks
+REWARDS_CATALOG_FILE = os.getenv("REWARDS_CATALOG_FILE", "")
+if REWARDS_CATALOG_FILE:
+    REWARDS_CATALOG = load_catalog(REWARDS_CATALOG_FILE)
+
+
+ALL_CATEGORIES = "All Categories"
+SORT_POINTS_ASC = "Points: Low to High"
+SORT_POINTS_DESC = "Points: High to Low"
+SORT_NAME = "Name A-Z"
+
+# Most catalog versions kept indexed
+CATALOG_INDEX_CACHE_SIZE = 4
+
+
+def catalog_version(catalog):
+    """Identity of a catalog list; publish a new list object to change the catalog"""
+    return (id(catalog), len(catalog))
+
+
+class _CategoryOrders:
+    """One category's rewards pre-sorted three ways, with bisect keys"""
+
+    def __init__(self, rewards):
+        # Stable sorts, so ties keep catalog order exactly like list.sort did
+        self.points_asc = sorted(rewards, key=lambda r: r['points'])
+        self.asc_keys = [r['points'] for r in self.points_asc]
+        self.points_desc = sorted(rewards, key=lambda r: r['points'], reverse=True)
+        self.desc_keys = [-r['points'] for r in self.points_desc]
+        self.by_name = sorted(rewards, key=lambda r: r['name'])
+        self.name_rank = {id(r): i for i, r in enumerate(self.by_name)}
+
+
+class CatalogIndex:
+    """Filter/sort views of a catalog answered with bisect instead of re-sorting
+
+    Built once per catalog version. Points-sorted views, with or without the
+    affordability cutoff, are a single O(log n) bisect plus the slice.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        groups = {ALL_CATEGORIES: list(catalog)}
+        for reward in catalog:
+            groups.setdefault(reward['category'], []).append(reward)
+        self._orders = {category: _CategoryOrders(rewards) for category, rewards in groups.items()}
+
+    def view(self, category=ALL_CATEGORIES, sort_by=SORT_POINTS_ASC, affordable_only=False, member_points=0):
+        """Rewards in a category, sorted, optionally limited to what the member can afford"""
+        orders = self._orders.get(category)
+        if orders is None:
+            return []
+
+        if sort_by == SORT_POINTS_DESC:
+            start = bisect_left(orders.desc_keys, -member_points) if affordable_only else 0
+            return orders.points_desc[start:]
+
+        if sort_by == SORT_NAME:
+            if not affordable_only:
+                return orders.by_name[:]
+            # Name order is not monotonic in points: take the affordable prefix, then order it by name
+            affordable = orders.points_asc[:bisect_right(orders.asc_keys, member_points)]
+            return sorted(affordable, key=lambda r: orders.name_rank[id(r)])
+
+        end = bisect_right(orders.asc_keys, member_points) if affordable_only else len(orders.points_asc)
+        return orders.points_asc[:end]
+
+
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def get_catalog_index(catalog):
+    """Return the index for a catalog, built once per catalog version"""
+    key = catalog_version(catalog)
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None and index.catalog is catalog:
+            _index_cache.move_to_end(key)
+            return index
+
+    index = CatalogIndex(catalog)
+    with _index_cache_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > CATALOG_INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
@@ -0,0 +1,86 @@
+"""Per-endpoint circuit breaker so a down API fails fast instead of blocking"""
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls are rejected for ``recovery_timeout`` seconds. It then lets up to
+    ``half_open_max_calls`` trial calls through: a success closes it again, a
+    failure re-opens it.
+    """
+
+    def __init__(self, name, failure_threshold=3, recovery_timeout=30.0, half_open_max_calls=1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._trips = 0
+        self._rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        # Caller holds self._lock; an open circuit turns half-open once the timeout passes
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    def allow(self):
+        """Return True if a call may go through right now"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            state = self._current_state()
+            if state == HALF_OPEN or (state == CLOSED and self._failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trips += 1
+
+    def snapshot(self):
+        with self._lock:
+            state = self._current_state()
+            retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at)) if state == OPEN else 0.0
+            return {
+                'endpoint': self.name,
+                'state': state,
+                'consecutive_failures': self._failures,
+                'trips': self._trips,
+                'rejected': self._rejected,
+                'retry_in_s': round(retry_in, 1)
+            }
@@ -0,0 +1,192 @@
+"""Content-safety guardrails for AI advisor input and output
+
+Blocked phrases are compiled once into an Aho-Corasick automaton, so a scan
+costs one pass over the text however many phrases there are. Extra phrases
+can be loaded from a file (one per line) named by CONTENT_SAFETY_PATTERNS_FILE.
+"""
+import os
+import threading
+
+BLOCKED_PATTERNS = [
+    'personal financial advice',
+    'investment advice',
+    'medical advice',
+    'legal advice',
+    'discriminat',
+    'hate speech',
+]
+
+CONTENT_SAFETY_PATTERNS_FILE = os.getenv("CONTENT_SAFETY_PATTERNS_FILE", "")
+
+
+def load_patterns(path):
+    """Read one phrase per line, skipping blanks and # comments"""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+
+class PatternMatcher:
+    """Case-insensitive Aho-Corasick matcher over a fixed set of phrases"""
+
+    def __init__(self, patterns):
+        self.patterns = list(dict.fromkeys(p.lower() for p in patterns if p))
+        goto = [{}]
+        depth = [0]
+        outputs = [[]]
+        for index, pattern in enumerate(self.patterns):
+            node = 0
+            for ch in pattern:
+                child = goto[node].get(ch)
+                if child is None:
+                    child = len(goto)
+                    goto[node][ch] = child
+                    goto.append({})
+                    depth.append(depth[node] + 1)
+                    outputs.append([])
+                node = child
+            outputs[node].append(index)
+
+        # Breadth-first failure links; each node also reports its suffixes' matches
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for node in queue:
+            for ch, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(ch, 0)
+                outputs[child].extend(outputs[fail[child]])
+
+        self._goto = goto
+        self._fail = fail
+        self._depth = depth
+        self._outputs = [tuple(out) for out in outputs]
+
+    def _scan(self, text, state, offset, first_only=False):
+        """Run the automaton over text; return (matches, end state)"""
+        goto, fail, outputs, patterns = self._goto, self._fail, self._outputs, self.patterns
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Rare characters whose lowercase is longer: map positions one by one
+            chars = [(i, c) for i, ch in enumerate(text) for c in ch.lower()]
+        else:
+            chars = enumerate(lowered)
+
+        matches = []
+        for i, ch in chars:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if outputs[state]:
+                end = offset + i + 1
+                for index in outputs[state]:
+                    matches.append((end - len(patterns[index]), end, patterns[index]))
+                if first_only:
+                    break
+        return matches, state
+
+    def find_all(self, text):
+        """Every (start, end, phrase) occurrence in text, overlapping ones included"""
+        return self._scan(text, 0, 0)[0]
+
+    def first_match(self, text):
+        """The earliest-ending (start, end, phrase) match, or None"""
+        matches = self._scan(text, 0, 0, first_only=True)[0]
+        return matches[0] if matches else None
+
+    def stream(self):
+        return MatchStream(self)
+
+
+class MatchStream:
+    """Feeds chunks of one text through a matcher, keeping its state between chunks"""
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.state = 0
+        self.offset = 0
+
+    @property
+    def pending(self):
+        """Trailing characters that could still be the start of a match"""
+        return self.matcher._depth[self.state]
+
+    def feed(self, chunk):
+        """Matches completed by this chunk, with positions in the whole text"""
+        matches, self.state = self.matcher._scan(chunk, self.state, self.offset)
+        self.offset += len(chunk)
+        return matches
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_matcher():
+    """The process-wide matcher for BLOCKED_PATTERNS plus any patterns file, built once"""
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            patterns = list(BLOCKED_PATTERNS)
+            if CONTENT_SAFETY_PATTERNS_FILE:
+                patterns += load_patterns(CONTENT_SAFETY_PATTERNS_FILE)
+            _matcher = PatternMatcher(patterns)
+        return _matcher
+
+
+def find_blocked_phrases(text):
+    """Every blocked phrase in text as (start, end, phrase)"""
+    return get_matcher().find_all(text)
+
+
+def check_content_safety(text):
+    """Check if content passes safety guardrails"""
+    match = get_matcher().first_match(text)
+    if match:
+        return False, f"Content flagged for review: {match[2]}"
+    return True, "Content passed safety check"
+
+
+class StreamingSafetyChecker:
+    """check_content_safety applied chunk by chunk to a streamed reply
+
+    ``safe_text`` holds back any trailing characters that could still grow
+    into a blocked phrase, so a blocked phrase is never partly shown.
+    """
+
+    def __init__(self, matcher=None):
+        self._stream = (matcher or get_matcher()).stream()
+        self._safe_length = 0
+        self.text = ''
+        self.matches = []
+
+    @property
+    def blocked_pattern(self):
+        return self.matches[0][2] if self.matches else None
+
+    @property
+    def is_safe(self):
+        return not self.matches
+
+    @property
+    def message(self):
+        if self.matches:
+            return f"Content flagged for review: {self.blocked_pattern}"
+        return "Content passed safety check"
+
+    @property
+    def safe_text(self):
+        """Text that no blocked phrase can still start in"""
+        return self.text[:self._safe_length]
+
+    def feed(self, chunk):
+        """Add a chunk; return False once the reply contains a blocked phrase"""
+        if self.matches:
+            return False
+        self.matches = self._stream.feed(chunk)
+        if self.matches:
+            return False
+        self.text += chunk
+        self._safe_length = len(self.text) - self._stream.pending
+        return True
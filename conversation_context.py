@@ -0,0 +1,114 @@
+"""Bounded advisor conversation context: recent turns verbatim, older ones summarized"""
+import os
+import re
+
+# Token budget for the conversation part of the prompt (verbatim turns + summary)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("ADVISOR_CONTEXT_TOKENS", "2000"))
+# Most recent member/advisor exchanges always kept word for word
+CONTEXT_KEEP_TURNS = int(os.getenv("ADVISOR_CONTEXT_TURNS", "6"))
+# Cap on the running summary of older turns
+SUMMARY_TOKEN_BUDGET = int(os.getenv("ADVISOR_SUMMARY_TOKENS", "300"))
+
+# Longest excerpt of a folded message kept in the summary
+SUMMARY_LINE_CHARS = 160
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token)"""
+    return (len(text) + 3) // 4
+
+
+def summarize_message(role, content):
+    """One summary line for a message: its first sentence, clipped"""
+    text = ' '.join(content.split())
+    first = re.split(r'(?<=[.!?])\s', text, maxsplit=1)[0]
+    if len(first) > SUMMARY_LINE_CHARS:
+        first = first[:SUMMARY_LINE_CHARS - 1].rstrip() + '…'
+    speaker = "Member asked" if role == 'user' else "Advisor answered"
+    return f"- {speaker}: {first}"
+
+
+class ConversationContext:
+    """What the advisor is sent of a chat: bounded regardless of chat length
+
+    Messages keep only ``role`` and ``content``. Once there are more than
+    ``keep_turns`` exchanges, or the verbatim turns exceed ``budget_tokens``,
+    the oldest exchange is folded into a running summary. The summary keeps
+    its newest lines within ``summary_tokens``.
+    """
+
+    def __init__(self, budget_tokens=CONTEXT_TOKEN_BUDGET, keep_turns=CONTEXT_KEEP_TURNS,
+                 summary_tokens=SUMMARY_TOKEN_BUDGET, summarize=summarize_message):
+        self.budget_tokens = budget_tokens
+        self.keep_turns = keep_turns
+        self.summary_tokens = summary_tokens
+        self.summarize = summarize
+        self.turns = []
+        self._turn_tokens = 0
+        self.summary_lines = []
+        self._summary_line_tokens = 0
+        self.omitted_lines = 0
+        self.folded_messages = 0
+        self.total_messages = 0
+
+    def add(self, role, content):
+        """Append a message (same-role messages in a row are merged) and compact"""
+        self.total_messages += 1
+        if self.turns and self.turns[-1]['role'] == role:
+            # e.g. a prompt whose reply failed: the API needs alternating roles
+            merged = self.turns[-1]['content'] + "\n\n" + content
+            self._turn_tokens += estimate_tokens(merged) - estimate_tokens(self.turns[-1]['content'])
+            self.turns[-1] = {'role': role, 'content': merged}
+        else:
+            self.turns.append({'role': role, 'content': content})
+            self._turn_tokens += estimate_tokens(content)
+        self.compact()
+
+    def compact(self):
+        """Fold the oldest exchanges into the summary until within limits"""
+        while len(self.turns) > 1 and (len(self.turns) > self.keep_turns * 2
+                                       or self._turn_tokens > self.budget_tokens):
+            self._fold(self.turns.pop(0))
+            # The API wants the conversation to open with a member message
+            if self.turns and self.turns[0]['role'] != 'user':
+                self._fold(self.turns.pop(0))
+
+    def _fold(self, message):
+        self._turn_tokens -= estimate_tokens(message['content'])
+        self.folded_messages += 1
+        line = self.summarize(message['role'], message['content'])
+        self.summary_lines.append(line)
+        self._summary_line_tokens += estimate_tokens(line) + 1
+        while len(self.summary_lines) > 1 and self._summary_line_tokens > self.summary_tokens:
+            self._summary_line_tokens -= estimate_tokens(self.summary_lines.pop(0)) + 1
+            self.omitted_lines += 1
+
+    @property
+    def summary(self):
+        """Running summary of the folded turns ('' when nothing was folded)"""
+        if not self.summary_lines:
+            return ''
+        header = "EARLIER IN THIS CONVERSATION (summarized):"
+        if self.omitted_lines:
+            header += f"\n- ({self.omitted_lines} earlier messages omitted)"
+        return header + "\n" + "\n".join(self.summary_lines)
+
+    def messages(self):
+        """Verbatim turns to send as the API's messages list"""
+        return list(self.turns)
+
+    def clear(self):
+        self.__init__(self.budget_tokens, self.keep_turns, self.summary_tokens, self.summarize)
+
+    def stats(self):
+        """Token and turn counts for the context as it would be sent now"""
+        summary_tokens = estimate_tokens(self.summary)
+        return {
+            'messages': self.total_messages,
+            'verbatim_messages': len(self.turns),
+            'summarized_messages': self.folded_messages,
+            'verbatim_tokens': self._turn_tokens,
+            'summary_tokens': summary_tokens,
+            'context_tokens': self._turn_tokens + summary_tokens,
+            'budget_tokens': self.budget_tokens
+        }
@@ -0,0 +1,194 @@
+"""Fairness metrics from AI interactions, recommendations and redemptions, kept as time-bucketed rollups
+
+Each event updates one per-minute, one per-hour and one per-day aggregate
+for its tier, so a dashboard refresh sums a window's buckets instead of
+rescanning events. Minute buckets are kept for FAIRNESS_MINUTE_RETENTION
+minutes, hour buckets for FAIRNESS_HOUR_RETENTION hours and day buckets
+for FAIRNESS_DAY_RETENTION days; older detail is already in the coarser
+buckets. A new process back-fills its rollup from the audit store in one
+streaming pass.
+"""
+import os
+import threading
+import time
+
+from audit_store import get_audit_store
+
+FAIRNESS_MINUTE_RETENTION = int(os.getenv("FAIRNESS_MINUTE_RETENTION", "120"))
+FAIRNESS_HOUR_RETENTION = int(os.getenv("FAIRNESS_HOUR_RETENTION", "48"))
+FAIRNESS_DAY_RETENTION = int(os.getenv("FAIRNESS_DAY_RETENTION", "90"))
+
+# Tiers whose redemption success rate is below this fraction of the best tier's are flagged (four-fifths rule)
+DISPARITY_RATIO = 0.8
+# Tiers whose mean response time is this far from the all-tier mean are flagged
+RESPONSE_TIME_TOLERANCE = 0.2
+
+GRANULARITIES = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+FIELDS = ('interactions', 'filtered', 'latency_ms_sum', 'latency_count', 'recommendations',
+          'recommended_points', 'redemption_attempts', 'redemptions')
+
+
+def event_deltas(event_type, payload):
+    """The (tier, field increments) an audit event adds to the rollup, or None if it doesn't count"""
+    tier = payload.get('member_tier')
+    if not tier:
+        return None
+    if event_type == 'chat':
+        deltas = {'interactions': 1, 'filtered': 1 if payload.get('was_filtered') else 0}
+        if payload.get('latency_ms') is not None:
+            deltas['latency_ms_sum'] = payload['latency_ms']
+            deltas['latency_count'] = 1
+        return tier, deltas
+    if event_type == 'recommendation':
+        return tier, {'recommendations': payload.get('count', 0), 'recommended_points': payload.get('points', 0)}
+    if event_type == 'redemption':
+        return tier, {'redemption_attempts': 1, 'redemptions': 1 if payload.get('success') else 0}
+    return None
+
+
+class FairnessRollup:
+    """Per-tier aggregates in minute, hour and day buckets"""
+
+    def __init__(self, minute_retention=FAIRNESS_MINUTE_RETENTION, hour_retention=FAIRNESS_HOUR_RETENTION,
+                 day_retention=FAIRNESS_DAY_RETENTION):
+        self.retention = {
+            'minute': minute_retention * 60,
+            'hour': hour_retention * 3600,
+            'day': day_retention * 86400
+        }
+        self._lock = threading.Lock()
+        # granularity -> bucket start -> tier -> field totals
+        self._buckets = {name: {} for name in GRANULARITIES}
+        self._newest = 0.0
+        self.events = 0
+        self.backfilled = 0
+
+    def record(self, event_type, payload, ts=None):
+        """Add one event to its minute, hour and day buckets"""
+        counted = event_deltas(event_type, payload)
+        if counted is None:
+            return False
+        tier, deltas = counted
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            for name, width in GRANULARITIES.items():
+                start = ts - ts % width
+                buckets = self._buckets[name]
+                bucket = buckets.get(start)
+                if bucket is None:
+                    bucket = buckets[start] = {}
+                    self._prune(name, max(ts, self._newest))
+                totals = bucket.get(tier)
+                if totals is None:
+                    totals = bucket[tier] = dict.fromkeys(FIELDS, 0)
+                for field, value in deltas.items():
+                    totals[field] += value
+            self._newest = max(self._newest, ts)
+            self.events += 1
+        return True
+
+    def _prune(self, name, now):
+        # Caller holds the lock; runs only when a bucket is opened
+        cutoff = now - self.retention[name]
+        buckets = self._buckets[name]
+        for start in [start for start in buckets if start < cutoff]:
+            del buckets[start]
+
+    def backfill(self, events):
+        """Fold (ts, type, member_id, payload) events in, e.g. from AuditStore.iter_events()"""
+        added = 0
+        for ts, event_type, _, payload in events:
+            if self.record(event_type, payload, ts):
+                added += 1
+        self.backfilled += added
+        return added
+
+    def totals(self, window_seconds, now=None):
+        """Per-tier field totals over the window, from the coarsest buckets that resolve it"""
+        now = time.time() if now is None else now
+        for name in GRANULARITIES:
+            if window_seconds <= self.retention[name]:
+                break
+        width = GRANULARITIES[name]
+        since = now - window_seconds
+        merged = {}
+        with self._lock:
+            buckets = [bucket for start, bucket in self._buckets[name].items() if start + width > since]
+            for bucket in buckets:
+                for tier, totals in bucket.items():
+                    into = merged.get(tier)
+                    if into is None:
+                        into = merged[tier] = dict.fromkeys(FIELDS, 0)
+                    for field in FIELDS:
+                        into[field] += totals[field]
+        return merged, name, len(buckets)
+
+    def metrics(self, tiers, window_seconds, now=None):
+        """Fairness metrics per tier over the window, in calculate_fairness_metrics' shape"""
+        totals, granularity, bucket_count = self.totals(window_seconds, now)
+        empty = dict.fromkeys(FIELDS, 0)
+        per_tier = {tier: totals.get(tier, empty) for tier in tiers}
+
+        distribution = {}
+        success_rate = {}
+        response_time = {}
+        for tier, t in per_tier.items():
+            distribution[tier] = {
+                'count': t['recommendations'],
+                'avg_points': round(t['recommended_points'] / t['recommendations']) if t['recommendations'] else 0
+            }
+            success_rate[tier] = t['redemptions'] / t['redemption_attempts'] if t['redemption_attempts'] else None
+            response_time[tier] = round(t['latency_ms_sum'] / t['latency_count']) if t['latency_count'] else None
+
+        # Disparate impact: worst tier's success rate relative to the best tier's
+        rates = [rate for rate in success_rate.values() if rate is not None]
+        fairness_score = min(rates) / max(rates) if rates and max(rates) else None
+        bias_flags = len([rate for rate in rates if rate < DISPARITY_RATIO * max(rates)]) if rates else 0
+
+        times = [ms for ms in response_time.values() if ms is not None]
+        mean_response_time = sum(times) / len(times) if times else None
+        if mean_response_time:
+            bias_flags += len([ms for ms in times
+                               if abs(ms - mean_response_time) / mean_response_time > RESPONSE_TIME_TOLERANCE])
+
+        return {
+            'recommendation_distribution': distribution,
+            'redemption_success_rate': success_rate,
+            'response_time_ms': response_time,
+            'mean_response_time_ms': mean_response_time,
+            'fairness_score': fairness_score,
+            'bias_flags': bias_flags,
+            'total_interactions': sum(t['interactions'] for t in per_tier.values()),
+            'content_filtered': sum(t['filtered'] for t in per_tier.values()),
+            'granularity': granularity,
+            'buckets': bucket_count
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                'events': self.events,
+                'backfilled': self.backfilled,
+                **{f"{name}_buckets": len(buckets) for name, buckets in self._buckets.items()}
+            }
+
+
+_rollup = None
+_rollup_lock = threading.Lock()
+
+
+def get_fairness_rollup():
+    """Return the process-wide rollup, back-filled from the audit store on first use"""
+    global _rollup
+    with _rollup_lock:
+        if _rollup is None:
+            store = get_audit_store()
+            # Events logged from here on are recorded live; the backfill covers everything before
+            started = time.time()
+            store.flush()
+            rollup = FairnessRollup()
+            oldest = started - rollup.retention['day']
+            rollup.backfill(store.iter_events(since=oldest, until=started))
+            _rollup = rollup
+        return _rollup
@@ -0,0 +1,202 @@
+"""Process-wide scheduler for LLM calls: a concurrency cap, fair queueing and token budgets
+
+Every advisor call takes a slot first. At most ``max_in_flight`` calls run at
+once; waiting requests are served round-robin across members, so a chatty
+member cannot starve the rest. Every waiting member gets the same share of
+slots whatever their tier, which keeps queue waits equal across tiers: a
+tier with more members waiting gets proportionally more slots, not the same
+number as a near-empty tier. Each member also has a token budget over a
+sliding window (LLM_MEMBER_TOKEN_BUDGET=0 turns budgets off).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from metrics import Histogram
+
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "4"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30"))
+LLM_MEMBER_TOKEN_BUDGET = int(os.getenv("LLM_MEMBER_TOKEN_BUDGET", "50000"))
+LLM_BUDGET_WINDOW_SECONDS = float(os.getenv("LLM_BUDGET_WINDOW_SECONDS", "3600"))
+
+
+class TokenBudgetExceeded(Exception):
+    """Raised when a member has used up their token budget for the window"""
+
+    def __init__(self, member_id, retry_in):
+        super().__init__(f"Token budget used up for {member_id}; retry in {retry_in:.0f}s")
+        self.member_id = member_id
+        self.retry_in = retry_in
+
+
+class QueueTimeout(Exception):
+    """Raised when a request waits longer than the queue timeout for a slot"""
+
+
+class _Waiter:
+    def __init__(self, member_id, tier):
+        self.member_id = member_id
+        self.tier = tier
+        self.event = threading.Event()
+        self.enqueued = time.perf_counter()
+        self.admitted = False
+
+
+class Ticket:
+    """A held slot; charge() records the tokens the call used"""
+
+    def __init__(self, scheduler, member_id, tier, wait_ms):
+        self.scheduler = scheduler
+        self.member_id = member_id
+        self.tier = tier
+        self.wait_ms = wait_ms
+        self.started = time.perf_counter()
+
+    def charge(self, tokens):
+        self.scheduler.charge(self.member_id, tokens)
+
+
+class LlmScheduler:
+    """Caps in-flight LLM calls and admits queued ones fairly"""
+
+    def __init__(self, max_in_flight=LLM_MAX_IN_FLIGHT, queue_timeout=LLM_QUEUE_TIMEOUT,
+                 member_token_budget=LLM_MEMBER_TOKEN_BUDGET, budget_window=LLM_BUDGET_WINDOW_SECONDS):
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.member_token_budget = member_token_budget
+        self.budget_window = budget_window
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        # member -> waiting requests; rotated for round-robin
+        self._queues = OrderedDict()
+        self._queued = 0
+        self._usage = {}
+        self._counters = {'admitted': 0, 'completed': 0, 'budget_rejections': 0, 'timeouts': 0, 'max_queue_depth': 0}
+        self.wait_ms = Histogram()
+        self.tier_latency_ms = {}
+
+    # Token budgets
+
+    def _window_usage(self, member_id, now):
+        usage = self._usage.get(member_id)
+        if not usage:
+            return 0, None
+        while usage and now - usage[0][0] > self.budget_window:
+            usage.popleft()
+        return sum(tokens for _, tokens in usage), (usage[0][0] if usage else None)
+
+    def charge(self, member_id, tokens):
+        """Count tokens a member's call used against their budget"""
+        if tokens:
+            with self._lock:
+                self._usage.setdefault(member_id, deque()).append((time.time(), tokens))
+
+    def budget_remaining(self, member_id):
+        """Tokens left in the member's window, or None when budgets are off"""
+        if not self.member_token_budget:
+            return None
+        with self._lock:
+            used, _ = self._window_usage(member_id, time.time())
+        return max(0, self.member_token_budget - used)
+
+    # Slots
+
+    def _dispatch(self):
+        # Caller holds the lock
+        while self._in_flight < self.max_in_flight and self._queued:
+            member_id, waiters = next(iter(self._queues.items()))
+            self._queues.move_to_end(member_id)
+            waiter = waiters.popleft()
+            if not waiters:
+                del self._queues[member_id]
+            self._queued -= 1
+            self._in_flight += 1
+            waiter.admitted = True
+            waiter.event.set()
+
+    def _dequeue(self, waiter):
+        # Caller holds the lock
+        waiters = self._queues.get(waiter.member_id)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            self._queued -= 1
+            if not waiters:
+                del self._queues[waiter.member_id]
+
+    def acquire(self, member_id, tier, timeout=None):
+        """Wait for a slot and return a Ticket; release() it when the call ends"""
+        timeout = self.queue_timeout if timeout is None else timeout
+        waiter = _Waiter(member_id, tier)
+        with self._lock:
+            if self.member_token_budget:
+                now = time.time()
+                used, oldest = self._window_usage(member_id, now)
+                if used >= self.member_token_budget:
+                    self._counters['budget_rejections'] += 1
+                    raise TokenBudgetExceeded(member_id, oldest + self.budget_window - now)
+            self._queues.setdefault(member_id, deque()).append(waiter)
+            self._queued += 1
+            self._counters['max_queue_depth'] = max(self._counters['max_queue_depth'], self._queued)
+            self._dispatch()
+
+        if not waiter.event.wait(timeout):
+            with self._lock:
+                if not waiter.admitted:
+                    self._dequeue(waiter)
+                    self._counters['timeouts'] += 1
+                    raise QueueTimeout(f"No LLM slot free within {timeout:.0f}s")
+
+        wait_ms = (time.perf_counter() - waiter.enqueued) * 1000
+        self.wait_ms.observe(wait_ms)
+        with self._lock:
+            self._counters['admitted'] += 1
+        return Ticket(self, member_id, tier, wait_ms)
+
+    def release(self, ticket):
+        latency_ms = (time.perf_counter() - ticket.started) * 1000 + ticket.wait_ms
+        with self._lock:
+            self._in_flight -= 1
+            self._counters['completed'] += 1
+            histogram = self.tier_latency_ms.get(ticket.tier)
+            if histogram is None:
+                histogram = self.tier_latency_ms[ticket.tier] = Histogram()
+            self._dispatch()
+        histogram.observe(latency_ms)
+
+    @contextmanager
+    def slot(self, member_id, tier, timeout=None):
+        """Hold a slot for the duration of one LLM call"""
+        ticket = self.acquire(member_id, tier, timeout)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self):
+        """Queue depth, in-flight calls, counters and the wait-time summary"""
+        with self._lock:
+            stats = dict(self._counters, in_flight=self._in_flight, queue_depth=self._queued,
+                         max_in_flight=self.max_in_flight)
+        stats['wait_ms'] = self.wait_ms.snapshot()
+        return stats
+
+    def tier_stats(self):
+        """Latency (queue wait included) per tier, one row per tier"""
+        with self._lock:
+            tiers = list(self.tier_latency_ms.items())
+        return [dict(tier=tier, **histogram.snapshot()) for tier, histogram in sorted(tiers)]
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler():
+    """Return the process-wide scheduler, configured from the environment"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LlmScheduler()
+        return _scheduler
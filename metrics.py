@@ -0,0 +1,253 @@
+"""Lightweight in-process metrics: bucketed histograms, timing spans and a Prometheus endpoint
+
+Spans time external calls and page renders into one histogram per span name
+and label set. Recording a span costs two clock reads, a dict lookup and a
+bucket increment. METRICS_PORT (default 9464, 0 disables) serves every span
+in Prometheus text format at http://METRICS_HOST:METRICS_PORT/metrics.
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+METRICS_PREFIX = "omnishop"
+
+# Upper bounds (ms) suited to API and LLM latencies
+DEFAULT_LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+# Spans also cover fast page renders and cache-served calls
+SPAN_BUCKETS_MS = (1, 2.5) + DEFAULT_LATENCY_BUCKETS_MS
+
+
+class Histogram:
+    """Fixed-bucket histogram; percentiles are interpolated within a bucket"""
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS_MS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+
+    def percentile(self, q):
+        """Estimated q-th percentile (0-100), or None when empty"""
+        with self._lock:
+            counts = list(self._counts)
+            total, largest = self.count, self.max
+        if not total:
+            return None
+        rank = q / 100 * total
+        seen = 0
+        for i, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else largest
+                upper = min(upper, largest)
+                return lower + (upper - lower) * max(0.0, rank - seen) / count
+            seen += count
+        return largest
+
+    def cumulative_buckets(self):
+        """(upper bound, observations <= bound) pairs, ending with +Inf"""
+        with self._lock:
+            counts = list(self._counts)
+        running = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+    def snapshot(self):
+        with self._lock:
+            count, total, largest = self.count, self.sum, self.max
+        return {
+            'count': count,
+            'mean': total / count if count else None,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': largest if count else None
+        }
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_label_value(value)}"' for key, value in pairs) + '}'
+
+
+class SpanRegistry:
+    """Latency histograms and error counts keyed by span name and labels"""
+
+    def __init__(self, buckets=SPAN_BUCKETS_MS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._errors = {}
+
+    def observe(self, name, duration_ms, error=False, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.buckets))
+                self._errors.setdefault(key, 0)
+        histogram.observe(duration_ms)
+        if error:
+            with self._lock:
+                self._errors[key] += 1
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Time the block; an exception escaping it counts as an error
+
+        Only Exception subclasses do: Streamlit's st.rerun() and st.stop()
+        unwind the script with BaseException subclasses, which aren't failures.
+        """
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.observe(name, (time.perf_counter() - started) * 1000, error, **labels)
+
+    def timed(self, name=None, **labels):
+        """Decorator form of span(), named after the function by default"""
+        def decorate(func):
+            span_name = name or func.__name__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def _items(self):
+        with self._lock:
+            return sorted((key, histogram, self._errors[key]) for key, histogram in self._histograms.items())
+
+    def summary(self):
+        """One row per span and label set: count, errors and latency percentiles"""
+        rows = []
+        for (name, labels), histogram, errors in self._items():
+            snap = histogram.snapshot()
+            rows.append({
+                'span': name,
+                'labels': ', '.join(f"{key}={value}" for key, value in labels),
+                'count': snap['count'],
+                'errors': errors,
+                'p50_ms': snap['p50'],
+                'p95_ms': snap['p95'],
+                'p99_ms': snap['p99'],
+                'max_ms': snap['max']
+            })
+        return rows
+
+    def prometheus_text(self):
+        """Every span as a Prometheus histogram in seconds, plus an error counter"""
+        duration = f"{METRICS_PREFIX}_span_duration_seconds"
+        errors_name = f"{METRICS_PREFIX}_span_errors_total"
+        items = self._items()
+        lines = [f"# HELP {duration} Duration of instrumented calls and page renders.",
+                 f"# TYPE {duration} histogram"]
+        for (name, labels), histogram, _ in items:
+            labels = (('span', name),) + labels
+            for bound, count in histogram.cumulative_buckets():
+                le = '+Inf' if bound == float('inf') else repr(bound / 1000)
+                lines.append(f"{duration}_bucket{_format_labels(labels, [('le', le)])} {count}")
+            lines.append(f"{duration}_sum{_format_labels(labels)} {histogram.sum / 1000!r}")
+            lines.append(f"{duration}_count{_format_labels(labels)} {histogram.count}")
+        lines += [f"# HELP {errors_name} Instrumented calls that raised or returned a server error.",
+                  f"# TYPE {errors_name} counter"]
+        for (name, labels), _, errors in items:
+            lines.append(f"{errors_name}{_format_labels((('span', name),) + labels)} {errors}")
+        return '\n'.join(lines) + '\n'
+
+
+_spans = SpanRegistry()
+
+
+def get_span_registry():
+    """Return the process-wide span registry"""
+    return _spans
+
+
+def span(name, **labels):
+    return _spans.span(name, **labels)
+
+
+def timed(name=None, **labels):
+    return _spans.timed(name, **labels)
+
+
+def observe(name, duration_ms, error=False, **labels):
+    _spans.observe(name, duration_ms, error, **labels)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the span registry at /metrics"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve_metrics(host=METRICS_HOST, port=METRICS_PORT, registry=None):
+    """Start a /metrics server on a daemon thread and return it"""
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry or _spans
+    threading.Thread(target=server.serve_forever, daemon=True, name='metrics-endpoint').start()
+    return server
+
+
+_endpoint = None
+_endpoint_lock = threading.Lock()
+
+
+def start_metrics_endpoint():
+    """Start the process-wide /metrics endpoint once; return its URL, or an error string if it could not bind"""
+    global _endpoint
+    with _endpoint_lock:
+        if _endpoint is None:
+            if not METRICS_PORT:
+                _endpoint = "disabled (METRICS_PORT=0)"
+            else:
+                try:
+                    server = serve_metrics(METRICS_HOST, METRICS_PORT)
+                    _endpoint = f"http://{METRICS_HOST}:{server.server_address[1]}/metrics"
+                except OSError as exc:
+                    _endpoint = f"not started: {exc}"
+        return _endpoint
@@ -0,0 +1,55 @@
+"""Purchase-history analytics shared by the app and offline jobs"""
+import threading
+from collections import Counter, OrderedDict
+
+from transaction_columns import clear_columns_cache, get_transaction_columns
+from transaction_sync import transactions_fingerprint
+
+# Most distinct transaction sets whose patterns are kept
+PATTERN_CACHE_SIZE = 64
+
+_pattern_cache = OrderedDict()
+_pattern_cache_lock = threading.Lock()
+_pattern_cache_stats = Counter()
+
+
+def analyze_purchase_patterns(transactions):
+    """Memoized purchase analysis keyed by the transaction-set fingerprint
+
+    Repeat calls on unchanged data only pay for the fingerprint's pass over
+    the row keys; a sync that changes any row changes the fingerprint. The returned dict is shared, so treat it as read-only.
+    """
+    if not transactions:
+        return {}
+
+    key = transactions_fingerprint(transactions)
+    with _pattern_cache_lock:
+        patterns = _pattern_cache.get(key)
+        if patterns is not None:
+            _pattern_cache.move_to_end(key)
+            _pattern_cache_stats['hits'] += 1
+            return patterns
+        _pattern_cache_stats['misses'] += 1
+
+    patterns = get_transaction_columns(transactions).patterns()
+    with _pattern_cache_lock:
+        _pattern_cache[key] = patterns
+        while len(_pattern_cache) > PATTERN_CACHE_SIZE:
+            _pattern_cache.popitem(last=False)
+            _pattern_cache_stats['evictions'] += 1
+    return patterns
+
+
+def clear_pattern_cache():
+    """Forget every memoized analysis (e.g. after a full resync)"""
+    with _pattern_cache_lock:
+        _pattern_cache.clear()
+    clear_columns_cache()
+
+
+def pattern_cache_stats():
+    with _pattern_cache_lock:
+        stats = dict(_pattern_cache_stats, size=len(_pattern_cache))
+    for name in ('hits', 'misses', 'evictions'):
+        stats.setdefault(name, 0)
+    return stats
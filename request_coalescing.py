@@ -0,0 +1,195 @@
+"""Process-wide TTL cache with single-flight loading for API fetchers"""
+import functools
+import inspect
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared worker for stale-while-revalidate background refreshes
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="swr-refresh")
+
+
+class _Flight:
+    """A load in progress that followers wait on"""
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class CoalescingCache:
+    """TTL cache where concurrent misses for the same key share one load
+
+    With ``stale_while_revalidate`` an expired value is still served
+    immediately while a background worker reloads it. Loaders signal failure
+    by returning None or raising; either way the last good value is kept.
+    A raised error is counted in ``stats()`` with its message in
+    ``last_error``, since a background refresh has no caller to report to.
+    Callers waiting on a failed load get ``on_error(error)``'s return value,
+    or the error re-raised when there is no ``on_error``.
+
+    Values are shared between every caller (and every Streamlit session), so
+    treat them as read-only.
+
+    Each key has a generation that ``invalidate`` and ``clear`` bump. A load
+    that started under an older generation still answers its own callers but
+    is never stored, so a fetch racing a write can't cache the old value.
+    """
+
+    def __init__(self, ttl, stale_while_revalidate=False, on_error=None):
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.on_error = on_error
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._inflight = {}
+        self._generations = Counter()
+        self._loaders = {}
+        self._stats = Counter()
+        self._last_error = None
+
+    def get(self, key, loader):
+        """Return the cached value for key, loading it at most once at a time"""
+        return self.get_with_age(key, loader)[0]
+
+    def get_with_age(self, key, loader):
+        """Return (value, age in seconds) for key"""
+        with self._lock:
+            self._loaders[key] = loader
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = time.monotonic() - entry[1]
+                if age < self.ttl:
+                    self._stats['hits'] += 1
+                    return entry[0], age
+                if self.stale_while_revalidate:
+                    self._stats['stale'] += 1
+                    if key not in self._inflight:
+                        self._start_background_refresh(key, loader)
+                    return entry[0], age
+
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self._stats['coalesced'] += 1
+                is_leader = False
+            else:
+                flight = _Flight(self._generations[key])
+                self._inflight[key] = flight
+                self._stats['misses'] += 1
+                is_leader = True
+
+        if is_leader:
+            self._run_flight(key, flight, loader)
+        else:
+            flight.event.wait()
+        if flight.error is not None:
+            if self.on_error is None or not isinstance(flight.error, Exception):
+                raise flight.error
+            return self.on_error(flight.error), 0.0
+        return flight.value, 0.0
+
+    def _start_background_refresh(self, key, loader):
+        # Caller holds self._lock
+        flight = _Flight(self._generations[key])
+        self._inflight[key] = flight
+        self._stats['refreshes'] += 1
+        _refresh_executor.submit(self._run_flight, key, flight, loader, True)
+
+    def _run_flight(self, key, flight, loader, background=False):
+        try:
+            flight.value = loader()
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self._stats['errors'] += 1
+                if background:
+                    self._stats['refresh_errors'] += 1
+                self._last_error = f"{type(e).__name__}: {e}"
+        else:
+            with self._lock:
+                previous = self._entries.get(key)
+                if flight.generation != self._generations[key]:
+                    # Invalidated while loading: the value may predate the write
+                    self._stats['superseded'] += 1
+                elif flight.value is None and previous is not None and self.stale_while_revalidate:
+                    # Failed refresh: keep serving the last good value
+                    flight.value = previous[0]
+                else:
+                    self._entries[key] = (flight.value, time.monotonic())
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+            flight.event.set()
+
+    def invalidate(self, key, refresh=False):
+        """Drop one key; with refresh, reload it in the background right away
+
+        A load already in flight for the key is superseded: it won't be
+        stored, and later callers start (or join) a new one.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generations[key] += 1
+            self._inflight.pop(key, None)
+            loader = self._loaders.get(key)
+            if refresh and loader is not None:
+                self._start_background_refresh(key, loader)
+
+    def clear(self):
+        """Drop every cached value; loads in flight complete but aren't stored"""
+        with self._lock:
+            self._entries.clear()
+            for key in self._inflight:
+                self._generations[key] += 1
+            self._inflight.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, last_error=self._last_error)
+        for name in ('hits', 'misses', 'coalesced', 'stale', 'refreshes', 'errors', 'refresh_errors', 'superseded'):
+            stats.setdefault(name, 0)
+        lookups = stats['hits'] + stats['misses'] + stats['coalesced'] + stats['stale']
+        stats['hit_rate'] = (stats['hits'] + stats['stale']) / lookups if lookups else 0.0
+        return stats
+
+
+def coalesced_cache(ttl, stale_while_revalidate=False, on_error=None):
+    """Decorator caching a fetcher by its arguments with single-flight loads
+
+    Drop-in for ``st.cache_data(ttl=...)`` on the API fetchers: the wrapper keeps
+    ``.clear()`` and adds ``.with_age()``, ``.invalidate()`` and ``.stats()``
+    with hit/miss/coalesced counters. ``on_error`` runs on the calling thread,
+    so it may use Streamlit; the fetcher itself may also run on a background
+    refresh worker, where it can't.
+    """
+    def decorator(func):
+        cache = CoalescingCache(ttl, stale_while_revalidate=stale_while_revalidate, on_error=on_error)
+        signature = inspect.signature(func)
+
+        def make_key(args, kwargs):
+            # Bind defaults so f() and f(CUSTOMER_ID) share one cache key
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return tuple(bound.arguments.items())
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return cache.get(make_key(args, kwargs), lambda: func(*args, **kwargs))
+
+        def with_age(*args, **kwargs):
+            return cache.get_with_age(make_key(args, kwargs), lambda: func(*args, **kwargs))
+
+        def invalidate(*args, refresh=False, **kwargs):
+            cache.invalidate(make_key(args, kwargs), refresh=refresh)
+
+        wrapper.cache = cache
+        wrapper.with_age = with_age
+        wrapper.invalidate = invalidate
+        wrapper.clear = cache.clear
+        wrapper.stats = cache.stats
+        return wrapper
+    return decorator
@@ -0,0 +1,205 @@
+"""Cache of advisor answers to opening questions, shared by members with the same bucketed state
+
+An opening question is answered from a system prompt built only from the
+member's tier, points bucket and favorite category, never their name or
+purchases, and the answer is keyed on that prompt. So every member in the
+bucket can be served the same answer.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+RESPONSE_CACHE_BACKEND = os.getenv("ADVISOR_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_PATH = os.getenv("ADVISOR_CACHE_PATH", "advisor_cache.sqlite3")
+RESPONSE_CACHE_TTL = float(os.getenv("ADVISOR_CACHE_TTL", "3600"))
+RESPONSE_CACHE_SIZE = int(os.getenv("ADVISOR_CACHE_SIZE", "512"))
+
+# Members whose balances fall in the same bucket share cached answers
+POINTS_BUCKET = 500
+
+
+def normalize_prompt(prompt):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return ' '.join(re.sub(r"[^\w\s]", ' ', prompt.lower()).split())
+
+
+def member_fingerprint(member, patterns):
+    """The bucketed member state a cacheable answer may depend on: tier, points bucket, favorite category"""
+    return (member['tier'], member['points'] // POINTS_BUCKET, (patterns or {}).get('favorite_category'))
+
+
+def points_range(bucket):
+    """The (lowest, highest) balance in a points bucket"""
+    return bucket * POINTS_BUCKET, (bucket + 1) * POINTS_BUCKET - 1
+
+
+def prompt_fingerprint(model, system_blocks):
+    """Everything besides the question that the answer depends on: the model and the system prompt text"""
+    return [model] + [block['text'] for block in system_blocks]
+
+
+def response_cache_key(prompt, fingerprint):
+    raw = json.dumps([normalize_prompt(prompt), list(fingerprint)])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class MemoryBackend:
+    """In-process LRU of (stored_at, answer) entries"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        """Store an entry; return how many entries were evicted"""
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SqliteBackend:
+    """On-disk LRU in a SQLite file, shared by processes on the same host"""
+
+    name = 'sqlite'
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, max_entries=RESPONSE_CACHE_SIZE):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, stored_at REAL NOT NULL, used_at REAL NOT NULL, answer TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT stored_at, answer FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+            return row
+
+    def set(self, key, entry):
+        """Store an entry; return how many entries were evicted"""
+        stored_at, answer = entry
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, stored_at, used_at, answer) VALUES (?, ?, ?, ?)",
+                (key, stored_at, time.time(), answer)
+            )
+            evicted = self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+            self._conn.commit()
+            return evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class ResponseCache:
+    """TTL cache of advisor answers over a pluggable LRU backend"""
+
+    def __init__(self, backend=None, ttl=RESPONSE_CACHE_TTL):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stores': 0, 'evictions': 0}
+
+    def _count(self, field, n=1):
+        with self._lock:
+            self._stats[field] += n
+
+    def get(self, key):
+        """Cached answer for key, or None if missing or older than the TTL"""
+        entry = self.backend.get(key)
+        if entry is not None and time.time() - entry[0] > self.ttl:
+            self.backend.delete(key)
+            self._count('expired')
+            entry = None
+        self._count('hits' if entry is not None else 'misses')
+        return entry[1] if entry is not None else None
+
+    def set(self, key, answer):
+        evicted = self.backend.set(key, (time.time(), answer))
+        self._count('stores')
+        if evicted:
+            self._count('evictions', evicted)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        stats['size'] = len(self.backend)
+        stats['backend'] = self.backend.name
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide response cache configured from the environment"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            if RESPONSE_CACHE_BACKEND == 'sqlite':
+                backend = SqliteBackend(RESPONSE_CACHE_PATH, RESPONSE_CACHE_SIZE)
+            else:
+                backend = MemoryBackend(RESPONSE_CACHE_SIZE)
+            _cache = ResponseCache(backend, RESPONSE_CACHE_TTL)
+        return _cache
@@ -0,0 +1,426 @@
+"""Local stub of the loyalty API for offline development, benchmarks and load tests
+
+Run ``python stub_api.py --port 8000`` and start the app with
+``API_BASE_URL=http://127.0.0.1:8000``. Customers CUST001..CUSTnnn are
+generated on first access from the seed, so large scales start instantly.
+Faults can be injected per request: latency drawn from a distribution
+(``--latency lognormal:80,0.5``), error responses (``--error-rate``) and
+slow-drip bodies sent in small timed chunks (``--drip-rate``).
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PRODUCTS = {
+    'Electronics': [('USB-C Cable', 12.99), ('Bluetooth Speaker', 59.99), ('Laptop Stand', 34.50)],
+    'Health': [('Vitamin D3', 14.99), ('Yoga Mat', 29.00), ('Protein Powder', 42.75)],
+    'Groceries': [('Organic Coffee', 11.49), ('Olive Oil', 9.99), ('Granola', 5.25)],
+    'Food': [('Meal Kit', 45.00), ('Snack Box', 19.99)],
+    'Home': [('Throw Pillow', 24.99), ('Scented Candle', 16.00), ('Desk Lamp', 38.00)],
+    'Clothing': [('Running Socks', 12.00), ('Rain Jacket', 89.99), ('Cotton Tee', 18.50)],
+}
+
+CUSTOMER_PATTERN = re.compile(r'^CUST(\d+)$')
+
+
+def generate_transactions(customer_id, count, start=None, rng=None):
+    """Generate ``count`` chronological transactions for one customer"""
+    rng = rng or random.Random()
+    start = start or datetime(2025, 1, 1)
+    categories = list(PRODUCTS)
+    timestamp = start
+    transactions = []
+    for i in range(count):
+        timestamp += timedelta(minutes=rng.randint(30, 60 * 24 * 3))
+        category = rng.choice(categories)
+        product, price = rng.choice(PRODUCTS[category])
+        transactions.append({
+            'transactionId': f"{customer_id}-TX{i + 1:07d}",
+            'customerId': customer_id,
+            'timestamp': timestamp.isoformat(),
+            'productName': product,
+            'category': category,
+            'purchaseAmount': price,
+            'points': int(price * 10)
+        })
+    return transactions
+
+
+class StubRequestError(Exception):
+    """A request the stub rejects, answered with ``status`` and ``detail``"""
+
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+class StubData:
+    """In-memory customers, transactions and redemptions served by the stub
+
+    Each customer is generated from (seed, customer id) the first time it is
+    requested, so the data is the same whatever order customers are read in.
+    """
+
+    def __init__(self, customers=1, transactions_per_customer=50, seed=42):
+        self.customer_count = customers
+        self.transactions_per_customer = transactions_per_customer
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.customers = {}
+        self.transactions = {}
+        self.redemptions = []
+
+    def _ensure(self, customer_id):
+        # Caller holds the lock; returns the customer record or None if out of range
+        customer = self.customers.get(customer_id)
+        if customer is not None:
+            return customer
+        match = CUSTOMER_PATTERN.match(customer_id or '')
+        if not match or not 1 <= int(match.group(1)) <= self.customer_count:
+            return None
+        n = int(match.group(1))
+        rows = generate_transactions(customer_id, self.transactions_per_customer,
+                                     rng=random.Random(f"{self.seed}:{customer_id}"))
+        self.transactions[customer_id] = rows
+        customer = self.customers[customer_id] = {
+            'customerId': customer_id,
+            'customerName': f"Member {n}" if n > 1 else 'Alex D.',
+            'pointsBalance': sum(tx['points'] for tx in rows),
+            'createdAt': '2025-01-01T00:00:00'
+        }
+        return customer
+
+    def _customer(self, customer_id):
+        customer = self._ensure(customer_id)
+        if customer is None:
+            raise StubRequestError(404, 'Customer not found')
+        return customer
+
+    def customer(self, customer_id):
+        """A copy of the customer record"""
+        with self.lock:
+            return dict(self._customer(customer_id))
+
+    def update_customer(self, customer_id, fields, partial=False):
+        """PUT (pointsBalance required) or PATCH (any of pointsBalance, customerName) a customer"""
+        if not partial and 'pointsBalance' not in fields:
+            raise StubRequestError(400, 'pointsBalance is required')
+        balance = fields.get('pointsBalance')
+        if balance is not None and (not isinstance(balance, int) or balance < 0):
+            raise StubRequestError(400, 'pointsBalance must be a non-negative integer')
+        with self.lock:
+            customer = self._customer(customer_id)
+            if balance is not None:
+                customer['pointsBalance'] = balance
+            if fields.get('customerName'):
+                customer['customerName'] = fields['customerName']
+            return dict(customer)
+
+    def deduct(self, customer_id, points):
+        """Take points off a customer's balance"""
+        if not isinstance(points, int) or points <= 0:
+            raise StubRequestError(400, 'pointsToDeduct must be a positive integer')
+        with self.lock:
+            customer = self._customer(customer_id)
+            if points > customer['pointsBalance']:
+                raise StubRequestError(400, 'Insufficient points')
+            customer['pointsBalance'] -= points
+            return dict(customer)
+
+    def transactions_since(self, customer_id, since=None):
+        """Rows with ``timestamp >= since`` (all rows when since is None)"""
+        with self.lock:
+            self._customer(customer_id)
+            rows = self.transactions[customer_id]
+            if not since:
+                return list(rows)
+            return [tx for tx in rows if tx['timestamp'] >= since]
+
+    def add_transaction(self, customer_id, tx):
+        with self.lock:
+            customer = self._customer(customer_id)
+            rows = self.transactions[customer_id]
+            tx = dict(tx)
+            tx.setdefault('transactionId', f"{customer_id}-TX{len(rows) + 1:07d}")
+            tx.setdefault('customerId', customer_id)
+            tx.setdefault('timestamp', datetime.now().isoformat())
+            rows.append(tx)
+            customer['pointsBalance'] += tx.get('points', 0) or 0
+            return tx
+
+    def redeem(self, redemption):
+        """Record a redemption and deduct its points"""
+        points = redemption.get('pointsToRedeem', redemption.get('pointsCost'))
+        if not isinstance(points, int) or points <= 0:
+            raise StubRequestError(400, 'pointsToRedeem must be a positive integer')
+        if not redemption.get('productToRedeem'):
+            raise StubRequestError(400, 'productToRedeem is required')
+        with self.lock:
+            customer = self._customer(redemption.get('customerId'))
+            if points > customer['pointsBalance']:
+                raise StubRequestError(400, 'Insufficient points')
+            customer['pointsBalance'] -= points
+            record = dict(redemption, redemptionId=f"RDM{len(self.redemptions) + 1:07d}",
+                          pointsToRedeem=points, pointsBalance=customer['pointsBalance'],
+                          timestamp=datetime.now().isoformat())
+            self.redemptions.append(record)
+            return record
+
+    def list_redemptions(self, customer_id=None, limit=100):
+        """Newest redemptions first, optionally for one customer"""
+        with self.lock:
+            rows = [r for r in self.redemptions if customer_id is None or r.get('customerId') == customer_id]
+        return rows[::-1][:limit]
+
+
+def parse_latency(spec):
+    """Turn a latency spec into a function returning a delay in seconds
+
+    Specs are in milliseconds: ``none``, ``fixed:MS``, ``uniform:LOW,HIGH``,
+    ``normal:MEAN,STDDEV``, ``lognormal:MEDIAN,SIGMA`` or ``pareto:MIN,ALPHA``.
+    """
+    kind, _, params = (spec or 'none').partition(':')
+    values = [float(v) for v in params.split(',')] if params else []
+    samplers = {
+        'none': (0, lambda rng: 0.0),
+        'fixed': (1, lambda rng: values[0]),
+        'uniform': (2, lambda rng: rng.uniform(values[0], values[1])),
+        'normal': (2, lambda rng: max(0.0, rng.gauss(values[0], values[1]))),
+        'lognormal': (2, lambda rng: rng.lognormvariate(math.log(values[0]), values[1])),
+        'pareto': (2, lambda rng: values[0] * rng.paretovariate(values[1])),
+    }
+    if kind not in samplers or len(values) != samplers[kind][0]:
+        raise ValueError(f"Bad latency spec {spec!r}; expected one of: none, fixed:MS, uniform:LOW,HIGH, "
+                         "normal:MEAN,STDDEV, lognormal:MEDIAN,SIGMA, pareto:MIN,ALPHA")
+    sample = samplers[kind][1]
+    return lambda rng: sample(rng) / 1000
+
+
+class FaultInjector:
+    """Latency, error and slow-drip faults applied to each stub request
+
+    ``route_latency`` maps route names (balance, transactions, redeem,
+    redemptions) to latency specs that override ``latency`` for that route.
+    """
+
+    def __init__(self, latency='none', route_latency=None, error_rate=0.0, error_status=503,
+                 drip_rate=0.0, drip_bytes=256, drip_interval=0.05, seed=None):
+        self.latency = parse_latency(latency)
+        self.route_latency = {route: parse_latency(spec) for route, spec in (route_latency or {}).items()}
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.drip_rate = drip_rate
+        self.drip_bytes = drip_bytes
+        self.drip_interval = drip_interval
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'delayed_seconds': 0.0, 'errors': 0, 'dripped': 0}
+
+    def delay(self, route):
+        with self._lock:
+            seconds = self.route_latency.get(route, self.latency)(self._rng)
+            self.stats['requests'] += 1
+            self.stats['delayed_seconds'] += seconds
+        return seconds
+
+    def should_fail(self):
+        with self._lock:
+            failed = self._rng.random() < self.error_rate
+            self.stats['errors'] += failed
+        return failed
+
+    def should_drip(self):
+        with self._lock:
+            dripped = self._rng.random() < self.drip_rate
+            self.stats['dripped'] += dripped
+        return dripped
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    """Routes requests under /api to the server's StubData"""
+
+    protocol_version = 'HTTP/1.1'
+
+    # (route name, path pattern, {method: handler name})
+    routes = [
+        ('balance', re.compile(r'^/api/customers/([^/]+)/balance/?$'),
+         {'GET': 'get_balance', 'PUT': 'put_balance', 'PATCH': 'patch_balance'}),
+        ('transactions', re.compile(r'^/api/customers/([^/]+)/transactions/?$'),
+         {'GET': 'get_transactions', 'POST': 'post_transaction'}),
+        ('redeem', re.compile(r'^/api/customers/([^/]+)/redeem/?$'),
+         {'POST': 'post_redeem'}),
+        ('redemptions', re.compile(r'^/api/redemptions/?$'),
+         {'GET': 'get_redemptions', 'POST': 'post_redemption'}),
+    ]
+
+    @property
+    def data(self):
+        return self.server.data
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body, drip=False):
+        payload = json.dumps(body).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+
+        if self.command == 'GET' and status == 200:
+            etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+            if etag in (self.headers.get('If-None-Match') or ''):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            headers['ETag'] = etag
+
+        if len(payload) > 1024 and 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            payload = gzip.compress(payload)
+            headers['Content-Encoding'] = 'gzip'
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if not drip:
+            self.wfile.write(payload)
+            return
+        faults = self.server.faults
+        for offset in range(0, len(payload), faults.drip_bytes):
+            self.wfile.write(payload[offset:offset + faults.drip_bytes])
+            self.wfile.flush()
+            time.sleep(faults.drip_interval)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        try:
+            return json.loads(body or b'{}')
+        except ValueError:
+            raise StubRequestError(400, 'Body is not valid JSON')
+
+    def _dispatch(self):
+        url = urlparse(self.path)
+        for route, pattern, methods in self.routes:
+            match = pattern.match(url.path)
+            if match:
+                break
+        else:
+            self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            return self._send_json(404, {'detail': 'Not found'})
+
+        try:
+            # Read the body before any injected fault so the connection stays usable
+            body = self._read_json() if self.command in ('POST', 'PUT', 'PATCH') else {}
+            faults = self.server.faults
+            time.sleep(faults.delay(route))
+            if faults.should_fail():
+                return self._send_json(faults.error_status, {'detail': 'Injected fault'})
+            if self.command not in methods:
+                return self._send_json(405, {'detail': 'Method not allowed'})
+            handler = getattr(self, methods[self.command])
+            status, result = handler(match.groups(), parse_qs(url.query), body)
+        except StubRequestError as e:
+            return self._send_json(e.status, {'detail': e.detail})
+        self._send_json(status, result, drip=faults.should_drip())
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+    # Routes: each returns (status, body) or raises StubRequestError
+
+    def get_balance(self, groups, query, body):
+        return 200, self.data.customer(groups[0])
+
+    def put_balance(self, groups, query, body):
+        return 200, self.data.update_customer(groups[0], body)
+
+    def patch_balance(self, groups, query, body):
+        return 200, self.data.update_customer(groups[0], body, partial=True)
+
+    def get_transactions(self, groups, query, body):
+        return 200, self.data.transactions_since(groups[0], query.get('since', [None])[0])
+
+    def post_transaction(self, groups, query, body):
+        # Stub-only: append a purchase so incremental sync can be exercised
+        return 201, self.data.add_transaction(groups[0], body)
+
+    def post_redeem(self, groups, query, body):
+        return 200, self.data.deduct(groups[0], body.get('pointsToDeduct'))
+
+    def get_redemptions(self, groups, query, body):
+        limit = int(query.get('limit', ['100'])[0])
+        return 200, self.data.list_redemptions(query.get('customerId', [None])[0], limit)
+
+    def post_redemption(self, groups, query, body):
+        return 201, self.data.redeem(body)
+
+
+def make_server(host='127.0.0.1', port=8000, data=None, faults=None, verbose=False):
+    """Create (but do not start) a stub API server"""
+    server = ThreadingHTTPServer((host, port), StubApiHandler)
+    server.daemon_threads = True
+    # Load tests open many connections at once
+    server.request_queue_size = 128
+    server.data = data or StubData()
+    server.faults = faults or FaultInjector()
+    server.verbose = verbose
+    return server
+
+
+def serve_in_background(**kwargs):
+    """Start a stub server on a daemon thread and return (server, base_url)"""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True, name='stub-api').start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub of the OmniShop loyalty API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--customers', type=int, default=1)
+    parser.add_argument('--transactions', type=int, default=50, help="transactions per customer")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency', default='none',
+                        help="none, fixed:MS, uniform:LOW,HIGH, normal:MEAN,SD, lognormal:MEDIAN,SIGMA or pareto:MIN,ALPHA")
+    parser.add_argument('--route-latency', action='append', default=[], metavar='ROUTE=SPEC',
+                        help="latency for one route (balance, transactions, redeem, redemptions); repeatable")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests that get an error")
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--drip-rate', type=float, default=0.0, help="fraction of responses sent slowly")
+    parser.add_argument('--drip-bytes', type=int, default=256, help="bytes per slow-drip chunk")
+    parser.add_argument('--drip-interval', type=float, default=0.05, help="seconds between slow-drip chunks")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    data = StubData(args.customers, args.transactions, seed=args.seed)
+    faults = FaultInjector(args.latency, dict(spec.split('=', 1) for spec in args.route_latency),
+                           args.error_rate, args.error_status, args.drip_rate, args.drip_bytes,
+                           args.drip_interval, seed=args.seed)
+    server = make_server(args.host, args.port, data, faults, verbose=args.verbose)
+    print(f"Stub loyalty API on http://{args.host}:{args.port}/api "
+          f"({args.customers} customers x {args.transactions} transactions, latency {args.latency}, "
+          f"{args.error_rate:.0%} errors, {args.drip_rate:.0%} slow-drip)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
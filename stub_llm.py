@@ -0,0 +1,278 @@
+"""Local stub of the Anthropic Messages API for offline development
+
+Streams canned advisor replies as server-sent events in the Messages API
+format. Run ``python stub_llm.py --port 8100`` and start the app with
+``ANTHROPIC_BASE_URL=http://127.0.0.1:8100 ANTHROPIC_API_KEY=stub``.
+Delays can be jittered, and a concurrency limit makes it answer 429 like
+a rate-limited API. Prompts mentioning investing get a reply containing a
+blocked phrase, to exercise the streaming safety cut-off. System blocks marked with
+cache_control are reported as cache writes the first time and cache reads
+after that, but only once the prefix reaches the model's minimum cacheable
+length; shorter prefixes are billed as plain input, like the real API.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Shortest prefix the API caches, by model family (tokens); shorter ones are not cached
+MIN_CACHEABLE_TOKENS = {'haiku': 2048}
+DEFAULT_MIN_CACHEABLE_TOKENS = 1024
+
+# (keyword in the last user message, reply); the first match wins
+REPLIES = [
+    ('invest', "Points are best used on rewards, and I can't offer investment advice "
+               "about what to do with your money. Let's look at your rewards instead."),
+    ('tier', "You're close to the next tier. Every purchase counts toward your annual "
+             "spend, and a higher tier raises your earning rate on every dollar."),
+    ('redeem', "Based on your recent purchases, a gift card in your favorite category "
+               "gives the best value per point. Experiences are worth saving up for."),
+]
+DEFAULT_REPLY = ("Happy to help with your rewards! Your points balance covers several "
+                 "catalog items, and your recent shopping suggests gift cards and "
+                 "merchandise would suit you. Ask me about tiers, redemptions or streaks.")
+
+
+def pick_reply(messages):
+    """Canned reply for the latest user message"""
+    prompt = ''
+    for message in reversed(messages):
+        if message.get('role') == 'user':
+            prompt = _text(message.get('content')).lower()
+            break
+    for keyword, reply in REPLIES:
+        if keyword in prompt:
+            return reply
+    return DEFAULT_REPLY
+
+
+def _text(content):
+    if isinstance(content, str):
+        return content
+    return ' '.join(block.get('text', '') for block in content or [] if isinstance(block, dict))
+
+
+def count_tokens(text):
+    """Rough token estimate (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def min_cacheable_tokens(model):
+    """The model's minimum cacheable prompt length"""
+    for family, tokens in MIN_CACHEABLE_TOKENS.items():
+        if family in (model or ''):
+            return tokens
+    return DEFAULT_MIN_CACHEABLE_TOKENS
+
+
+def split_tokens(text):
+    """Split a reply into word-sized stream chunks"""
+    return re.findall(r'\S+\s*', text)
+
+
+class StubLlmHandler(BaseHTTPRequestHandler):
+    """Serves POST /v1/messages, streaming or not"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_event(self, event, data):
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def do_POST(self):
+        if self.path.split('?')[0].rstrip('/') != '/v1/messages':
+            return self._send_json(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': 'Not found'}})
+
+        length = int(self.headers.get('Content-Length') or 0)
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if not self.server.enter():
+            return self._send_json(429, {'type': 'error', 'error': {
+                'type': 'rate_limit_error', 'message': 'Too many concurrent requests (stub limit)'}})
+        try:
+            self._respond(request)
+        finally:
+            self.server.leave()
+
+    def _respond(self, request):
+        messages = request.get('messages') or []
+        reply = pick_reply(messages)
+        tokens = split_tokens(reply)[:max(1, request.get('max_tokens') or 1)]
+        usage = self.server.prompt_usage(request)
+        usage['output_tokens'] = len(tokens)
+        message = {
+            'id': f"msg_stub_{uuid.uuid4().hex[:20]}",
+            'type': 'message',
+            'role': 'assistant',
+            'model': request.get('model', 'stub'),
+            'content': [],
+            'stop_reason': None,
+            'stop_sequence': None,
+            'usage': dict(usage, output_tokens=0)
+        }
+        time.sleep(self.server.jittered(self.server.first_token_delay))
+
+        if not request.get('stream'):
+            time.sleep(self.server.token_delay * len(tokens))
+            message.update(content=[{'type': 'text', 'text': ''.join(tokens)}],
+                           stop_reason='end_turn', usage=usage)
+            return self._send_json(200, message)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        sent = 0
+        try:
+            self._send_event('message_start', {'type': 'message_start', 'message': message})
+            self._send_event('content_block_start', {'type': 'content_block_start', 'index': 0,
+                                                     'content_block': {'type': 'text', 'text': ''}})
+            for token in tokens:
+                self._send_event('content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                                         'delta': {'type': 'text_delta', 'text': token}})
+                sent += 1
+                time.sleep(self.server.jittered(self.server.token_delay))
+            self._send_event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+            self._send_event('message_delta', {'type': 'message_delta',
+                                               'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                                               'usage': {'output_tokens': len(tokens)}})
+            self._send_event('message_stop', {'type': 'message_stop'})
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading (e.g. a reply cut off by the safety check)
+            pass
+        finally:
+            with self.server.cache_lock:
+                self.server.streamed.append((sent, len(tokens)))
+
+
+class StubLlmServer(ThreadingHTTPServer):
+    """Stub server that also mimics prompt caching of system blocks"""
+
+    daemon_threads = True
+    # Bursts of simultaneous connections should reach the 429 check, not be reset
+    request_queue_size = 128
+
+    def __init__(self, address, handler):
+        super().__init__(address, handler)
+        self.cache_lock = threading.Lock()
+        self.cached_prefixes = set()
+        self.active = 0
+        self.peak_active = 0
+        self.rejected = 0
+        # (chunks sent, chunks in the reply) per streamed reply
+        self.streamed = []
+        self.max_concurrent = 0
+        self.latency_jitter = 0.0
+        self._rng = random.Random()
+
+    def enter(self):
+        """Admit a request unless max_concurrent are already running (then it gets a 429)"""
+        with self.cache_lock:
+            if self.max_concurrent and self.active >= self.max_concurrent:
+                self.rejected += 1
+                return False
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            return True
+
+    def leave(self):
+        with self.cache_lock:
+            self.active -= 1
+
+    def jittered(self, delay):
+        """delay scaled by a random factor in [1 - jitter, 1 + jitter]"""
+        if not self.latency_jitter:
+            return delay
+        return delay * self._rng.uniform(1 - self.latency_jitter, 1 + self.latency_jitter)
+
+    def prompt_usage(self, request):
+        """Input token usage, treating system blocks up to the last cache_control as cacheable
+
+        A prefix shorter than the model's minimum cacheable length is billed
+        as input, so cache reads only show up where the real API has them.
+        """
+        system = request.get('system')
+        blocks = system if isinstance(system, list) else [{'text': system or ''}]
+        cached_upto = 0
+        for i, block in enumerate(blocks):
+            if block.get('cache_control'):
+                cached_upto = i + 1
+        prefix = ''.join(block.get('text', '') for block in blocks[:cached_upto])
+        rest = ''.join(block.get('text', '') for block in blocks[cached_upto:])
+        if prefix and count_tokens(prefix) < min_cacheable_tokens(request.get('model')):
+            prefix, rest = '', prefix + rest
+        rest += ''.join(_text(m.get('content')) for m in request.get('messages') or [])
+
+        usage = {'input_tokens': count_tokens(rest), 'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0}
+        if prefix:
+            with self.cache_lock:
+                hit = prefix in self.cached_prefixes
+                self.cached_prefixes.add(prefix)
+            usage['cache_read_input_tokens' if hit else 'cache_creation_input_tokens'] = count_tokens(prefix)
+        return usage
+
+
+def make_server(host='127.0.0.1', port=8100, first_token_delay=0.3, token_delay=0.03,
+                latency_jitter=0.0, max_concurrent=0, verbose=False):
+    """Create (but do not start) a stub LLM server"""
+    server = StubLlmServer((host, port), StubLlmHandler)
+    server.first_token_delay = first_token_delay
+    server.token_delay = token_delay
+    server.latency_jitter = latency_jitter
+    server.max_concurrent = max_concurrent
+    server.verbose = verbose
+    return server
+
+
+def serve_in_background(**kwargs):
+    """Start a stub LLM server on a daemon thread and return (server, base_url)"""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True, name='stub-llm').start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub of the Anthropic Messages API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--first-token-delay', type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument('--token-delay', type=float, default=0.03, help="seconds between streamed tokens")
+    parser.add_argument('--latency-jitter', type=float, default=0.0,
+                        help="randomly scale delays by up to this fraction either way")
+    parser.add_argument('--max-concurrent', type=int, default=0,
+                        help="answer 429 beyond this many concurrent requests (0: no limit)")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.first_token_delay, args.token_delay,
+                         args.latency_jitter, args.max_concurrent, verbose=args.verbose)
+    print(f"Stub Anthropic API on http://{args.host}:{args.port} "
+          f"(first token after {args.first_token_delay}s, {args.token_delay}s per token)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
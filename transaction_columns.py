@@ -0,0 +1,203 @@
+"""Columnar transaction store with vectorized analytics"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from transaction_sync import transactions_fingerprint
+
+# Most distinct transaction sets kept in columnar form
+COLUMNS_CACHE_SIZE = 8
+
+
+def _numeric_column(values):
+    # None becomes NaN, which counts as 0 like the row-wise "or 0"
+    return np.nan_to_num(np.array(values, dtype=np.float64))
+
+
+class TransactionColumns:
+    """NumPy columns (timestamp, category, amount, points) for one transaction list
+
+    Rows keep the order of the source list, so index ``i`` here is row ``i``
+    there. Timestamps are parsed lazily since only the daily rollup needs them.
+    """
+
+    def __init__(self, transactions):
+        self._rows = transactions
+        self.size = len(transactions)
+
+        # Falsy categories are skipped, as in the row-wise analysis
+        categories = np.array([tx.get('category') or None for tx in transactions], dtype=object)
+        self.category_codes, self.categories = pd.factorize(categories)
+        self.amount = _numeric_column([tx.get('purchaseAmount') for tx in transactions])
+
+        points = _numeric_column([tx.get('points') for tx in transactions])
+        if np.all(np.mod(points, 1) == 0):
+            points = points.astype(np.int64)
+        self.points = points
+
+        self._timestamp = None
+
+    @property
+    def timestamp(self):
+        if self._timestamp is None:
+            raw = pd.Series([tx.get('timestamp') for tx in self._rows], dtype=object)
+            self._timestamp = pd.to_datetime(raw, errors='coerce', format='ISO8601').to_numpy()
+        return self._timestamp
+
+    def category_counts(self):
+        """(category, count) pairs, most common first; ties keep first-seen order"""
+        valid = self.category_codes[self.category_codes >= 0]
+        counts = np.bincount(valid, minlength=len(self.categories))
+        order = np.argsort(-counts, kind='stable')
+        return [(self.categories[i], int(counts[i])) for i in order if counts[i] > 0]
+
+    def top_categories(self, k=5):
+        return self.category_counts()[:k]
+
+    def totals(self):
+        """(total spent, total points earned)"""
+        return float(self.amount.sum()), self.points.sum().item()
+
+    def daily_rollup(self):
+        """Per-day transaction count, amount and points"""
+        frame = pd.DataFrame({
+            'date': pd.DatetimeIndex(self.timestamp).normalize(),
+            'amount': self.amount,
+            'points': self.points
+        })
+        return frame.groupby('date', sort=True).agg(
+            transactions=('amount', 'size'),
+            amount=('amount', 'sum'),
+            points=('points', 'sum')
+        ).reset_index()
+
+    def running_balance(self, current_balance):
+        """Points balance after each row, ending at ``current_balance`` on the last one"""
+        # balance[i] = current - points earned after row i
+        after = self.points.sum() - np.cumsum(self.points)
+        return current_balance - after
+
+    def recent_items(self, n=10):
+        # Stops after n names, so this stays O(n) for any history size
+        items = []
+        for tx in self._rows:
+            if tx.get('productName'):
+                items.append(tx['productName'])
+                if len(items) == n:
+                    break
+        return items
+
+    def patterns(self):
+        """Same summary as the row-wise analyze_purchase_patterns"""
+        if not self.size:
+            return {}
+        top_categories = self.top_categories(5)
+        total_spent, total_points = self.totals()
+        return {
+            'top_categories': top_categories,
+            'total_transactions': self.size,
+            'total_spent': total_spent,
+            'total_points_earned': total_points,
+            'recent_items': self.recent_items(10),
+            'favorite_category': top_categories[0][0] if top_categories else None
+        }
+
+
+HISTORY_SORTS = ("Newest First", "Oldest First", "Highest Points", "Highest Amount")
+ALL_CATEGORIES = "All"
+
+
+class TransactionHistoryIndex:
+    """Pre-sorted row orders for paging through a transaction history
+
+    Per-category row indices are computed once; each (category, sort) order
+    is built on first use and cached, so a page is an array slice.
+    """
+
+    def __init__(self, transactions, columns):
+        self.rows = transactions
+        self.columns = columns
+        self._cumulative_points = np.cumsum(columns.points)
+
+        labels = np.array([tx.get('category') or 'Other' for tx in transactions], dtype=object)
+        codes, uniques = pd.factorize(labels)
+        self.categories = sorted(uniques.tolist())
+        self._category_rows = {ALL_CATEGORIES: np.arange(len(transactions))}
+        for code, category in enumerate(uniques):
+            self._category_rows[category] = np.flatnonzero(codes == code)
+        self._orders = {}
+
+    def order(self, category, sort_by):
+        """Row indices for a category in the requested order"""
+        key = (category, sort_by)
+        order = self._orders.get(key)
+        if order is None:
+            rows = self._category_rows.get(category, np.empty(0, dtype=np.int64))
+            if sort_by == "Newest First":
+                order = rows[::-1]
+            elif sort_by == "Highest Points":
+                order = rows[np.argsort(-self.columns.points[rows], kind='stable')]
+            elif sort_by == "Highest Amount":
+                order = rows[np.argsort(-self.columns.amount[rows], kind='stable')]
+            else:
+                order = rows
+            self._orders[key] = order
+        return order
+
+    def page(self, category, sort_by, page, page_size):
+        """(row indices on the page, total matching rows)"""
+        order = self.order(category, sort_by)
+        start = max(0, page - 1) * page_size
+        return order[start:start + page_size], len(order)
+
+    def balances(self, indices, current_balance):
+        """Running balance after each given row, as in TransactionColumns.running_balance"""
+        total = self._cumulative_points[-1] if len(self._cumulative_points) else 0
+        return current_balance - (total - self._cumulative_points[indices])
+
+
+_columns_cache = OrderedDict()
+_columns_cache_lock = threading.Lock()
+_history_cache = OrderedDict()
+
+
+def get_transaction_columns(transactions):
+    """Return the columnar form of a transaction list, built once per sync"""
+    key = transactions_fingerprint(transactions)
+    with _columns_cache_lock:
+        columns = _columns_cache.get(key)
+        if columns is not None:
+            _columns_cache.move_to_end(key)
+            return columns
+
+    columns = TransactionColumns(transactions or [])
+    with _columns_cache_lock:
+        _columns_cache[key] = columns
+        while len(_columns_cache) > COLUMNS_CACHE_SIZE:
+            _columns_cache.popitem(last=False)
+    return columns
+
+
+def clear_columns_cache():
+    with _columns_cache_lock:
+        _columns_cache.clear()
+        _history_cache.clear()
+
+
+def get_history_index(transactions):
+    """Return the paging index for a transaction list, built once per sync"""
+    key = transactions_fingerprint(transactions)
+    with _columns_cache_lock:
+        index = _history_cache.get(key)
+        if index is not None:
+            _history_cache.move_to_end(key)
+            return index
+
+    index = TransactionHistoryIndex(transactions, get_transaction_columns(transactions))
+    with _columns_cache_lock:
+        _history_cache[key] = index
+        while len(_history_cache) > COLUMNS_CACHE_SIZE:
+            _history_cache.popitem(last=False)
+    return index
@@ -0,0 +1,119 @@
+"""Incremental transaction sync: a since-cursor per customer and a local merge"""
+import threading
+
+# Fields the API may use as a transaction's unique id
+ID_FIELDS = ('transactionId', 'id', '_id')
+
+
+def transaction_key(tx):
+    """Return a stable identity for a transaction row"""
+    for field in ID_FIELDS:
+        if tx.get(field) is not None:
+            return (field, tx[field])
+    # No id from the API: fall back to the row's content
+    return ('content', tx.get('timestamp'), tx.get('productName'), tx.get('purchaseAmount'), tx.get('points'))
+
+
+def transactions_fingerprint(transactions):
+    """Identity for a transaction list: customer, count, newest timestamp and a digest of every row key
+
+    The process-wide analysis caches are keyed on this, so it covers every
+    row, not just the ends: two lists that only share a length and their
+    first and last rows must not collide. Hashing the keys is one pass,
+    far cheaper than the analyses it saves.
+    """
+    if not transactions:
+        return (0,)
+    return (transactions[0].get('customerId'), len(transactions), transactions[-1].get('timestamp'),
+            hash(tuple(transaction_key(tx) for tx in transactions)))
+
+
+def _timestamp(tx):
+    return tx.get('timestamp') or ''
+
+
+class TransactionStore:
+    """De-duplicated, time-ordered transaction history for one customer
+
+    ``rows()`` returns a list that is replaced, never mutated, when new rows
+    are merged, so callers can hold on to it safely.
+    """
+
+    def __init__(self, customer_id):
+        self.customer_id = customer_id
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._rows = []
+        self.synced = False
+
+    @property
+    def cursor(self):
+        """Timestamp of the newest transaction held locally"""
+        with self._lock:
+            return _timestamp(self._rows[-1]) if self._rows else None
+
+    def rows(self):
+        with self._lock:
+            return self._rows
+
+    def merge(self, transactions):
+        """Merge fetched rows into the store and return how many were new"""
+        with self._lock:
+            rows = list(self._rows)
+            added = 0
+            needs_sort = False
+            for tx in transactions or []:
+                key = transaction_key(tx)
+                index = self._keys.get(key)
+                if index is not None:
+                    # Already held (e.g. re-sent at the cursor boundary): keep the latest copy
+                    rows[index] = tx
+                    continue
+                if rows and _timestamp(tx) < _timestamp(rows[-1]):
+                    needs_sort = True
+                self._keys[key] = len(rows)
+                rows.append(tx)
+                added += 1
+
+            if needs_sort:
+                rows.sort(key=_timestamp)
+                self._keys = {transaction_key(tx): i for i, tx in enumerate(rows)}
+
+            self._rows = rows
+            self.synced = True
+            return added
+
+    def reset(self):
+        """Forget every local row so the next sync refetches the full history"""
+        with self._lock:
+            self._keys = {}
+            self._rows = []
+            self.synced = False
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_transaction_store(customer_id):
+    """Return the process-wide store for a customer"""
+    with _stores_lock:
+        store = _stores.get(customer_id)
+        if store is None:
+            store = TransactionStore(customer_id)
+            _stores[customer_id] = store
+        return store
+
+
+def sync_transactions(store, fetch_since):
+    """Fetch rows newer than the store's cursor and merge them
+
+    ``fetch_since(cursor)`` returns a list of transactions at or after the
+    cursor (None for a full fetch), or None on failure. The API is asked for
+    ``timestamp >= cursor`` so rows sharing the cursor's timestamp are never
+    missed; duplicates are dropped on merge.
+    """
+    fetched = fetch_since(store.cursor)
+    if fetched is None:
+        return None
+    return store.merge(fetched)